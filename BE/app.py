@@ -1,22 +1,120 @@
 from flask import Flask
 from config.config import Config
-from extensions import db, jwt
+from extensions import db, jwt, password_hasher, write_queue, replica_monitor, result_cache, init_query_stats, init_sqlite, init_session_routing
 from routes.__init__ import all_blueprints
+from migrations import upgrade_indexes, upgrade_columns
+from services.report_service import ReportService
+from services.import_service import ImportService
+from services.auth_service import AuthService
 from flask_cors import CORS
+from sqlalchemy.engine import make_url
+import click, sqlite3, time
 
-app = Flask(__name__)
-CORS(app)
-app.config.from_object(Config)
 
-db.init_app(app) # Khởi tạo db
-jwt.init_app(app)  # Khởi tạo JWT
+# Tạo app: không truy vấn database lúc khởi động, schema được tạo bằng lệnh `flask init-db`
+def create_app(config=Config, **overrides):
+    app = Flask(__name__)
+    CORS(app)
+    app.config.from_object(config)
+    app.config.update(overrides)
 
-# Đăng ký tất cả Blueprint
-for bp in all_blueprints:
-    app.register_blueprint(bp)
+    init_session_routing(app)  # Bind 'reader': read replica hoặc connection chỉ đọc của SQLite (nếu bật)
+    db.init_app(app) # Khởi tạo db
+    init_sqlite(app)  # Pragma SQLite và nhận diện lỗi khoá database
+    replica_monitor.init_app(app)  # Đo độ trễ replica, trễ quá thì đọc từ primary
+    jwt.init_app(app)  # Khởi tạo JWT
+    password_hasher.init_app(app)  # Pool hash password
+    write_queue.init_app(app)  # Gom commit các service ghi (nếu bật)
+    init_query_stats(app)  # Đếm số câu SQL và slow-query log theo request
+    result_cache.init_app(app)  # Cache kết quả service đọc
+
+    # Đăng ký tất cả Blueprint
+    for bp in all_blueprints:
+        app.register_blueprint(bp)
+
+    register_commands(app)
+    return app
+
+
+# Các lệnh CLI, chạy với: flask --app app <lệnh>
+def register_commands(app):
+    # Lệnh CLI: flask init-db (tạo bảng, cột và index còn thiếu, chạy khi deploy)
+    @app.cli.command('init-db')
+    def init_db_command():
+        db.create_all()
+        added = upgrade_columns()  # Bổ sung cột cho database cũ
+        created = upgrade_indexes()  # Bổ sung index cho database cũ
+        print(f'Database is up to date, added {len(added)} column(s), created {len(created)} index(es)')
+
+
+    # Lệnh CLI: flask upgrade-indexes
+    @app.cli.command('upgrade-indexes')
+    def upgrade_indexes_command():
+        created = upgrade_indexes()
+        print(f'Created {len(created)} index(es)')
+
+
+    # Lệnh CLI: flask rebuild-rollups [--user-id ID]
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user-id', type=int, default=None, help='Chỉ tính lại cho một user')
+    def rebuild_rollups_command(user_id):
+        count = ReportService.rebuild_rollups(user_id)
+        print(f'Rebuilt {count} monthly rollup row(s)')
+
+
+    # Lệnh CLI: flask purge-refresh-tokens
+    @app.cli.command('purge-refresh-tokens')
+    def purge_refresh_tokens_command():
+        count = AuthService.purge_refresh_tokens()
+        print(f'Purged {count} expired token row(s)')
+
+
+    # Lệnh CLI: flask sync-replica [--interval N]
+    # Chép database SQLite sang DB_REPLICA_URL để giả lập read replica khi phát triển (--interval > 0: chép lặp lại)
+    @app.cli.command('sync-replica')
+    @click.option('--interval', type=float, default=0, help='Số giây giữa các lần chép, 0 = chép một lần')
+    def sync_replica_command(interval):
+        replica_url = app.config.get('DB_REPLICA_URL')
+        if not replica_url or make_url(replica_url).get_backend_name() != 'sqlite' or db.engine.dialect.name != 'sqlite':
+            raise click.UsageError('sync-replica needs SQLite for both SQLALCHEMY_DATABASE_URI and DB_REPLICA_URL')
+        while True:
+            replica_monitor.beat()  # Heartbeat trong bản sao = thời điểm chép
+            source = db.engine.raw_connection()
+            target = sqlite3.connect(make_url(replica_url).database)
+            try:
+                source.driver_connection.backup(target)
+            finally:
+                target.close()
+                source.close()
+            print(f'Copied primary database to {replica_url}')
+            if not interval:
+                break
+            time.sleep(interval)
+
+
+    # Lệnh CLI: flask import-statement FILE --user-id ID --wallet-id ID [--category-id ID] [--format csv|ofx] [--batch-size N]
+    @app.cli.command('import-statement')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user-id', type=int, required=True)
+    @click.option('--wallet-id', type=int, required=True)
+    @click.option('--category-id', type=int, default=None)
+    @click.option('--format', 'file_format', type=click.Choice(['csv', 'ofx']), default=None)
+    @click.option('--batch-size', type=click.IntRange(min=1), default=None)
+    def import_statement_command(path, user_id, wallet_id, category_id, file_format, batch_size):
+        file_format = file_format or ('ofx' if path.lower().endswith('.ofx') else 'csv')
+        with open(path, 'rb') as stream:
+            result = ImportService.import_statement_service(
+                user_id, wallet_id, stream,
+                file_format=file_format,
+                category_id=category_id,
+                batch_size=batch_size or app.config['IMPORT_BATCH_SIZE'],
+                progress=print
+            )
+        print({key: value for key, value in result.items() if key != 'errors'})
 
-with app.app_context():
-    db.create_all()
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        db.create_all()  # Chạy trực tiếp khi phát triển: tự tạo bảng
     app.run(debug=True)
@@ -0,0 +1,163 @@
+# Kiểm tra số dư luôn chính xác khi nhiều luồng cùng tạo/sửa/xoá/khôi phục giao dịch trên vài ví
+# Chạy từ thư mục BE: python -m benchmarks.balance_stress [--threads 16] [--operations 200] [--routing] [--write-queue]
+# Thoát với mã 1 nếu số dư wallet/budget, bảng summary hoặc rollup lệch so với ledger
+import argparse, logging, random, sys, threading, time
+from decimal import Decimal
+from sqlalchemy import func
+from extensions import db
+from models import User, Wallet, Category, Budget, Transaction, UserSummary, MonthlyRollup
+from services.transaction_service import TransactionService
+from services.summary_service import SummaryService
+from services.report_service import ReportService
+from .common import make_app
+
+USER_ID = 1
+START_BALANCE = Decimal('100000')
+START_BUDGET = Decimal('1000000')
+
+
+def seed(wallets, categories):
+    db.session.add(User(id=USER_ID, username='stress', email='stress@example.com', password_hash='-'))
+    db.session.flush()
+    wallet_ids = []
+    for i in range(wallets):
+        wallet = Wallet(user_id=USER_ID, name=f'Wallet {i}', balance=START_BALANCE)
+        db.session.add(wallet)
+        db.session.flush()
+        wallet_ids.append(wallet.id)
+    category_ids = []
+    for i in range(categories):
+        category = Category(user_id=USER_ID, name=f'Category {i}')
+        db.session.add(category)
+        db.session.flush()
+        db.session.add(Budget(USER_ID, category.id, amount=START_BUDGET))
+        category_ids.append(category.id)
+    db.session.commit()
+    SummaryService.get_summary_service(USER_ID)  # Tạo dòng summary để các delta được cộng vào
+    db.session.remove()
+    return wallet_ids, category_ids
+
+
+def worker(app, seed_value, operations, wallet_ids, category_ids, counts, lock):
+    rng = random.Random(seed_value)
+    mine = []
+    local = {}
+    with app.app_context():
+        for _ in range(operations):
+            action = rng.choices(['create', 'update', 'soft_delete', 'restore', 'delete'], [6, 2, 2, 2, 1])[0]
+            if action == 'create' or not mine:
+                result = TransactionService.create_transaction_service(USER_ID, {
+                    'wallet_id': rng.choice(wallet_ids),
+                    'category_id': rng.choice(category_ids),
+                    'amount': rng.randint(1, 500) * 100,
+                    'transaction_type': rng.choice(['Income', 'Expense'])
+                })
+                if result['status_code'] == 201:
+                    mine.append(result['transaction']['id'])
+            else:
+                transaction_id = rng.choice(mine)
+                if action == 'update':
+                    result = TransactionService.update_transaction_service(USER_ID, transaction_id, {
+                        'amount': rng.randint(1, 500) * 100,
+                        'wallet_id': rng.choice(wallet_ids),
+                        'transaction_type': rng.choice(['Income', 'Expense'])
+                    })
+                elif action == 'soft_delete':
+                    result = TransactionService.soft_delete_transaction_service(USER_ID, transaction_id)
+                elif action == 'restore':
+                    result = TransactionService.restore_transaction_service(USER_ID, transaction_id)
+                else:
+                    result = TransactionService.delete_transaction_service(USER_ID, transaction_id)
+                    if result['status_code'] == 200:
+                        mine.remove(transaction_id)
+            db.session.remove()
+            key = f'{action} {result["status_code"]}'
+            local[key] = local.get(key, 0) + 1
+    with lock:
+        for key, value in local.items():
+            counts[key] = counts.get(key, 0) + value
+
+
+# So sánh số dư đang lưu với số dư tính lại từ ledger
+def verify(wallet_ids, category_ids):
+    problems = []
+    signed = func.sum(func.coalesce(
+        db.case((Transaction.transaction_type == 'Income', Transaction.amount), else_=-Transaction.amount), 0))
+    ledger = dict(db.session.query(Transaction.wallet_id, signed)
+                  .filter(Transaction.user_id == USER_ID, Transaction.is_deleted == False)
+                  .group_by(Transaction.wallet_id).all())
+    for wallet_id in wallet_ids:
+        expected = START_BALANCE + Decimal(str(ledger.get(wallet_id, 0)))
+        actual = Decimal(str(db.session.get(Wallet, wallet_id).balance))
+        if actual != expected:
+            problems.append(f'wallet {wallet_id}: balance {actual} != ledger {expected}')
+
+    spent = dict(db.session.query(Transaction.category_id, func.sum(Transaction.amount))
+                 .filter(Transaction.user_id == USER_ID, Transaction.is_deleted == False, Transaction.transaction_type == 'Expense')
+                 .group_by(Transaction.category_id).all())
+    for category_id in category_ids:
+        expected = START_BUDGET - Decimal(str(spent.get(category_id, 0)))
+        actual = Decimal(str(Budget.query.filter_by(user_id=USER_ID, category_id=category_id).first().amount))
+        if actual != expected:
+            problems.append(f'budget of category {category_id}: amount {actual} != ledger {expected}')
+
+    summary = db.session.get(UserSummary, USER_ID)
+    stored = (summary.total_balance, summary.monthly_income, summary.monthly_expense)
+    db.session.expunge(summary)
+    rebuilt = SummaryService.rebuild_summary(USER_ID)
+    if stored != (rebuilt.total_balance, rebuilt.monthly_income, rebuilt.monthly_expense):
+        problems.append(f'summary {stored} != rebuilt {(rebuilt.total_balance, rebuilt.monthly_income, rebuilt.monthly_expense)}')
+    db.session.rollback()
+
+    key = lambda r: (r.year_month, r.category_id, r.transaction_type)
+    stored = {key(r): (Decimal(str(r.total_amount)), r.transaction_count) for r in MonthlyRollup.query.all()}
+    ReportService.rebuild_rollups(USER_ID)
+    rebuilt = {key(r): (Decimal(str(r.total_amount)), r.transaction_count) for r in MonthlyRollup.query.all()}
+    if stored != rebuilt:
+        problems.append(f'monthly rollups differ from rebuilt values: {stored} != {rebuilt}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--operations', type=int, default=200, help='Số thao tác mỗi luồng')
+    parser.add_argument('--wallets', type=int, default=2)
+    parser.add_argument('--categories', type=int, default=2)
+    parser.add_argument('--routing', action='store_true', help='Bật DB_SESSION_ROUTING')
+    parser.add_argument('--write-queue', action='store_true', help='Bật WRITE_QUEUE_ENABLED')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    app = make_app(DB_SESSION_ROUTING=args.routing, WRITE_QUEUE_ENABLED=args.write_queue)
+    with app.app_context():
+        db.create_all()
+        wallet_ids, category_ids = seed(args.wallets, args.categories)
+
+    counts, lock = {}, threading.Lock()
+    threads = [threading.Thread(target=worker, args=(app, args.seed + i, args.operations, wallet_ids, category_ids, counts, lock))
+               for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f'{args.threads} threads x {args.operations} operations on {args.wallets} wallet(s) in {elapsed:.1f}s')
+    for key in sorted(counts):
+        print(f'  {key:<20} {counts[key]:>6}')
+
+    with app.app_context():
+        problems = verify(wallet_ids, category_ids)
+    if problems:
+        print('FAILED')
+        for problem in problems:
+            print(f'  {problem}')
+        sys.exit(1)
+    print('OK: wallet balances, budgets, summary and rollups match the ledger')
+
+
+if __name__ == '__main__':
+    main()
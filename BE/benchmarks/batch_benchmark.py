@@ -0,0 +1,62 @@
+# So sánh trang ví gọi getWallets + getDeletedWallets bằng 2 request riêng với 1 request /batch,
+# và kiểm tra batch atomic huỷ toàn bộ khi một request con lỗi
+# Chạy từ thư mục BE: python -m benchmarks.batch_benchmark [--repeat 200] [--rtt-ms 150]
+# --rtt-ms: độ trễ mạng giả định mỗi lượt HTTP (mạng di động) để ước tính thời gian phía client
+# Thoát với mã 1 nếu kết quả batch khác khi gọi riêng hoặc batch atomic lỗi vẫn ghi dữ liệu
+import argparse, logging, sys
+from extensions import db
+from .common import make_app, timings, stats
+
+PAGE = [{'method': 'GET', 'path': '/wallets/'}, {'method': 'GET', 'path': '/wallets/deleted'}]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=150)
+    parser.add_argument('--wallets', type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/auth/register', json={'username': 'batch', 'email': 'batch@example.com', 'password': 'Batch123!'})
+    token = client.post('/auth/login', json={'email': 'batch@example.com', 'password': 'Batch123!'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    for i in range(args.wallets):
+        client.post('/wallets/create', json={'name': f'Wallet {i}', 'balance': 1000}, headers=headers)
+
+    problems = []
+    separate = [client.get(item['path'], headers=headers).get_json() for item in PAGE]
+    batched = [r['body'] for r in client.post('/batch/', json={'requests': PAGE}, headers=headers).get_json()['responses']]
+    if separate != batched:
+        problems.append('batch responses differ from separate requests')
+
+    separate_ms = stats(timings(lambda: [client.get(item['path'], headers=headers) for item in PAGE], args.repeat))['p50_ms']
+    batch_ms = stats(timings(lambda: client.post('/batch/', json={'requests': PAGE}, headers=headers), args.repeat))['p50_ms']
+    print(f'{"mode":<10} {"round trips":>11} {"server p50 ms":>14} {f"client ms @ {args.rtt_ms:g}ms RTT":>24}')
+    print(f'{"separate":<10} {len(PAGE):>11} {separate_ms:>14.2f} {separate_ms + len(PAGE) * args.rtt_ms:>24.1f}')
+    print(f'{"batch":<10} {1:>11} {batch_ms:>14.2f} {batch_ms + args.rtt_ms:>24.1f}')
+
+    # Request con thứ hai lỗi (thiếu name) nên ví tạo ở request con thứ nhất cũng bị huỷ
+    before = client.get('/wallets/?per_page=100', headers=headers).get_json()['total_items']
+    result = client.post('/batch/', json={'atomic': True, 'requests': [
+        {'method': 'POST', 'path': '/wallets/create', 'body': {'name': 'Rolled back'}},
+        {'method': 'POST', 'path': '/wallets/create', 'body': {}}
+    ]}, headers=headers)
+    after = client.get('/wallets/?per_page=100', headers=headers).get_json()['total_items']
+    if result.status_code != 400 or result.get_json()['committed'] or after != before:
+        problems.append(f'atomic batch was not rolled back: status {result.status_code}, wallets {before} -> {after}')
+
+    if problems:
+        print('FAILED')
+        for problem in problems:
+            print(f'  {problem}')
+        sys.exit(1)
+    print('OK: batch responses match separate requests and a failed atomic batch saved nothing')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# Hàm dùng chung cho các benchmark
+import os, tempfile, time
+from app import create_app
+
+
+# Tạo app với database sqlite tạm (hoặc URI được truyền vào)
+def make_app(database_uri=None, **config):
+    if not database_uri:
+        database_uri = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+
+    return create_app(**{
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'JWT_SECRET_KEY': 'benchmark',
+        **config
+    })
+
+
+# Thời gian (ms) của mỗi lần gọi fn
+def timings(fn, repeat):
+    result = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        result.append((time.perf_counter() - started) * 1000)
+    return result
+
+
+# Thống kê mean/p50/p95/min từ danh sách thời gian
+def stats(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered), 3),
+        'p50_ms': round(ordered[len(ordered) // 2], 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'min_ms': round(ordered[0], 3)
+    }
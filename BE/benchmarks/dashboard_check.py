@@ -0,0 +1,152 @@
+# Kiểm tra GET /dashboard/: số câu SQL cố định (<= DashboardService.QUERY_BUDGET) dù user có ít hay nhiều dữ liệu,
+# số đã chi của ngân sách khớp ledger, và so sánh với việc gọi riêng từng endpoint như trước
+# Chạy từ thư mục BE: python -m benchmarks.dashboard_check [--wallets 30] [--transactions 2000]
+# Thoát với mã 1 nếu vượt ngân sách câu SQL, số câu SQL tăng theo dữ liệu hoặc số liệu sai
+import argparse, datetime, logging, random, sys
+from decimal import Decimal
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func
+from extensions import db
+from models import User, Wallet, Category, Budget, Goal, Transaction
+from services.transaction_service import TransactionService
+from services.dashboard_service import DashboardService
+from .common import make_app, timings, stats
+
+SEPARATE_ENDPOINTS = ['/summary/', '/wallets/?per_page=100', '/goals/?per_page=100', '/budgets/?per_page=100',
+                      '/categories/?per_page=100', '/transactions/?per_page=10']
+
+
+def seed(name, wallets, categories, goals, transactions):
+    rng = random.Random(7)
+    user = User(username=name, email=f'{name}@example.com', password_hash='-')
+    db.session.add(user)
+    db.session.flush()
+    user_id = user.id
+    wallet_ids, category_ids = [], []
+    for i in range(wallets):
+        wallet = Wallet(user_id=user.id, name=f'Wallet {i}', balance=10_000_000)
+        db.session.add(wallet)
+        db.session.flush()
+        wallet_ids.append(wallet.id)
+    for i in range(categories):
+        category = Category(user_id=user.id, name=f'Category {i}')
+        db.session.add(category)
+        db.session.flush()
+        # Một nửa ngân sách có kỳ đã qua: giao dịch chi hôm nay vẫn bị trừ vào ngân sách nên vẫn tính là đã chi
+        period = (datetime.date(2025, 1, 1), datetime.date(2025, 1, 31)) if i % 2 == 0 else (None, None)
+        db.session.add(Budget(user.id, category.id, 5_000_000, *period))
+        category_ids.append(category.id)
+    for i in range(goals):
+        goal = Goal(user_id=user.id, name=f'Goal {i}', target_amount=1_000_000, saved_amount=rng.randint(0, 10) * 100_000,
+                    deadline=datetime.date.today() + datetime.timedelta(days=90))
+        db.session.add(goal)
+    db.session.commit()
+    created = 0
+    for _ in range(transactions):
+        result = TransactionService.create_transaction_service(user_id, {
+            'wallet_id': rng.choice(wallet_ids),
+            'category_id': rng.choice(category_ids),
+            'amount': rng.randint(1, 100) * 100,
+            'transaction_type': rng.choice(['Income', 'Expense'])
+        })
+        created += result['status_code'] == 201
+    db.session.remove()
+    return user_id, created
+
+
+# Số đã chi của từng ngân sách phải bằng tổng giao dịch chi của danh mục (kể cả ngoài kỳ ngân sách), hạn mức = số ban đầu
+def verify_budgets(user_id, dashboard):
+    problems = []
+    spent = dict(db.session.query(Transaction.category_id, func.sum(Transaction.amount))
+                 .filter(Transaction.user_id == user_id, Transaction.is_deleted == False, Transaction.transaction_type == 'Expense')
+                 .group_by(Transaction.category_id).all())
+    for budget in dashboard['budgets']:
+        expected = Decimal(str(spent.get(budget['category_id'], 0)))
+        if Decimal(str(budget['spent'])) != expected:
+            problems.append(f'budget {budget["id"]}: spent {budget["spent"]} != ledger {expected}')
+        if Decimal(str(budget['limit'])) != Decimal(5_000_000):
+            problems.append(f'budget {budget["id"]}: limit {budget["limit"]} != 5000000')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--wallets', type=int, default=30)
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--goals', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    # Tắt cache kết quả để mỗi request đều chạy truy vấn thật, TESTING: vượt ngân sách câu SQL thì raise
+    app = make_app(CACHE_BACKEND='none', TESTING=True)
+    counter = {'queries': 0}
+    problems = []
+    sizes = {'small': (1, 1, 1, 3), 'large': (args.wallets, args.categories, args.goals, args.transactions)}
+    users = {}
+    with app.app_context():
+        db.create_all()
+        for name, size in sizes.items():
+            users[name], created = seed(name, *size)
+            if created != size[3]:
+                problems.append(f'{name}: seeded {created} of {size[3]} transactions')
+        if problems:
+            print('FAILED')
+            for problem in problems:
+                print(f'  {problem}')
+            sys.exit(1)
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(*_):
+            counter['queries'] += 1
+
+    client = app.test_client()
+    print(f'{"user":<6} {"service queries":>16} {"request queries":>16} {"separate queries":>17} {"dashboard p50 ms":>17} {"separate p50 ms":>16}')
+    for name, user_id in users.items():
+        with app.test_request_context():
+            DashboardService.get_dashboard_service(user_id)  # Tạo dòng summary lần đầu
+            db.session.remove()
+            counter['queries'] = 0
+            dashboard = DashboardService.get_dashboard_service(user_id)
+            service_queries = counter['queries']
+            if len(dashboard['recent_transactions']) != min(sizes[name][3], 10):
+                problems.append(f'{name}: {len(dashboard["recent_transactions"])} recent transactions returned')
+            problems += verify_budgets(user_id, dashboard)
+            db.session.remove()
+        if service_queries > DashboardService.QUERY_BUDGET:
+            problems.append(f'{name}: {service_queries} queries > budget {DashboardService.QUERY_BUDGET}')
+
+        with app.app_context():
+            headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+        client.get('/dashboard/', headers=headers)  # Bỏ qua chi phí một lần (connection mới, PRAGMA...)
+        counter['queries'] = 0
+        response = client.get('/dashboard/', headers=headers)
+        request_queries = counter['queries']
+        if response.status_code != 200:
+            problems.append(f'{name}: GET /dashboard/ returned {response.status_code}')
+
+        counter['queries'] = 0
+        for url in SEPARATE_ENDPOINTS:
+            client.get(url, headers=headers)
+        separate_queries = counter['queries']
+
+        dashboard_ms = stats(timings(lambda: client.get('/dashboard/', headers=headers), args.repeat))['p50_ms']
+        separate_ms = stats(timings(lambda: [client.get(url, headers=headers) for url in SEPARATE_ENDPOINTS], args.repeat))['p50_ms']
+        print(f'{name:<6} {service_queries:>16} {request_queries:>16} {separate_queries:>17} {dashboard_ms:>17.2f} {separate_ms:>16.2f}')
+        users[name] = (service_queries, request_queries)
+
+    if users['small'] != users['large']:
+        problems.append(f'query count depends on data size: small {users["small"]} != large {users["large"]}')
+
+    if problems:
+        print('FAILED')
+        for problem in problems:
+            print(f'  {problem}')
+        sys.exit(1)
+    print(f'OK: dashboard uses a constant {users["large"][0]} queries (budget {DashboardService.QUERY_BUDGET}) and budgets match the ledger')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# Sinh dữ liệu giả: users, wallets, categories, budgets, goals, transactions
+# Chạy từ thư mục BE: python -m benchmarks.data_generator --transactions 100000 --database-uri sqlite:////tmp/bench.db
+import argparse, random, time
+from datetime import datetime, timedelta, date
+from extensions import db
+from models import User, Wallet, Goal, Category, Budget, Transaction
+from services.report_service import ReportService
+from .common import make_app
+
+CATEGORY_NAMES = ['Food', 'Transport', 'Rent', 'Utilities', 'Shopping', 'Health', 'Entertainment', 'Education', 'Travel', 'Salary']
+GOAL_NAMES = ['Emergency fund', 'New laptop', 'Vacation', 'House', 'Car']
+NOTES = ['', 'coffee', 'groceries', 'taxi', 'monthly bill', 'salary', 'gift', 'dinner with friends', 'online order']
+CHUNK_SIZE = 50000
+
+
+def insert(model, rows):
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+
+
+# Sinh dữ liệu, trả về thông tin các id để benchmark sử dụng
+# transactions_per_user quyết định số user: users = transactions / transactions_per_user
+def generate(transactions=10000, transactions_per_user=2000, seed=42, years=3, rebuild_rollups=True, log=print):
+    rng = random.Random(seed)
+    users = max(1, transactions // transactions_per_user)
+    started = time.perf_counter()
+
+    # Users
+    insert(User, [{
+        'id': user_id,
+        'username': f'user{user_id}',
+        'email': f'user{user_id}@example.com',
+        'password_hash': '-',
+        'active': True
+    } for user_id in range(1, users + 1)])
+
+    # Wallets, categories, budgets, goals
+    wallets, categories, goals, budgets = [], [], [], []
+    wallets_by_user, categories_by_user = {}, {}
+    today = date.today()
+    for user_id in range(1, users + 1):
+        for i in range(rng.randint(2, 4)):
+            wallets.append({
+                'id': len(wallets) + 1,
+                'user_id': user_id,
+                'name': f'Wallet {i + 1}',
+                'balance': rng.randint(10_000, 100_000) * 1000,
+                'currency': 'VND',
+                'is_deleted': False
+            })
+            wallets_by_user.setdefault(user_id, []).append(len(wallets))
+
+        for name in rng.sample(CATEGORY_NAMES, rng.randint(5, len(CATEGORY_NAMES))):
+            categories.append({'id': len(categories) + 1, 'user_id': user_id, 'name': name, 'is_deleted': False})
+            categories_by_user.setdefault(user_id, []).append(len(categories))
+            limit = rng.randint(1_000, 20_000) * 1000
+            budgets.append({
+                'user_id': user_id,
+                'category_id': len(categories),
+                'amount': limit,
+                'limit_amount': limit,
+                'start_date': today.replace(day=1),
+                'end_date': today.replace(day=1) + timedelta(days=30),
+                'is_deleted': False
+            })
+
+        for name in rng.sample(GOAL_NAMES, rng.randint(1, 3)):
+            target = rng.randint(5_000, 500_000) * 1000
+            goals.append({
+                'user_id': user_id,
+                'name': name,
+                'target_amount': target,
+                'saved_amount': rng.randint(0, target // 1000) * 1000,
+                'deadline': today + timedelta(days=rng.randint(30, 1000)),
+                'is_deleted': False
+            })
+
+    insert(Wallet, wallets)
+    insert(Category, categories)
+    insert(Budget, budgets)
+    insert(Goal, goals)
+    db.session.commit()
+
+    # Transactions, insert theo chunk để bộ nhớ không tăng theo quy mô
+    span_minutes = years * 365 * 24 * 60
+    start = datetime.utcnow() - timedelta(minutes=span_minutes)
+    rows = []
+    for i in range(transactions):
+        user_id = rng.randint(1, users)
+        transaction_type = 'Income' if rng.random() < 0.3 else 'Expense'
+        rows.append({
+            'user_id': user_id,
+            'wallet_id': rng.choice(wallets_by_user[user_id]),
+            'goal_id': None,
+            'category_id': rng.choice(categories_by_user[user_id]),
+            'amount': rng.randint(10, 5000) * 1000,
+            'transaction_type': transaction_type,
+            'note': rng.choice(NOTES),
+            'date': start + timedelta(minutes=rng.randint(0, span_minutes)),
+            'is_deleted': rng.random() < 0.02
+        })
+        if len(rows) >= CHUNK_SIZE:
+            insert(Transaction, rows)
+            db.session.commit()
+            rows = []
+            log(f'Inserted {i + 1}/{transactions} transactions ({(i + 1) / (time.perf_counter() - started):.0f} rows/s)')
+    insert(Transaction, rows)
+    db.session.commit()
+
+    if rebuild_rollups:
+        ReportService.rebuild_rollups()
+
+    log(f'Generated {users} users, {len(wallets)} wallets, {len(categories)} categories, {len(goals)} goals, '
+        f'{transactions} transactions in {time.perf_counter() - started:.1f}s')
+    return {'users': users, 'wallets': len(wallets), 'categories': len(categories), 'goals': len(goals), 'transactions': transactions}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transactions', type=int, default=10000, help='Số giao dịch (10k - 10M)')
+    parser.add_argument('--transactions-per-user', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-uri', default=None, help='Mặc định là file sqlite tạm')
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        generate(args.transactions, args.transactions_per_user, args.seed)
+        print(f'Database: {app.config["SQLALCHEMY_DATABASE_URI"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# Benchmark: độ trễ của các API danh sách khi bảng transactions lớn dần
+# Chạy từ thư mục BE: python -m benchmarks.list_indexes_benchmark [--sizes 10000,100000,1000000]
+import argparse, random
+from datetime import datetime, timedelta
+from extensions import db
+from models import User, Wallet, Category, Transaction
+from services.transaction_service import TransactionService
+from services.wallet_service import WalletService
+from .common import make_app, timings
+
+
+USERS = 1000
+
+
+# Thêm dữ liệu giả cho tới khi bảng transactions đạt target_size dòng
+def fill(current_size, target_size):
+    start = datetime(2020, 1, 1)
+    rows = []
+    for i in range(current_size, target_size):
+        user_id = random.randint(1, USERS)
+        rows.append({
+            'user_id': user_id,
+            'wallet_id': user_id,
+            'category_id': user_id,
+            'amount': random.randint(1, 1000) * 1000,
+            'transaction_type': random.choice(['Income', 'Expense']),
+            'note': '',
+            'date': start + timedelta(minutes=i),
+            'is_deleted': random.random() < 0.05
+        })
+        if len(rows) >= 50000:
+            db.session.execute(Transaction.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Transaction.__table__.insert(), rows)
+    db.session.commit()
+
+
+def seed_users():
+    db.session.execute(User.__table__.insert(), [
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': '-', 'active': True}
+        for i in range(1, USERS + 1)
+    ])
+    db.session.execute(Wallet.__table__.insert(), [
+        {'id': i, 'user_id': i, 'name': 'Main', 'balance': 0, 'currency': 'VND', 'is_deleted': False}
+        for i in range(1, USERS + 1)
+    ])
+    db.session.execute(Category.__table__.insert(), [
+        {'id': i, 'user_id': i, 'name': 'Food', 'is_deleted': False}
+        for i in range(1, USERS + 1)
+    ])
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    return min(timings(fn, repeat))
+
+
+# existence_check có cache theo request, xoá cache để đo đúng câu query
+def uncached_existence_check(model, model_id, user_id):
+    WalletService.identity_cache().clear()
+    return WalletService.existence_check(model, model_id, user_id, is_deleted=False)
+
+
+def drop_indexes():
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(bind=db.engine, checkfirst=True)
+
+
+def create_indexes():
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    app = make_app()
+
+    with app.app_context():
+        db.create_all()
+        seed_users()
+
+        print(f'{"rows":>10} {"indexes":>8} {"transactions ms":>16} {"wallets ms":>11} {"existence ms":>13}')
+        current = 0
+        for size in sizes:
+            fill(current, size)
+            current = size
+
+            for indexed in (False, True):
+                create_indexes() if indexed else drop_indexes()
+                user_id = random.randint(1, USERS)
+                list_ms = timed(lambda: TransactionService.get_transactions_service(user_id, 1, 10), args.repeat)
+                wallet_ms = timed(lambda: WalletService.get_wallets_service(user_id, 1, 10), args.repeat)
+                check_ms = timed(lambda: uncached_existence_check(Wallet, user_id, user_id), args.repeat)
+                print(f'{size:>10} {"yes" if indexed else "no":>8} {list_ms:>16.2f} {wallet_ms:>11.2f} {check_ms:>13.2f}')
+                db.session.remove()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# So sánh đường đọc danh sách: ORM (load entity + paginate) và Core chỉ select các cột trả về (ListService)
+# Chạy từ thư mục BE: python -m benchmarks.list_projection_benchmark [--rows 10000] [--note-size 200] [--repeat 10]
+import argparse, json, tracemalloc
+from extensions import db
+from models import Transaction
+from services.transaction_service import TransactionService
+from .common import make_app, timings, stats
+from .data_generator import generate
+
+
+# Đường đọc cũ: entity ORM đầy đủ (gồm cả note) qua paginate của Flask-SQLAlchemy
+def orm_list(user_id, page, per_page):
+    transactions = Transaction.query.filter_by(user_id=user_id, is_deleted=False).paginate(page=page, per_page=per_page, error_out=False)
+    return [{
+        'id': t.id,
+        'amount': float(t.amount),
+        'transaction_type': t.transaction_type,
+        'date': t.date.isoformat()
+    } for t in transactions.items]
+
+
+def core_list(user_id, page, per_page):
+    return TransactionService.get_transactions_service(user_id, page, per_page)['transactions']
+
+
+# Bộ nhớ cấp phát cao nhất (KiB) trong một lần gọi
+def peak_memory(fn):
+    db.session.remove()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.session.remove()
+    return round(peak / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000, help='Số dòng mỗi trang')
+    parser.add_argument('--note-size', type=int, default=200, help='Độ dài note của mỗi giao dịch')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        generate(args.rows, transactions_per_user=args.rows * 2, log=lambda message: None)
+        if args.note_size:
+            db.session.execute(Transaction.__table__.update().values(note='x' * args.note_size))
+            db.session.commit()
+
+        per_page = args.rows
+        assert len(orm_list(1, 1, per_page)) == len(core_list(1, 1, per_page))
+        results = {}
+        print(f'{"path":<6} {"rows":>7} {"p50 ms":>8} {"rows/s":>10} {"peak KiB":>10}')
+        for name, fn in [('orm', orm_list), ('core', core_list)]:
+            def call():
+                fn(1, 1, per_page)
+                db.session.remove()
+            call()  # Làm nóng cache compile
+            timing = stats(timings(call, args.repeat))
+            rows = len(fn(1, 1, per_page))
+            results[name] = {
+                'rows': rows,
+                **timing,
+                'rows_per_second': round(rows / (timing['p50_ms'] / 1000)),
+                'peak_kib': peak_memory(call)
+            }
+            r = results[name]
+            print(f'{name:<6} {rows:>7} {r["p50_ms"]:>8.1f} {r["rows_per_second"]:>10} {r["peak_kib"]:>10}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': args.rows, 'note_size': args.note_size, 'results': results}, f, indent=2)
+        print(f'Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# Benchmark số lần đăng nhập/giây (mỗi core) với từng cấu hình hash password
+# Chạy từ thư mục BE: python -m benchmarks.password_hash_benchmark [--methods scrypt:16384:8:1 pbkdf2:sha256:600000] [--logins 20]
+import argparse, os, time
+from concurrent.futures import ThreadPoolExecutor
+from extensions import db, password_hasher
+from models import User
+from .common import make_app, timings, stats
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:1000000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1'
+]
+PASSWORD = 'Benchmark@123'
+
+
+# Gửi cùng lúc `clients` request đăng nhập, đếm số request thành công/bị từ chối (503)
+def burst(client, clients):
+    def login(_):
+        return client.post('/auth/login', json={'email': 'bench@example.com', 'password': PASSWORD}).status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        codes = list(pool.map(login, range(clients)))
+    elapsed = time.perf_counter() - started
+    return codes.count(200), codes.count(503), elapsed
+
+
+def run(method, logins, workers, queue_size, clients):
+    app = make_app(PASSWORD_HASH_METHOD=method, PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE_SIZE=queue_size)
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+        password_hash = user.password_hash
+
+    # Thời gian một lần verify trên một core
+    verify = stats(timings(lambda: password_hasher.verify(password_hash, PASSWORD), logins))
+    # Đăng nhập qua route (verify + query + tạo JWT)
+    login = stats(timings(lambda: client.post('/auth/login', json={'email': 'bench@example.com', 'password': PASSWORD}), logins))
+    ok, rejected, elapsed = burst(client, clients)
+    return {
+        'method': method,
+        'verify_p50_ms': verify['p50_ms'],
+        'logins_per_second_per_core': round(1000 / login['p50_ms'], 2),
+        'burst_ok': ok,
+        'burst_rejected': rejected,
+        'burst_logins_per_second': round(ok / elapsed, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--logins', type=int, default=20, help='Số lần đo cho mỗi cấu hình')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--queue-size', type=int, default=16)
+    parser.add_argument('--clients', type=int, default=64, help='Số request đồng thời trong burst')
+    args = parser.parse_args()
+
+    print(f'workers={args.workers} queue_size={args.queue_size} burst_clients={args.clients}')
+    print(f'{"method":<24} {"verify ms":>10} {"logins/s/core":>14} {"burst ok":>9} {"rejected":>9} {"burst/s":>8}')
+    for method in args.methods:
+        r = run(method, args.logins, args.workers, args.queue_size, args.clients)
+        print(f'{r["method"]:<24} {r["verify_p50_ms"]:>10.1f} {r["logins_per_second_per_core"]:>14.2f} '
+              f'{r["burst_ok"]:>9} {r["burst_rejected"]:>9} {r["burst_logins_per_second"]:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Đếm số câu SQL mỗi endpoint phát sinh (giới hạn được kiểm tra trong tests/test_query_counts.py)
+# Chạy từ thư mục BE: python -m benchmarks.query_count_benchmark
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from extensions import db
+from models import User, Wallet, Category, Budget
+from .common import make_app
+
+
+def seed():
+    user = User(username='bench', email='bench@example.com')
+    user.password_hash = '-'
+    db.session.add(user)
+    db.session.flush()
+    wallets = [Wallet(user_id=user.id, name=f'Wallet {i}', balance=1_000_000) for i in range(2)]
+    categories = [Category(user_id=user.id, name=f'Category {i}') for i in range(2)]
+    db.session.add_all(wallets + categories)
+    db.session.flush()
+    for category in categories:
+        db.session.add(Budget(user.id, category.id, amount=1_000_000))
+    db.session.commit()
+    return user.id, [w.id for w in wallets], [c.id for c in categories]
+
+
+# Số câu SQL của từng endpoint ở trạng thái ổn định: user đã có dòng summary, rollup và version của các danh mục
+# Trả về [(endpoint, status code, số câu SQL)], counter được before_cursor_execute tăng lên
+def measure_endpoints(client, headers, wallet_ids, category_ids, counter):
+    for category_id in category_ids:
+        client.post('/transactions/create', headers=headers,
+                    json={'wallet_id': wallet_ids[0], 'category_id': category_id, 'amount': 1000, 'transaction_type': 'Expense'})
+    results = []
+
+    def measure(name, method, url, json=None):
+        counter['queries'] = 0
+        response = getattr(client, method)(url, json=json, headers=headers)
+        results.append((name, response.status_code, counter['queries']))
+        return response.get_json()
+
+    created = measure('POST /transactions/create', 'post', '/transactions/create',
+                      {'wallet_id': wallet_ids[0], 'category_id': category_ids[0], 'amount': 1000, 'transaction_type': 'Expense'})
+    transaction_id = created['transaction']['id']
+    measure('GET /transactions/<id>', 'get', f'/transactions/{transaction_id}')
+    measure('PUT /transactions/update/<id>', 'put', f'/transactions/update/{transaction_id}',
+            {'wallet_id': wallet_ids[1], 'category_id': category_ids[1], 'amount': 2000})
+    measure('PATCH /transactions/soft_delete', 'patch', f'/transactions/soft_delete/{transaction_id}')
+    measure('PATCH /transactions/restore', 'patch', f'/transactions/restore/{transaction_id}')
+    measure('DELETE /transactions/delete', 'delete', f'/transactions/delete/{transaction_id}')
+    measure('GET /transactions/', 'get', '/transactions/')
+    measure('GET /wallets/', 'get', '/wallets/')
+    measure('GET /wallets/<id>', 'get', f'/wallets/{wallet_ids[0]}')
+    return results
+
+
+def main():
+    app = make_app()
+    counter = {'queries': 0}
+
+    with app.app_context():
+        db.create_all()
+        user_id, wallet_ids, category_ids = seed()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(*args):
+            counter['queries'] += 1
+
+    print(f'{"endpoint":<32} {"code":>4} {"queries":>8}')
+    for name, status_code, queries in measure_endpoints(app.test_client(), headers, wallet_ids, category_ids, counter):
+        print(f'{name:<32} {status_code:>4} {queries:>8}')
+
+
+if __name__ == '__main__':
+    main()
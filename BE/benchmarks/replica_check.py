@@ -0,0 +1,73 @@
+# Kiểm tra định tuyến read replica với bản sao file SQLite (flask sync-replica) làm replica
+# Chạy từ thư mục BE: python -m benchmarks.replica_check [--max-lag 1]
+# Thoát với mã 1 nếu request GET không đọc từ replica, đọc-sau-ghi không về primary hoặc lag guard không chuyển về primary
+import argparse, logging, os, sys, tempfile, time
+from extensions import db, replica_monitor
+from services.wallet_service import WalletService
+from .common import make_app
+
+
+def wallet_names(client, headers):
+    return sorted(w['name'] for w in client.get('/wallets/?per_page=100', headers=headers).get_json()['wallets'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-lag', type=float, default=1, help='DB_REPLICA_MAX_LAG_SECONDS')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    folder = tempfile.mkdtemp()
+    app = make_app(
+        f'sqlite:///{os.path.join(folder, "primary.db")}',
+        DB_REPLICA_URL=f'sqlite:///{os.path.join(folder, "replica.db")}',
+        DB_REPLICA_MAX_LAG_SECONDS=args.max_lag,
+        DB_REPLICA_CHECK_SECONDS=0
+    )
+    runner = app.test_cli_runner()
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+
+    client.post('/auth/register', json={'username': 'replica', 'email': 'replica@example.com', 'password': 'Replica123!'})
+    token = client.post('/auth/login', json={'email': 'replica@example.com', 'password': 'Replica123!'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/wallets/create', json={'name': 'Copied', 'balance': 1000}, headers=headers)
+    runner.invoke(args=['sync-replica'])
+    client.post('/wallets/create', json={'name': 'Primary only', 'balance': 500}, headers=headers)  # Chưa có trên replica
+
+    checks = []
+    # Dòng tổng hợp được tạo ở request GET đầu tiên: phải tính từ primary, không phải từ replica đang trễ
+    summary = client.get('/summary/', headers=headers).get_json()['summary']
+    checks.append(('GET /summary builds the summary from the primary', summary['total_balance'] == 1500))
+    dashboard = client.get('/dashboard/', headers=headers).get_json()
+    checks.append(('GET /dashboard reads from the primary',
+                   dashboard['totals']['total_balance'] == sum(w['balance'] for w in dashboard['wallets']) == 1500))
+    checks.append(('GET reads from the replica', wallet_names(client, headers) == ['Copied']))
+
+    with app.test_request_context('/wallets/', method='GET'):
+        before = [w['name'] for w in WalletService.get_wallets_service(1, 1, 100)['wallets']]
+        WalletService.create_wallet_service(1, {'name': 'Written in request'})
+        after = [w['name'] for w in WalletService.get_wallets_service(1, 1, 100)['wallets']]
+        db.session.remove()
+    checks.append(('reads before a write use the replica', before == ['Copied']))
+    checks.append(('reads after a write in the same request use the primary', 'Written in request' in after))
+
+    time.sleep(args.max_lag + 0.5)
+    checks.append(('lagging replica falls back to the primary', 'Primary only' in wallet_names(client, headers)))
+    checks.append(('lag guard reports the lag', replica_monitor.lag is not None and replica_monitor.lag > args.max_lag))
+
+    runner.invoke(args=['sync-replica'])
+    summary = client.get('/summary/', headers=headers).get_json()['summary']
+    checks.append(('stored summary matches the wallets', summary['total_balance'] == 1500))
+    checks.append(('fresh copy is used again', wallet_names(client, headers) == ['Copied', 'Primary only', 'Written in request']
+                   and replica_monitor.healthy))
+
+    for name, passed in checks:
+        print(f'{"ok  " if passed else "FAIL"} {name}')
+    if not all(passed for _, passed in checks):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# Benchmark từng method của các *Service (list, get, create, update, soft delete, restore)
+# Chạy từ thư mục BE: python -m benchmarks.service_benchmark --transactions 100000 --output results.json [--compare old.json]
+import argparse, json, platform, subprocess
+from datetime import datetime, date, timedelta
+from extensions import db
+from models import Wallet, Category, Transaction
+from services.wallet_service import WalletService
+from services.category_service import CategoryService
+from services.goal_service import GoalService
+from services.budget_service import BudgetService
+from services.transaction_service import TransactionService
+from .common import make_app, timings, stats
+from .data_generator import generate
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Mỗi lần gọi service dùng session mới, giống một request; service trả lỗi thì dừng benchmark
+def request_call(fn):
+    try:
+        result = fn()
+    finally:
+        db.session.remove()
+    if isinstance(result, dict) and result.get('status_code', 200) >= 400:
+        raise RuntimeError(f'Service returned {result["status_code"]}: {result.get("message")}')
+    return result
+
+
+# Đo create -> get -> update -> soft delete -> restore cho một service
+def crud_suite(name, repeat, create, get, update, soft_delete, restore, list_fn):
+    results = {}
+    created_ids = []
+
+    def run_create():
+        created_ids.append(request_call(create))
+
+    results[f'{name}.list'] = stats(timings(lambda: request_call(list_fn), repeat))
+    results[f'{name}.create'] = stats(timings(run_create, repeat))
+    results[f'{name}.get'] = stats(timings(lambda: request_call(lambda: get(created_ids[0])), repeat))
+
+    ids = iter(created_ids)
+    results[f'{name}.update'] = stats(timings(lambda: request_call(lambda: update(next(ids))), repeat))
+
+    ids = iter(created_ids)
+    results[f'{name}.soft_delete'] = stats(timings(lambda: request_call(lambda: soft_delete(next(ids))), repeat))
+
+    ids = iter(created_ids)
+    results[f'{name}.restore'] = stats(timings(lambda: request_call(lambda: restore(next(ids))), repeat))
+    return results
+
+
+def run(repeat, user_id=1):
+    counter = iter(range(1, 10 ** 9))
+    wallet_id = Wallet.query.filter_by(user_id=user_id, is_deleted=False).first().id
+    category_ids = [c.id for c in Category.query.filter_by(user_id=user_id, is_deleted=False).all()]
+    db.session.remove()
+    deadline = (date.today() + timedelta(days=365)).isoformat()
+    results = {}
+
+    results.update(crud_suite(
+        'WalletService', repeat,
+        create=lambda: WalletService.create_wallet_service(user_id, {'name': f'Bench wallet {next(counter)}', 'balance': 1000})['wallet']['id'],
+        get=lambda i: WalletService.get_wallet_service(user_id, i),
+        update=lambda i: WalletService.update_wallet_service(user_id, i, {'name': f'Renamed wallet {next(counter)}'}),
+        soft_delete=lambda i: WalletService.soft_delete_wallet_service(user_id, i),
+        restore=lambda i: WalletService.restore_wallet_service(user_id, i),
+        list_fn=lambda: WalletService.get_wallets_service(user_id, 1, 10)
+    ))
+
+    results.update(crud_suite(
+        'CategoryService', repeat,
+        create=lambda: CategoryService.create_category_service(user_id, {'name': f'Bench category {next(counter)}'})['category']['id'],
+        get=lambda i: CategoryService.get_category_service(user_id, i),
+        update=lambda i: CategoryService.update_category_service(user_id, i, {'name': f'Renamed category {next(counter)}'}),
+        soft_delete=lambda i: CategoryService.soft_delete_category_service(user_id, i),
+        restore=lambda i: CategoryService.restore_category_service(user_id, i),
+        list_fn=lambda: CategoryService.get_categories_service(user_id, 1, 10)
+    ))
+
+    results.update(crud_suite(
+        'GoalService', repeat,
+        create=lambda: GoalService.create_goal_service(user_id, {'name': f'Bench goal {next(counter)}', 'target_amount': 1_000_000, 'deadline': deadline})['goal']['id'],
+        get=lambda i: GoalService.get_goal_service(user_id, i),
+        update=lambda i: GoalService.update_goal_service(user_id, i, {'target_amount': 2_000_000}),
+        soft_delete=lambda i: GoalService.soft_delete_goal_service(user_id, i),
+        restore=lambda i: GoalService.restore_goal_service(user_id, i),
+        list_fn=lambda: GoalService.get_goals_service(user_id, 1, 10)
+    ))
+
+    results.update(crud_suite(
+        'BudgetService', repeat,
+        create=lambda: BudgetService.create_budget_service(user_id, {'category_id': category_ids[0], 'amount': 1_000_000})['budget']['id'],
+        get=lambda i: BudgetService.get_budget_service(user_id, i),
+        update=lambda i: BudgetService.update_budget_service(user_id, i, {'amount': 2_000_000}),
+        soft_delete=lambda i: BudgetService.soft_delete_budget_service(user_id, i),
+        restore=lambda i: BudgetService.restore_budget_service(user_id, i),
+        list_fn=lambda: BudgetService.get_budgets_service(user_id, 1, 10)
+    ))
+
+    results.update(crud_suite(
+        'TransactionService', repeat,
+        create=lambda: TransactionService.create_transaction_service(user_id, {
+            'wallet_id': wallet_id, 'category_id': category_ids[0], 'amount': 1000, 'transaction_type': 'Income'
+        })['transaction']['id'],
+        get=lambda i: TransactionService.get_transaction_service(user_id, i),
+        update=lambda i: TransactionService.update_transaction_service(user_id, i, {'amount': 2000}),
+        soft_delete=lambda i: TransactionService.soft_delete_transaction_service(user_id, i),
+        restore=lambda i: TransactionService.restore_transaction_service(user_id, i),
+        list_fn=lambda: TransactionService.get_transactions_service(user_id, 1, 10)
+    ))
+
+    # Các method đọc khác đáng theo dõi
+    results['TransactionService.list_cursor'] = stats(timings(lambda: request_call(lambda: TransactionService.get_transactions_cursor_service(user_id, limit=10)), repeat))
+    results['TransactionService.list_deep_page'] = stats(timings(lambda: request_call(lambda: TransactionService.get_transactions_service(user_id, 100, 10)), repeat))
+    return results
+
+
+# In chênh lệch so với lần chạy trước
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    print(f'{"method":<40} {"before p50":>11} {"after p50":>10} {"change":>8}')
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['p50_ms'], current['p50_ms']
+        change = (after - before) / before * 100 if before else 0
+        print(f'{name:<40} {before:>11.3f} {after:>10.3f} {change:>+7.1f}%')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transactions', type=int, default=10000, help='Quy mô dữ liệu (10k - 10M giao dịch)')
+    parser.add_argument('--transactions-per-user', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--database-uri', default=None, help='Dùng database có sẵn thay vì sinh dữ liệu mới')
+    parser.add_argument('--output', default='service_benchmark.json')
+    parser.add_argument('--compare', default=None, help='File JSON kết quả cũ để so sánh')
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        if not args.database_uri:
+            generate(args.transactions, args.transactions_per_user)
+        total = Transaction.query.count()
+        db.session.remove()
+
+        results = run(args.repeat)
+
+    report = {
+        'meta': {
+            'git_commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+            'transactions': total,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f'{"method":<40} {"p50 ms":>8} {"p95 ms":>8}')
+    for name, result in results.items():
+        print(f'{name:<40} {result["p50_ms"]:>8.3f} {result["p95_ms"]:>8.3f}')
+    print(f'Results saved to {args.output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# So sánh ghi/đọc đồng thời trên SQLite: rollback journal mặc định, profile pragma (WAL, busy_timeout...) và tách đọc/ghi
+# Chạy từ thư mục BE: python -m benchmarks.sqlite_concurrency_benchmark [--writers 8] [--readers 8] [--duration 10]
+import argparse, logging, threading, time
+from extensions import db
+from models import Wallet, Category
+from config.config import Config
+from services.transaction_service import TransactionService
+from .common import make_app, stats
+from .data_generator import generate
+
+PROFILES = {
+    # Hành vi trước đây: journal_mode=DELETE, không retry
+    'rollback-journal': {'SQLITE_PRAGMAS': {}, 'DB_LOCK_RETRIES': 0},
+    # Profile mặc định trong Config
+    'wal-profile': {'SQLITE_PRAGMAS': Config.SQLITE_PRAGMAS, 'DB_LOCK_RETRIES': Config.DB_LOCK_RETRIES},
+    # WAL + tách connection: đọc qua pool chỉ đọc, ghi qua một connection
+    'wal-routing': {'SQLITE_PRAGMAS': Config.SQLITE_PRAGMAS, 'DB_LOCK_RETRIES': Config.DB_LOCK_RETRIES, 'DB_SESSION_ROUTING': True}
+}
+
+
+def run_profile(name, overrides, writers, readers, duration, transactions):
+    app = make_app(**overrides)
+    with app.app_context():
+        db.create_all()
+        generate(transactions, log=lambda message: None)
+        wallet_id = Wallet.query.filter_by(user_id=1).first().id
+        category_id = Category.query.filter_by(user_id=1).first().id
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        db.session.remove()
+
+    results = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(kind):
+        latencies, failed = [], 0
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                if kind == 'write':
+                    result = TransactionService.create_transaction_service(1, {
+                        'wallet_id': wallet_id, 'category_id': category_id, 'amount': 1000, 'transaction_type': 'Income'
+                    })
+                else:
+                    result = TransactionService.get_transactions_service(1, 1, 20)
+                db.session.remove()
+                if result.get('status_code', 200) >= 400:
+                    failed += 1
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+        with lock:
+            results[kind].extend(latencies)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=worker, args=('write',)) for _ in range(writers)] + \
+              [threading.Thread(target=worker, args=('read',)) for _ in range(readers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    report = {'profile': name, 'journal_mode': journal_mode}
+    for kind in ('write', 'read'):
+        samples = results[kind] or [0]
+        report[kind] = {
+            'ok': len(results[kind]),
+            'errors': errors[kind],
+            'per_second': round(len(results[kind]) / elapsed, 1),
+            **stats(samples)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--transactions', type=int, default=10000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # Lỗi khoá và slow query là kết quả mong đợi ở đây
+
+    print(f'writers={args.writers} readers={args.readers} duration={args.duration}s')
+    print(f'{"profile":<18} {"journal":>8} {"writes/s":>9} {"w p95 ms":>9} {"w errors":>9} {"reads/s":>8} {"r p95 ms":>9} {"r errors":>9}')
+    for name, overrides in PROFILES.items():
+        r = run_profile(name, overrides, args.writers, args.readers, args.duration, args.transactions)
+        w, rd = r['write'], r['read']
+        print(f'{name:<18} {r["journal_mode"]:>8} {w["per_second"]:>9.1f} {w["p95_ms"]:>9.1f} {w["errors"]:>9} '
+              f'{rd["per_second"]:>8.1f} {rd["p95_ms"]:>9.1f} {rd["errors"]:>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Benchmark thời gian khởi động: import app, create_app() và response đầu tiên, mỗi lần chạy trong một process mới
+# Chạy từ thư mục BE: python -m benchmarks.startup_benchmark [--repeat 10] [--output startup.json]
+import argparse, json, os, subprocess, sys, tempfile
+from .common import stats
+
+# Chạy trong process con để đo cold start thật (không có module nào đã được import sẵn)
+PROBE = '''
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().post('/auth/login', json={})
+responded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_response_ms': (responded - created) * 1000,
+    'total_ms': (responded - started) * 1000,
+    'status_code': response.status_code
+}))
+'''
+
+
+def run_once(env):
+    output = subprocess.check_output([sys.executable, '-c', PROBE], env=env, cwd=os.getcwd(), stderr=subprocess.DEVNULL, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--database-uri', default=None, help='Mặc định là file sqlite tạm')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        'DATABASE_URL': args.database_uri or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "startup.db")}',
+        'JWT_SECRET_KEY': os.environ.get('JWT_SECRET_KEY', 'benchmark')
+    }
+    runs = [run_once(env) for _ in range(args.repeat)]
+
+    results = {}
+    print(f'{"phase":<20} {"p50 ms":>8} {"p95 ms":>8}')
+    for phase in ['import_ms', 'create_app_ms', 'first_response_ms', 'total_ms']:
+        results[phase] = stats([run[phase] for run in runs])
+        print(f'{phase:<20} {results[phase]["p50_ms"]:>8.1f} {results[phase]["p95_ms"]:>8.1f}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f'Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# So sánh throughput của các layout gunicorn (workers x threads) trên cùng một database
+# Chạy từ thư mục BE: python -m benchmarks.throughput_benchmark --layouts 1x1 1x8 4x1 4x4 [--transactions 20000] [--duration 10]
+import argparse, http.client, json, os, signal, socket, subprocess, sys, tempfile, threading, time
+from flask_jwt_extended import create_access_token
+from extensions import db
+from .common import make_app, stats
+from .data_generator import generate
+
+ENDPOINTS = ['/wallets/', '/transactions/', '/transactions/?limit=20', '/summary/', '/categories/']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+# Mỗi client giữ một kết nối keep-alive và gửi request liên tục cho tới hết thời gian
+def load(port, token, clients, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        headers = {'Authorization': f'Bearer {token}'}
+        i = index
+        local = []
+        while time.perf_counter() < deadline:
+            path = ENDPOINTS[i % len(ENDPOINTS)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    with lock:
+                        errors[0] += 1
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return latencies, errors[0], elapsed
+
+
+def run_layout(layout, database_uri, token, clients, duration):
+    workers, threads = (int(x) for x in layout.split('x'))
+    port = free_port()
+    env = {
+        **os.environ,
+        'BIND': f'127.0.0.1:{port}',
+        'WEB_WORKERS': str(workers),
+        'WEB_THREADS': str(threads),
+        'WEB_ACCESS_LOG': '',
+        'WEB_LOG_LEVEL': 'warning',
+        'DATABASE_URL': database_uri,
+        'JWT_SECRET_KEY': 'benchmark',
+        'DB_POOL_SIZE': str(max(5, threads))
+    }
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(port):
+            raise RuntimeError(f'gunicorn did not start for layout {layout} (is gunicorn installed?)')
+        load(port, token, clients, 1)  # Làm nóng
+        latencies, errors, elapsed = load(port, token, clients, duration)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    return {
+        'layout': layout,
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        **stats(latencies)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--layouts', nargs='+', default=['1x1', '1x8', '4x1', '4x4'], help='workers x threads')
+    parser.add_argument('--clients', type=int, default=32, help='Số kết nối đồng thời')
+    parser.add_argument('--duration', type=float, default=10, help='Số giây đo cho mỗi layout')
+    parser.add_argument('--transactions', type=int, default=20000)
+    parser.add_argument('--database-uri', default=None, help='Dùng database có sẵn thay vì sinh dữ liệu mới')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    database_uri = args.database_uri or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "throughput.db")}'
+    app = make_app(database_uri)
+    with app.app_context():
+        db.create_all()
+        if not args.database_uri:
+            generate(args.transactions)
+        token = create_access_token(identity='1')
+
+    results = []
+    print(f'{"layout":<8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}')
+    for layout in args.layouts:
+        result = run_layout(layout, database_uri, token, args.clients, args.duration)
+        results.append(result)
+        print(f'{layout:<8} {result["requests_per_second"]:>8.1f} {result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} {result["errors"]:>7}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'clients': args.clients, 'duration': args.duration, 'database': database_uri.split(':')[0], 'results': results}, f, indent=2)
+        print(f'Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
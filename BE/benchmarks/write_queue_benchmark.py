@@ -0,0 +1,101 @@
+# So sánh số lần ghi mỗi giây khi mỗi request tự commit và khi bật gom commit (WRITE_QUEUE_ENABLED)
+# Chạy từ thư mục BE: python -m benchmarks.write_queue_benchmark [--writers 16] [--duration 10] [--synchronous FULL]
+import argparse, logging, threading, time
+from extensions import db, write_queue
+from models import Wallet, Category
+from config.config import Config
+from services.transaction_service import TransactionService
+from services.wallet_service import WalletService
+from .common import make_app, stats
+from .data_generator import generate
+
+PROFILES = {
+    'direct': {'WRITE_QUEUE_ENABLED': False},
+    'group-commit': {'WRITE_QUEUE_ENABLED': True}
+}
+
+
+def run_profile(name, overrides, writers, duration, transactions, synchronous):
+    pragmas = {**Config.SQLITE_PRAGMAS, 'synchronous': synchronous}
+    app = make_app(SQLITE_PRAGMAS=pragmas, **overrides)
+    with app.app_context():
+        db.create_all()
+        generate(transactions, log=lambda message: None)
+        wallet_id = Wallet.query.filter_by(user_id=1).first().id
+        category_id = Category.query.filter_by(user_id=1).first().id
+        db.session.remove()
+
+    results, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    # Xen kẽ các loại ghi khác nhau: tạo giao dịch, tạo ví, xoá tạm/khôi phục giao dịch
+    def worker(index):
+        latencies, failed, created = [], 0, []
+        with app.app_context():
+            i = 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                step = i % 4
+                if step == 0 or not created:
+                    result = TransactionService.create_transaction_service(1, {
+                        'wallet_id': wallet_id, 'category_id': category_id, 'amount': 1000, 'transaction_type': 'Income'
+                    })
+                    if result.get('status_code') == 201:
+                        created.append(result['transaction']['id'])
+                elif step == 1:
+                    result = WalletService.create_wallet_service(1, {'name': f'Queue wallet {index}-{i}', 'balance': 0})
+                elif step == 2:
+                    result = TransactionService.soft_delete_transaction_service(1, created[-1])
+                else:
+                    result = TransactionService.restore_transaction_service(1, created[-1])
+                db.session.remove()
+                i += 1
+                if result.get('status_code', 200) >= 400:
+                    failed += 1
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+        with lock:
+            results.extend(latencies)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    batches = write_queue.stats['batches']
+    report = {
+        'profile': name,
+        'ok': len(results),
+        'errors': errors[0],
+        'per_second': round(len(results) / elapsed, 1),
+        'avg_batch': round(write_queue.stats['jobs'] / batches, 1) if batches else 1,
+        'fallbacks': write_queue.stats['fallbacks'],
+        **stats(results or [0])
+    }
+    write_queue.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--synchronous', default=Config.SQLITE_PRAGMAS['synchronous'], help='PRAGMA synchronous (FULL = fsync mỗi commit)')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f'writers={args.writers} duration={args.duration}s synchronous={args.synchronous}')
+    print(f'{"profile":<14} {"writes/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"avg batch":>10} {"errors":>7} {"fallbacks":>10}')
+    for name, overrides in PROFILES.items():
+        r = run_profile(name, overrides, args.writers, args.duration, args.transactions, args.synchronous)
+        print(f'{name:<14} {r["per_second"]:>9.1f} {r["p50_ms"]:>8.2f} {r["p95_ms"]:>8.2f} {r["avg_batch"]:>10} {r["errors"]:>7} {r["fallbacks"]:>10}')
+
+
+if __name__ == '__main__':
+    main()
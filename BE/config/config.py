@@ -8,4 +8,82 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///financial.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool của SQLAlchemy (mỗi worker process có pool riêng)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),  # Giây, nên nhỏ hơn wait_timeout của MySQL
+    }
+    if ':memory:' not in SQLALCHEMY_DATABASE_URI:  # SQLite in-memory không dùng QueuePool
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30))
+        })
+
+    # Số dòng mỗi lần insert khi import nhiều giao dịch
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+
+    # Thống kê SQL theo request: header X-DB-Query-Count/X-DB-Time-Ms và slow-query log
+    QUERY_STATS_HEADERS = os.getenv('QUERY_STATS_HEADERS', 'true').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG')  # Đường dẫn file log, để trống thì ghi ra log chung
+
+    # Thuật toán hash password theo định dạng Werkzeug: 'scrypt:N:r:p' hoặc 'pbkdf2:sha256:iterations'
+    # Đổi tham số thì hash cũ sẽ được hash lại khi user đăng nhập
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_SALT_LENGTH = int(os.getenv('PASSWORD_HASH_SALT_LENGTH', 16))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None  # Mặc định = số CPU
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 16))  # Số request chờ tối đa, vượt quá trả 503
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+    # Thời hạn token: access token ngắn, refresh token dài (được xoay vòng mỗi lần refresh)
+    JWT_ACCESS_TOKEN_MINUTES = int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 30))
+    JWT_REFRESH_TOKEN_DAYS = int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30))
+
+    # Chu kỳ (giây) đồng bộ danh sách token bị thu hồi từ db vào bộ nhớ
+    REVOCATION_SYNC_SECONDS = float(os.getenv('REVOCATION_SYNC_SECONDS', 5))
+
+    # Pragma áp dụng cho mỗi connection SQLite (để trống một giá trị để bỏ qua pragma đó)
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),  # Reader không bị chặn bởi writer
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'),  # Chờ khoá thay vì báo lỗi ngay
+        'mmap_size': os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+        'cache_size': os.getenv('SQLITE_CACHE_SIZE', '-65536'),  # Số âm = KiB (64 MB)
+        'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+    }
+
+    # Chạy lại service ghi dữ liệu khi gặp lỗi khoá database, chờ tăng dần (backoff)
+    DB_LOCK_RETRIES = int(os.getenv('DB_LOCK_RETRIES', 3))
+    DB_LOCK_RETRY_BACKOFF_MS = float(os.getenv('DB_LOCK_RETRY_BACKOFF_MS', 20))
+
+    # Tách đọc/ghi cho SQLite: service @read_only dùng pool connection chỉ đọc, mọi thao tác ghi dùng một connection
+    DB_SESSION_ROUTING = os.getenv('DB_SESSION_ROUTING', 'false').lower() == 'true'
+    DB_READER_POOL_SIZE = int(os.getenv('DB_READER_POOL_SIZE', 0)) or None  # Mặc định = số CPU
+
+    # Gom commit: service ghi từ các request đồng thời được commit chung một transaction bởi một writer thread
+    WRITE_QUEUE_ENABLED = os.getenv('WRITE_QUEUE_ENABLED', 'false').lower() == 'true'
+    WRITE_QUEUE_WINDOW_MS = float(os.getenv('WRITE_QUEUE_WINDOW_MS', 1))  # Thời gian chờ gom thêm việc, 0 = chỉ lấy việc đang chờ sẵn
+    WRITE_QUEUE_MAX_BATCH = int(os.getenv('WRITE_QUEUE_MAX_BATCH', 64))
+    WRITE_QUEUE_TIMEOUT = float(os.getenv('WRITE_QUEUE_TIMEOUT', 10))  # Giây, việc chưa chạy sau thời gian này bị huỷ (503)
+
+    # Read replica: route GET và service @read_only đọc từ replica, ghi (và đọc sau khi ghi trong cùng request) dùng primary
+    DB_REPLICA_URL = os.getenv('DB_REPLICA_URL')  # Vd: sqlite:///financial-replica.db (bản sao bằng `flask sync-replica`)
+    DB_REPLICA_GET_ROUTES = os.getenv('DB_REPLICA_GET_ROUTES', 'true').lower() == 'true'  # Mọi request GET đọc từ replica
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', 10))  # Trễ hơn thì đọc từ primary
+    DB_REPLICA_CHECK_SECONDS = float(os.getenv('DB_REPLICA_CHECK_SECONDS', 2))  # Chu kỳ ghi heartbeat và đo độ trễ
+
+    # Cache kết quả các service đọc (@cached): 'none', 'memory' (LRU trong process), 'file' (file SQLite dùng chung
+    # giữa các worker, thay cho Redis khi chạy local) hoặc 'redis' (cần cài package redis)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_URL = os.getenv('CACHE_URL')  # Đường dẫn file (mặc định instance/cache.db) hoặc redis://...
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+    CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', 300))
+    CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'financial:')
+    # GET /metrics/cache chỉ dành cho giám sát nội bộ: gửi kèm header X-Metrics-Token, để trống thì tắt (404)
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+    # /batch: số request con tối đa trong một lần gọi
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
@@ -1,5 +1,790 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_jwt_extended import JWTManager
+from flask import g, request, current_app, has_app_context, has_request_context
+from sqlalchemy import event, text, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from functools import wraps
+from collections import OrderedDict
+from datetime import datetime
+import logging, time, os, threading, random, contextvars, queue, pickle, sqlite3
 
-db = SQLAlchemy()
+# Đang chạy trong service chỉ đọc (được đánh dấu bằng @read_only)
+read_only_scope = contextvars.ContextVar('read_only_scope', default=False)
+# Đang chạy trong service cần đọc từ primary dù là request GET (được đánh dấu bằng @primary)
+primary_scope = contextvars.ContextVar('primary_scope', default=False)
+
+
+# Session chọn engine theo loại thao tác: service chỉ đọc và request GET dùng bind 'reader'
+# (pool chỉ đọc của SQLite khi bật DB_SESSION_ROUTING, hoặc DB_REPLICA_URL), còn lại dùng engine mặc định.
+# Sau lần ghi đầu tiên (flush/INSERT/UPDATE/DELETE), mọi câu đọc của session đều về primary để thấy dữ liệu vừa ghi
+# Trong writer thread của WriteQueue, commit/rollback của service chỉ tác động lên savepoint của việc đang chạy
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['wrote'] = True
+            elif not self.info.get('wrote') and not primary_scope.get() and (read_only_scope.get() or replica_request()):
+                reader = self._db.engines.get('reader')
+                if reader is not None and replica_monitor.usable():
+                    return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def commit(self):
+        self.bump_versions()
+        if 'group_savepoint' in self.info:
+            self.flush()  # Writer thread commit cả nhóm sau khi chạy xong
+        else:
+            super().commit()
+        self.info.pop('pending_versions', None)
+
+    # Tăng version (user, entity) của service @versioned đang chạy, trong cùng transaction với dữ liệu
+    # Một câu UPDATE cho mọi entity của một user. Thiếu dòng (lần ghi đầu) thì tạo dòng version 0 rồi tăng lại cả nhóm,
+    # entity đã có dòng bị tăng hai lần cũng không sao vì version chỉ cần thay đổi
+    def bump_versions(self):
+        table = self._db.metadata.tables['entity_versions']
+        by_user = {}
+        for user_id, entity in sorted(self.info.get('pending_versions') or ()):
+            by_user.setdefault(user_id, []).append(entity)
+
+        for user_id, entities in by_user.items():
+            key = (table.c.user_id == user_id) & table.c.entity.in_(entities)
+            bump = table.update().where(key).values(version=table.c.version + 1)
+            if self.execute(bump).rowcount == len(entities):
+                continue
+            existing = set(self.execute(select(table.c.entity).where(key)).scalars())
+            for entity in entities:
+                if entity in existing:
+                    continue
+                try:
+                    with self.begin_nested():
+                        self.execute(table.insert().values(user_id=user_id, entity=entity, version=0))
+                except IntegrityError:
+                    pass  # Request khác vừa tạo dòng này
+            self.execute(bump)
+
+    def rollback(self):
+        savepoint = self.info.get('group_savepoint')
+        if savepoint is not None:
+            if savepoint.is_active:
+                savepoint.rollback()
+            self.info['group_savepoint'] = self.begin_nested()  # Service có thể tiếp tục ghi sau khi rollback
+            return
+        super().rollback()
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
+
+logger = logging.getLogger('sql_stats')
+slow_query_logger = logging.getLogger('slow_query')
+lock_logger = logging.getLogger('db_lock')
+replica_logger = logging.getLogger('db_replica')
+
+
+# Kiểu dữ liệu của tham số (không log giá trị thật)
+def param_shape(parameters):
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f'{len(parameters)} x {param_shape(parameters[0])}'
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info['query_start_time'].pop()) * 1000
+    if not has_app_context():
+        return
+
+    # Cộng dồn số câu SQL và thời gian DB của request hiện tại
+    g.db_query_count = g.get('db_query_count', 0) + 1
+    g.db_time_ms = g.get('db_time_ms', 0) + elapsed_ms
+
+    # Ghi các câu SQL chậm vào slow-query log
+    if elapsed_ms >= current_app.config.get('SLOW_QUERY_THRESHOLD_MS', 200):
+        endpoint = request.endpoint if has_request_context() else 'cli'
+        slow_query_logger.warning(
+            f'{elapsed_ms:.1f}ms endpoint={endpoint} statement={" ".join(statement.split())} params={param_shape(parameters)}'
+        )
+
+
+# Đăng ký bộ đếm SQL cho app: header X-DB-Query-Count / X-DB-Time-Ms và log theo endpoint
+def init_query_stats(app):
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+    # File log riêng cho slow query nếu được cấu hình
+    log_path = app.config.get('SLOW_QUERY_LOG')
+    if log_path and not any(getattr(h, 'baseFilename', None) == log_path for h in slow_query_logger.handlers):
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_logger.addHandler(handler)
+
+    @app.before_request
+    def reset_query_stats():
+        g.db_query_count = 0
+        g.db_time_ms = 0
+
+    @app.after_request
+    def attach_query_stats(response):
+        count = g.get('db_query_count', 0)
+        db_time_ms = g.get('db_time_ms', 0)
+        if app.config.get('QUERY_STATS_HEADERS', True):
+            response.headers['X-DB-Query-Count'] = str(count)
+            response.headers['X-DB-Time-Ms'] = f'{db_time_ms:.2f}'
+        logger.info(f'endpoint={request.endpoint} status={response.status_code} queries={count} db_time_ms={db_time_ms:.2f}')
+        return response
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+# Hash/kiểm tra password trong pool có giới hạn số luồng và độ dài hàng đợi,
+# để một loạt request đăng nhập không chiếm hết CPU/bộ nhớ của mọi worker
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.method = 'scrypt:32768:8:1'
+        self.salt_length = 16
+        self.executor = None
+        self.slots = None
+        self.timeout = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = PasswordHasher.normalize_method(app.config.get('PASSWORD_HASH_METHOD', 'scrypt'))
+        self.salt_length = app.config.get('PASSWORD_HASH_SALT_LENGTH', 16)
+        workers = app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+        queue_size = app.config.get('PASSWORD_HASH_QUEUE_SIZE', workers * 4)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Số việc tối đa đang chạy + đang chờ
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+    # Chuẩn hoá tên thuật toán giống Werkzeug, vd: 'scrypt' -> 'scrypt:32768:8:1'
+    def normalize_method(method):
+        name, *args = method.split(':')
+        if name == 'scrypt' and not args:
+            return 'scrypt:32768:8:1'
+        if name == 'pbkdf2':
+            if not args:
+                return f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+            if len(args) == 1:
+                return f'pbkdf2:{args[0]}:{DEFAULT_PBKDF2_ITERATIONS}'
+        return method
+
+    # Chạy fn trong pool, hàng đợi đầy thì báo bận thay vì chờ
+    def run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Password hashing queue is full')
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Quá thời gian chờ cũng là quá tải: service trả 503 như khi hàng đợi đầy
+            future.cancel()
+            raise PasswordHasherBusy('Password hashing timed out')
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self.run(check_password_hash, password_hash, password)
+
+    # Hash được tạo với tham số khác cấu hình hiện tại (thuật toán, tham số KDF hoặc độ dài salt) thì cần hash lại
+    # Định dạng của Werkzeug: method$salt$hash
+    def needs_rehash(self, password_hash):
+        method, salt, _ = (password_hash.split('$', 2) + ['', ''])[:3]
+        return method != self.method or len(salt) != self.salt_length
+
+
+password_hasher = PasswordHasher()
+
+
+# Đánh dấu luồng hiện tại vừa gặp lỗi khoá database (SQLite busy/locked, deadlock)
+lock_errors = threading.local()
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message or 'deadlock' in message
+
+
+def handle_error(context):
+    if is_lock_error(context.original_exception):
+        lock_errors.flag = True
+
+
+# Áp dụng pragma SQLite mỗi khi mở connection mới (WAL, busy_timeout, mmap, cache...)
+def init_sqlite(app):
+    if not event.contains(Engine, 'handle_error', handle_error):
+        event.listen(Engine, 'handle_error', handle_error)
+
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        engines = dict(db.engines)
+    for key, engine in engines.items():
+        if engine.dialect.name != 'sqlite' or not pragmas:
+            continue
+        # Connection chỉ đọc không đổi được journal_mode
+        engine_pragmas = {name: value for name, value in pragmas.items() if key != 'reader' or name != 'journal_mode'}
+        event.listen(engine, 'connect', sqlite_pragma_listener(engine_pragmas))
+
+
+def sqlite_pragma_listener(pragmas):
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if value is not None and value != '':
+                cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return set_sqlite_pragmas
+
+
+# Request GET được đọc từ bind 'reader'
+def replica_request():
+    return has_request_context() and request.method == 'GET' and current_app.config.get('DB_REPLICA_GET_ROUTES', True)
+
+
+# Thêm bind 'reader': read replica nếu có DB_REPLICA_URL, nếu không thì tách connection đọc/ghi cho SQLite
+# (một connection ghi, các lần ghi xếp hàng chờ nhau, và một pool connection chỉ đọc mode=ro). Gọi trước db.init_app
+def init_session_routing(app):
+    replica_url = app.config.get('DB_REPLICA_URL')
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = {
+            **(app.config.get('SQLALCHEMY_BINDS') or {}),
+            'reader': {'url': replica_url, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+        }
+        return
+
+    if not app.config.get('DB_SESSION_ROUTING'):
+        return
+
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory':
+        logger.warning('DB_SESSION_ROUTING only supports file-based SQLite, routing disabled')
+        return
+
+    options = {key: value for key, value in app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).items()
+               if key not in ('pool_size', 'max_overflow')}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options, 'pool_size': 1, 'max_overflow': 0}
+
+    database = url.database if url.database.startswith('file:') else f'file:{url.database}'
+    reader_url = url.set(database=database, query={**url.query, 'mode': 'ro', 'uri': 'true'})
+    app.config['SQLALCHEMY_BINDS'] = {
+        **(app.config.get('SQLALCHEMY_BINDS') or {}),
+        'reader': {
+            'url': reader_url.render_as_string(hide_password=False),
+            **options,
+            'pool_size': app.config.get('DB_READER_POOL_SIZE') or os.cpu_count() or 1,
+            'max_overflow': 0
+        }
+    }
+
+
+# Kiểm tra độ trễ của replica: định kỳ ghi heartbeat lên primary rồi đọc lại trên replica.
+# Trễ quá DB_REPLICA_MAX_LAG_SECONDS (hoặc replica lỗi) thì mọi câu đọc về primary cho tới lần kiểm tra sau
+class ReplicaMonitor:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.healthy = True
+        self.lag = None
+        self.next_check = 0
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get('DB_REPLICA_URL'))
+        self.max_lag = app.config.get('DB_REPLICA_MAX_LAG_SECONDS', 10)
+        self.interval = app.config.get('DB_REPLICA_CHECK_SECONDS', 2)
+        self.healthy = True
+        self.lag = None
+        self.next_check = 0
+
+    # Chỉ một luồng kiểm tra, các luồng khác dùng kết quả lần trước
+    def usable(self):
+        if self.enabled and time.monotonic() >= self.next_check and self.lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self.lock.release()
+        return self.healthy
+
+    # Ghi thời điểm hiện tại lên primary, bản sao của dòng này cho biết replica đã có dữ liệu tới lúc nào
+    def beat(self, now=None):
+        table = db.metadata.tables['replica_heartbeat']
+        now = now or datetime.utcnow()
+        with db.engines[None].begin() as connection:
+            if connection.execute(table.update().where(table.c.id == 1).values(beat_at=now)).rowcount == 0:
+                connection.execute(table.insert().values(id=1, beat_at=now))
+
+    def check(self):
+        table = db.metadata.tables['replica_heartbeat']
+        now = datetime.utcnow()
+        try:
+            self.beat(now)
+            with db.engines['reader'].connect() as connection:
+                beat_at = connection.execute(select(table.c.beat_at).where(table.c.id == 1)).scalar()
+            self.lag = (now - beat_at).total_seconds() if beat_at else None
+        except SQLAlchemyError as e:
+            replica_logger.warning(f'Replica lag check failed: {e}')
+            self.lag = None
+
+        healthy = self.lag is not None and self.lag <= self.max_lag
+        if healthy != self.healthy:
+            lag = 'unknown' if self.lag is None else f'{self.lag:.1f}s'
+            replica_logger.warning(f'Replica {"is back in sync" if healthy else "is behind"} (lag {lag}), '
+                           f'reading from {"replica" if healthy else "primary"}')
+        self.healthy = healthy
+        self.next_check = time.monotonic() + self.interval
+
+
+replica_monitor = ReplicaMonitor()
+
+
+# Đánh dấu service chỉ đọc: các câu SELECT đi qua bind 'reader' (pool chỉ đọc hoặc replica) nếu có
+def read_only(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = read_only_scope.set(True)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            read_only_scope.reset(token)
+    return decorated_function
+
+
+# Service GET có ghi dữ liệu (vd: tạo/tính lại bảng tổng hợp): mọi câu đọc về primary,
+# không tính từ dữ liệu replica đang trễ rồi lưu vĩnh viễn vào primary
+def primary(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = primary_scope.set(True)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            primary_scope.reset(token)
+    return decorated_function
+
+
+# Chạy lại service khi bị lỗi khoá database (service tự bắt lỗi và trả về 500 nên dựa vào cờ lock_errors)
+# Chỉ dùng cho service commit một lần, lần chạy lỗi chưa ghi gì vào db
+def retry_on_lock(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        retries = current_app.config.get('DB_LOCK_RETRIES', 3)
+        backoff_ms = current_app.config.get('DB_LOCK_RETRY_BACKOFF_MS', 20)
+        for attempt in range(retries + 1):
+            lock_errors.flag = False
+            result = f(*args, **kwargs)
+            if not lock_errors.flag or attempt == retries:
+                return result
+            db.session.rollback()
+            delay_ms = backoff_ms * (2 ** attempt) * (0.5 + random.random())
+            lock_logger.warning(f'{f.__qualname__} hit a database lock, retrying in {delay_ms:.0f}ms (attempt {attempt + 1}/{retries})')
+            time.sleep(delay_ms / 1000)
+        return result
+    return decorated_function
+
+
+class WriteJob:
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+# Gom commit: service ghi từ nhiều request được đưa vào hàng đợi, một writer thread chạy lần lượt
+# từng việc trong savepoint riêng rồi commit cả nhóm một lần (một lần fsync cho nhiều request)
+class WriteQueue:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.app = None
+        self.queue = None
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.stats = {'batches': 0, 'jobs': 0, 'fallbacks': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.stop()
+        self.app = app
+        self.enabled = app.config.get('WRITE_QUEUE_ENABLED', False)
+        self.window = app.config.get('WRITE_QUEUE_WINDOW_MS', 1) / 1000
+        self.max_batch = app.config.get('WRITE_QUEUE_MAX_BATCH', 64)
+        self.timeout = app.config.get('WRITE_QUEUE_TIMEOUT', 10)
+        self.stats = {'batches': 0, 'jobs': 0, 'fallbacks': 0}
+
+    def stop(self):
+        if self.thread is not None and self.pid == os.getpid():
+            self.queue.put(None)
+            self.thread.join()
+        self.thread = None
+
+    # Writer thread được tạo khi có việc đầu tiên (và tạo lại trong process con sau khi gunicorn fork)
+    def start(self):
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.queue = queue.Queue()
+                self.thread = threading.Thread(target=self.worker, args=(self.app,), name='write-queue', daemon=True)
+                self.thread.start()
+
+    def in_writer(self):
+        return threading.current_thread() is self.thread
+
+    # Gửi việc cho writer thread và chờ kết quả, quá thời gian mà việc chưa chạy thì huỷ và trả về 503
+    def submit(self, fn, *args, **kwargs):
+        if self.thread is None or self.pid != os.getpid():
+            self.start()
+        db.session.rollback()  # Trả connection của request, tránh giữ khoá đọc khi writer commit
+        job = WriteJob(fn, args, kwargs)
+        self.queue.put(job)
+        try:
+            return job.future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if job.future.cancel():
+                logger.warning(f'{fn.__qualname__} timed out in the write queue')
+                return {'message': 'Server is busy, please try again', 'status_code': 503}
+            return job.future.result()
+
+    def worker(self, app):
+        with app.app_context():
+            while True:
+                job = self.queue.get()
+                if job is None:
+                    return
+                batch, stopping = [job], False
+                deadline = time.perf_counter() + self.window
+                while len(batch) < self.max_batch:
+                    try:
+                        job = self.queue.get(timeout=max(0, deadline - time.perf_counter())) if self.window else self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        stopping = True
+                        break
+                    batch.append(job)
+                batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+                if batch:
+                    self.run_batch(batch)
+                db.session.remove()
+                if stopping:
+                    return
+
+    # Chạy cả nhóm trong một transaction, kết quả chỉ được trả về sau khi commit thành công
+    def run_batch(self, batch):
+        session = db.session()
+        results = []
+        try:
+            if session.get_bind().dialect.name == 'sqlite':
+                session.execute(text('BEGIN IMMEDIATE'))  # pysqlite không tự BEGIN trước SAVEPOINT
+            for job in batch:
+                session.info['group_savepoint'] = session.begin_nested()
+                try:
+                    result, error = job.fn(*job.args, **job.kwargs), None
+                except Exception as e:
+                    result, error = None, e
+                savepoint = session.info.pop('group_savepoint')
+                if savepoint.is_active:
+                    # Service trả về lỗi thì bỏ mọi thay đổi của nó, giống như khi chạy riêng
+                    if error is not None or (isinstance(result, dict) and result.get('status_code', 200) >= 400):
+                        savepoint.rollback()
+                    else:
+                        savepoint.commit()
+                results.append((job, result, error))
+            session.commit()
+        except SQLAlchemyError as e:
+            session.info.pop('group_savepoint', None)
+            session.rollback()
+            lock_logger.warning(f'Group commit of {len(batch)} job(s) failed, running them one by one: {e}')
+            self.stats['fallbacks'] += 1
+            for job in batch:
+                try:
+                    job.future.set_result(job.fn(*job.args, **job.kwargs))
+                except Exception as error:
+                    job.future.set_exception(error)
+                db.session.remove()
+            return
+
+        self.stats['batches'] += 1
+        self.stats['jobs'] += len(batch)
+        for job, result, error in results:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+
+write_queue = WriteQueue()
+
+
+# Đưa service ghi vào WriteQueue khi bật WRITE_QUEUE_ENABLED, đặt trên @retry_on_lock
+# Đang chạy trong transaction chung (writer thread, /batch atomic) thì chạy luôn trong transaction đó
+def group_commit(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not write_queue.enabled or write_queue.in_writer() or 'group_savepoint' in db.session.info:
+            return f(*args, **kwargs)
+        return write_queue.submit(f, *args, **kwargs)
+    return decorated_function
+
+
+# Đánh dấu service ghi dữ liệu của user (tham số đầu tiên): mỗi lần service commit, version của các entity này tăng lên
+# Đặt dưới @group_commit để chạy trong writer thread
+def versioned(*entities):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(user_id, *args, **kwargs):
+            previous = db.session.info.get('pending_versions')
+            db.session.info['pending_versions'] = (previous or set()) | {(int(user_id), entity) for entity in entities}
+            try:
+                return f(user_id, *args, **kwargs)
+            finally:
+                if previous is None:
+                    db.session.info.pop('pending_versions', None)
+                else:
+                    db.session.info['pending_versions'] = previous
+        return decorated_function
+    return decorator
+
+
+# Version hiện tại của các entity của user (chưa có dòng = 0), xem @versioned
+def current_versions(user_id, entities):
+    table = db.metadata.tables['entity_versions']
+    rows = dict(db.session.execute(
+        select(table.c.entity, table.c.version).where(table.c.user_id == user_id, table.c.entity.in_(entities))
+    ).all())
+    return [rows.get(entity, 0) for entity in entities]
+
+
+# Không có trong cache (None cũng có thể là giá trị được cache)
+MISSING = object()
+
+
+# Cache trong process: LRU giới hạn số mục, mỗi mục có hạn (TTL)
+class MemoryCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[1] <= time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def size(self):
+        return len(self.entries)
+
+
+# Cache dùng chung giữa các worker process trên cùng máy: một file SQLite (thay cho Redis khi chạy local)
+# Khi vượt max_entries thì xoá các mục sắp hết hạn nhất
+class FileCache:
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.local = threading.local()
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self.connection()
+        connection.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS ix_cache_expires_at ON cache (expires_at)')
+
+    def connection(self):
+        if getattr(self.local, 'connection', None) is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')  # Mất cache khi mất điện cũng không sao
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return self.local.connection
+
+    def get(self, key):
+        row = self.connection().execute('SELECT value FROM cache WHERE key = ? AND expires_at > ?', (key, time.time())).fetchone()
+        return pickle.loads(row[0]) if row else MISSING
+
+    def set(self, key, value):
+        connection = self.connection()
+        connection.execute('INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                           (key, pickle.dumps(value), time.time() + self.ttl))
+        self.writes += 1
+        if self.writes % 100 == 0:  # Dọn định kỳ, không phải mỗi lần ghi
+            connection.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+            excess = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)', (excess,))
+                self.evictions += excess
+
+    def clear(self):
+        self.connection().execute('DELETE FROM cache')
+
+    def size(self):
+        return self.connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+# Cache dùng chung qua Redis (cần cài package redis), giới hạn kích thước bằng maxmemory-policy của Redis
+class RedisCache:
+    def __init__(self, url, ttl, prefix):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else MISSING
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(self.ttl)))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def size(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*'))
+
+
+# Cache kết quả của service đọc (@cached), đếm hit/miss theo service
+class ResultCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.lock = threading.Lock()
+        self.counters = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = (app.config.get('CACHE_BACKEND') or 'none').lower()
+        max_entries = app.config.get('CACHE_MAX_ENTRIES', 10000)
+        ttl = app.config.get('CACHE_TTL_SECONDS', 300)
+        if backend == 'memory':
+            self.backend = MemoryCache(max_entries, ttl)
+        elif backend == 'file':
+            self.backend = FileCache(app.config.get('CACHE_URL') or os.path.join(app.instance_path, 'cache.db'), max_entries, ttl)
+        elif backend == 'redis':
+            self.backend = RedisCache(app.config['CACHE_URL'], ttl, app.config.get('CACHE_KEY_PREFIX', 'financial:'))
+        elif backend == 'none':
+            self.backend = None
+        else:
+            raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+        self.counters = {}
+
+        @app.after_request
+        def attach_cache_status(response):
+            status = g.get('cache_status')
+            if status:
+                response.headers['X-Cache'] = status
+            return response
+
+    def count(self, name, field):
+        with self.lock:
+            counters = self.counters.setdefault(name, {'hits': 0, 'misses': 0})
+            counters[field] += 1
+
+    # Số hit/miss theo service của process hiện tại
+    def metrics(self):
+        with self.lock:
+            services = {name: dict(values) for name, values in self.counters.items()}
+        hits = sum(values['hits'] for values in services.values())
+        misses = sum(values['misses'] for values in services.values())
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'pid': os.getpid(),
+            'entries': self.backend.size() if self.backend else 0,
+            'evictions': self.backend.evictions if self.backend else 0,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None,
+            'services': services
+        }
+
+
+result_cache = ResultCache()
+
+
+# Cache kết quả service đọc dữ liệu của user (tham số đầu tiên). Khoá gồm version hiện tại của các entity,
+# nên mục cũ không còn được dùng ngay khi service @versioned tương ứng commit. Chỉ cache kết quả 200
+# Đặt dưới @read_only để câu đọc version cũng đi qua bind 'reader'
+def cached(*entities):
+    def decorator(f):
+        name = f.__qualname__
+
+        @wraps(f)
+        def decorated_function(user_id, *args, **kwargs):
+            # Trong transaction chung chưa commit (/batch atomic), version đã tăng có thể bị rollback: không dùng cache
+            if result_cache.backend is None or 'group_savepoint' in db.session.info:
+                return f(user_id, *args, **kwargs)
+
+            versions = current_versions(int(user_id), entities)
+            key = f'{name}:{user_id}:{args!r}:{sorted(kwargs.items())!r}:{versions}:{datetime.utcnow().date()}'
+            try:
+                result = result_cache.backend.get(key)
+            except Exception as e:
+                logger.warning(f'Cache read failed for {name}: {e}')
+                result = MISSING
+            if result is not MISSING:
+                result_cache.count(name, 'hits')
+                if has_app_context() and not g.get('cache_status'):
+                    g.cache_status = 'HIT'
+                return result
+
+            result_cache.count(name, 'misses')
+            if has_app_context():
+                g.cache_status = 'MISS'
+            result = f(user_id, *args, **kwargs)
+            if isinstance(result, dict) and result.get('status_code', 200) == 200:
+                try:
+                    result_cache.backend.set(key, result)
+                except Exception as e:
+                    logger.warning(f'Cache write failed for {name}: {e}')
+            return result
+        return decorated_function
+    return decorator
@@ -0,0 +1,24 @@
+# Cấu hình gunicorn (pre-fork workers + threads), chạy: gunicorn -c gunicorn.conf.py wsgi:app
+# Mọi tham số đọc từ biến môi trường để đổi layout mà không sửa code
+import multiprocessing, os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.getenv('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))  # > 0: restart worker sau N request
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 0))
+preload_app = os.getenv('WEB_PRELOAD', 'true').lower() == 'true'  # Import app một lần ở master rồi fork
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+
+# Worker không dùng chung connection của master sau khi fork
+def post_fork(server, worker):
+    from extensions import db
+    from wsgi import app
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,101 @@
+from extensions import db
+from models import Budget, Transaction
+from services.report_service import ReportService
+from sqlalchemy import inspect, text, func
+import logging
+
+# Cấu hình logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Tên các index đã có của bảng. Inspector của SQLite bỏ qua index theo biểu thức (vd: coalesce) nên đọc sqlite_master
+def existing_index_names(inspector, table_name):
+    if db.engine.dialect.name != 'sqlite':
+        return {ix['name'] for ix in inspector.get_indexes(table_name)}
+    with db.engine.connect() as connection:
+        return set(connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"), {'table': table_name}
+        ).scalars())
+
+
+# Khoá duy nhất cũ của monthly_rollups coi các dòng category_id NULL là khác nhau nên có thể đã có dòng trùng,
+# và rollup của danh mục đã xoá vĩnh viễn vẫn trỏ tới danh mục cũ: tính lại từ ledger trước khi tạo khoá mới
+def rebuild_monthly_rollups():
+    ReportService.rebuild_rollups()
+
+
+# Bước chuẩn bị dữ liệu chạy trước khi tạo index tương ứng
+BEFORE_INDEX = {'ux_monthly_rollups_key': rebuild_monthly_rollups}
+
+
+# Tạo các index còn thiếu cho database đã tồn tại
+# db.create_all() chỉ tạo index khi tạo bảng mới, nên file financial.db cũ sẽ không có các index khai báo sau này
+def upgrade_indexes():
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_indexes = existing_index_names(inspector, table.name)
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+
+            if index.name in BEFORE_INDEX:
+                BEFORE_INDEX[index.name]()
+            index.create(bind=db.engine, checkfirst=True)
+            created.append(index.name)
+            logger.info(f'Created index {index.name} on table {table.name}')
+
+    return created
+
+
+# Thêm các cột còn thiếu cho database đã tồn tại (db.create_all() không sửa bảng cũ)
+# SQLite không thêm được cột NOT NULL không có default nên cột mới cho phép NULL, giá trị được điền ở bước backfill
+def upgrade_columns():
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added.append(f'{table.name}.{column.name}')
+                logger.info(f'Added column {column.name} to table {table.name}')
+
+    backfill_budget_limits()
+    return added
+
+
+# Hạn mức của các ngân sách tạo trước khi có cột limit_amount: amount đã bị trừ bởi mọi giao dịch chi của danh mục
+# (vào ngân sách id nhỏ nhất còn hoạt động), nên cộng lại các khoản chi từ start_date cho ngân sách đó
+def backfill_budget_limits():
+    budgets = Budget.query.filter(Budget.limit_amount.is_(None)).order_by(Budget.id).all()
+    charged = set()
+    for budget in budgets:
+        spent = 0
+        key = (budget.user_id, budget.category_id)
+        if not budget.is_deleted and key not in charged:
+            charged.add(key)
+            spent = db.session.query(func.coalesce(func.sum(Transaction.amount), 0)) \
+                .filter(Transaction.user_id == budget.user_id, Transaction.category_id == budget.category_id,
+                        Transaction.transaction_type == 'Expense', Transaction.is_deleted == False,
+                        Transaction.date >= budget.start_date).scalar()
+        budget.limit_amount = budget.amount + spent
+    db.session.commit()
+    if budgets:
+        logger.info(f'Backfilled limit_amount of {len(budgets)} budget(s)')
+    return len(budgets)
@@ -1,5 +1,4 @@
-from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from extensions import db, password_hasher
 import datetime
 
 # Bảng Người dùng
@@ -15,15 +14,22 @@ class User(db.Model):
     wallets = db.relationship('Wallet', backref='user', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
 # Bảng Ví tiền
 class Wallet(db.Model):
     __tablename__ = 'wallets'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_wallets_user_deleted', 'user_id', 'is_deleted'),
+        db.Index('ix_wallets_user_name', 'user_id', 'name', 'is_deleted'),
+        {'extend_existing': True}
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -36,7 +42,11 @@ class Wallet(db.Model):
 # Bảng Mục tiêu tài chính
 class Goal(db.Model):
     __tablename__ = 'goals'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_goals_user_deleted', 'user_id', 'is_deleted'),
+        db.Index('ix_goals_user_name', 'user_id', 'name', 'is_deleted'),
+        {'extend_existing': True}
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     name = db.Column(db.String(200), nullable=False)
@@ -50,7 +60,11 @@ class Goal(db.Model):
 # Bảng Danh mục giao dịch
 class Category(db.Model):
     __tablename__ = 'categories'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_categories_user_deleted', 'user_id', 'is_deleted'),
+        db.Index('ix_categories_user_name', 'user_id', 'name', 'is_deleted'),
+        {'extend_existing': True}
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -61,7 +75,15 @@ class Category(db.Model):
 # Bảng Giao dịch
 class Transaction(db.Model):
     __tablename__ = 'transactions'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Danh sách giao dịch: lọc theo user + is_deleted, sắp xếp theo ngày
+        db.Index('ix_transactions_user_deleted_date', 'user_id', 'is_deleted', 'date', 'id'),
+        # Kiểm tra giao dịch liên quan khi xoá ví/mục tiêu/danh mục
+        db.Index('ix_transactions_wallet', 'wallet_id'),
+        db.Index('ix_transactions_goal', 'goal_id'),
+        db.Index('ix_transactions_category', 'category_id'),
+        {'extend_existing': True}
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.id'), nullable=True)
@@ -77,19 +99,105 @@ class Transaction(db.Model):
 # Bảng Ngân sách
 class Budget(db.Model):
     __tablename__ = 'budgets'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_budgets_user_deleted', 'user_id', 'is_deleted'),
+        db.Index('ix_budgets_user_category_deleted', 'user_id', 'category_id', 'is_deleted'),
+        {'extend_existing': True}
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
-    amount = db.Column(db.Numeric(15,2), nullable=False, default=0)
+    amount = db.Column(db.Numeric(15,2), nullable=False, default=0)  # Số còn lại, giảm theo mỗi giao dịch chi của danh mục
+    limit_amount = db.Column(db.Numeric(15,2), nullable=False, default=0)  # Hạn mức khi tạo/sửa, đã chi = limit_amount - amount
     start_date = db.Column(db.Date, nullable=False, default=datetime.date.today)
     end_date = db.Column(db.Date, nullable=False)
     is_deleted = db.Column(db.Boolean, default=False)
     deleted_at = db.Column(db.DateTime, nullable=True)
 
-    def __init__(self, user_id, category_id, start_date=None, end_date=None):
+    def __init__(self, user_id, category_id, amount=0, start_date=None, end_date=None, **kwargs):
+        super().__init__(**kwargs)
         self.user_id = user_id
         self.category_id = category_id
+        self.amount = amount
+        self.limit_amount = amount
         self.start_date = start_date if start_date else datetime.date.today()
         self.end_date = end_date if end_date else (self.start_date + datetime.timedelta(days=30))
 
+
+
+# Bảng tổng hợp số liệu của user (cập nhật dần theo từng giao dịch) cho dashboard
+class UserSummary(db.Model):
+    __tablename__ = 'user_summaries'
+    __table_args__ = {'extend_existing': True}
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_balance = db.Column(db.Numeric(15,2), nullable=False, default=0)
+    total_savings = db.Column(db.Numeric(15,2), nullable=False, default=0)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    monthly_income = db.Column(db.Numeric(15,2), nullable=False, default=0)
+    monthly_expense = db.Column(db.Numeric(15,2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+
+# Bảng tổng hợp thu/chi theo tháng, danh mục và loại giao dịch
+class MonthlyRollup(db.Model):
+    __tablename__ = 'monthly_rollups'
+    __table_args__ = {'extend_existing': True}
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    year_month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
+    transaction_type = db.Column(db.Enum('Income', 'Expense', name='transaction_type_enum'), nullable=False)
+    total_amount = db.Column(db.Numeric(15,2), nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Khoá duy nhất của dòng rollup: NULL không trùng nhau trong UNIQUE, nên dùng coalesce để giao dịch không có danh mục
+# cũng chỉ có một dòng mỗi tháng/loại (INSERT song song trong apply_delta bị IntegrityError rồi chuyển sang UPDATE)
+db.Index('ux_monthly_rollups_key', MonthlyRollup.user_id, MonthlyRollup.year_month,
+         db.func.coalesce(MonthlyRollup.category_id, 0), MonthlyRollup.transaction_type, unique=True)
+
+
+# Bảng refresh token: chỉ lưu jti, family (chuỗi token được xoay vòng) và hạn dùng
+class RefreshToken(db.Model):
+    __tablename__ = 'refresh_tokens'
+    __table_args__ = (
+        db.Index('ix_refresh_tokens_family', 'family'),
+        db.Index('ix_refresh_tokens_expires_at', 'expires_at'),
+        {'extend_existing': True}
+    )
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    family = db.Column(db.String(36), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked = db.Column(db.Boolean, nullable=False, default=False)
+
+
+# Bảng thu hồi token: theo family của phiên đăng nhập (jti) hoặc theo user (mọi token cấp trước revoked_at)
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        db.Index('ix_revoked_tokens_expires_at', 'expires_at'),
+        {'extend_existing': True}
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+# Nhịp heartbeat do app ghi lên primary, đọc lại trên replica để đo độ trễ sao chép
+class ReplicaHeartbeat(db.Model):
+    __tablename__ = 'replica_heartbeat'
+    __table_args__ = {'extend_existing': True}
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.DateTime, nullable=False)
+
+
+# Version dữ liệu theo user và loại entity, tăng mỗi khi service ghi commit (dùng làm ETag cho các API GET)
+class EntityVersion(db.Model):
+    __tablename__ = 'entity_versions'
+    __table_args__ = {'extend_existing': True}
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    entity = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
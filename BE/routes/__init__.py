@@ -5,6 +5,11 @@ from .goal_routes import goal_bp
 from .category_routes import category_bp
 from .transaction_routes import transaction_bp
 from .budget_routes import budget_bp
+from .summary_routes import summary_bp
+from .report_routes import report_bp
+from .dashboard_routes import dashboard_bp
+from .metrics_routes import metrics_bp
+from .batch_routes import batch_bp
 
 # Danh sách các Blueprint
 all_blueprints = [
@@ -14,5 +19,10 @@ all_blueprints = [
     goal_bp,
     category_bp,
     transaction_bp,
-    budget_bp
+    budget_bp,
+    summary_bp,
+    report_bp,
+    dashboard_bp,
+    metrics_bp,
+    batch_bp
 ]
\ No newline at end of file
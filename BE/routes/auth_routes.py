@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from services.auth_service import AuthService
+from services.jwt_service import jwt_refresh_required
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -17,3 +18,19 @@ def login():
     data = request.get_json()
     result = AuthService.user_login(data)
     return jsonify(result), result.get('status_code', 200)
+
+
+# Lấy access token mới bằng refresh token (header Authorization: Bearer <refresh_token>)
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_refresh_required
+def refresh(current_user, claims):
+    result = AuthService.refresh_token_service(current_user, claims)
+    return jsonify(result), result.get('status_code', 200)
+
+
+# Đăng xuất: thu hồi refresh token
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_refresh_required
+def logout(current_user, claims):
+    result = AuthService.logout_service(current_user, claims)
+    return jsonify(result), result.get('status_code', 200)
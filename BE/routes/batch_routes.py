@@ -0,0 +1,14 @@
+from flask import Blueprint, jsonify, request
+from services.jwt_service import jwt_required
+from services.batch_service import BatchService
+
+batch_bp = Blueprint('batch', __name__, url_prefix='/batch')
+
+
+# Gọi nhiều API trong một request: {"requests": [{"method", "path", "body"}, ...], "atomic": false}
+@batch_bp.route('/', methods=['POST'])
+@jwt_required
+def run_batch(current_user):
+    data = request.get_json(silent=True) or {}
+    result = BatchService.run_batch_service(int(current_user), data)
+    return jsonify(result), result.get('status_code', 200)
@@ -0,0 +1,14 @@
+from flask import Blueprint, jsonify, request
+from services.jwt_service import jwt_required
+from services.dashboard_service import DashboardService
+
+dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
+
+
+# Lấy toàn bộ dữ liệu trang dashboard trong một request (?recent=số giao dịch gần nhất, mặc định 10, tối đa 50)
+@dashboard_bp.route('/', methods=['GET'])
+@jwt_required
+def get_dashboard(current_user):
+    recent = request.args.get('recent', 10, type=int)
+    result = DashboardService.get_dashboard_service(int(current_user), recent)
+    return jsonify(result), result.get('status_code', 200)
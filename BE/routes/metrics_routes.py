@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify, request, current_app
+from extensions import result_cache
+import hmac
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+
+# Số hit/miss của cache kết quả service (theo từng worker process), số liệu chung của cả process nên không mở cho user:
+# chỉ trả về khi header X-Metrics-Token khớp METRICS_TOKEN, chưa cấu hình token hoặc sai token thì 404
+@metrics_bp.route('/cache', methods=['GET'])
+def cache_metrics():
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token or not hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token):
+        return jsonify({'message': 'Not found'}), 404
+    return jsonify(result_cache.metrics()), 200
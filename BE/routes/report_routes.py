@@ -0,0 +1,13 @@
+from flask import Blueprint, request, jsonify
+from services.jwt_service import jwt_required
+from services.report_service import ReportService
+
+report_bp = Blueprint('report', __name__, url_prefix='/reports')
+
+
+# Báo cáo thu/chi theo tháng: ?from=YYYY-MM&to=YYYY-MM
+@report_bp.route('/monthly', methods=['GET'])
+@jwt_required
+def monthly_report(current_user):
+    result = ReportService.get_monthly_report_service(int(current_user), request.args.get('from'), request.args.get('to'))
+    return jsonify(result), result.get('status_code', 200)
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+from services.jwt_service import jwt_required
+from services.summary_service import SummaryService
+
+summary_bp = Blueprint('summary', __name__, url_prefix='/summary')
+
+
+# Lấy số liệu tổng hợp cho dashboard
+@summary_bp.route('/', methods=['GET'])
+@jwt_required
+def get_summary(current_user):
+    result = SummaryService.get_summary_service(int(current_user))
+    return jsonify(result), result.get('status_code', 200)
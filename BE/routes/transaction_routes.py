@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from services.jwt_service import jwt_required
 from services.transaction_service import TransactionService
+from services.import_service import ImportService
+import json
 
 
 transaction_bp = Blueprint('transaction', __name__, url_prefix='/transactions')
@@ -19,10 +21,80 @@ def create_transaction(current_user):
     return jsonify(result), result.get('status_code', 200)
     
 
+# Đọc từng dòng NDJSON từ request stream, dòng lỗi trả về None
+def iter_ndjson(stream):
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+# Tạo nhiều giao dịch: JSON array hoặc NDJSON (Content-Type: application/x-ndjson)
+@transaction_bp.route('/bulk', methods=['POST'])
+@jwt_required
+def bulk_create_transactions(current_user):
+    if request.mimetype == 'application/x-ndjson':
+        rows = iter_ndjson(request.stream)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({'message': 'Request body must be a JSON array'}), 400
+
+    result = TransactionService.bulk_create_transactions_service(int(current_user), rows, current_app.config['IMPORT_BATCH_SIZE'])
+    return jsonify(result), result.get('status_code', 200)
+    
+
+# Import sao kê ngân hàng (multipart): file, wallet_id, format=csv|ofx, category_id, mapping (JSON), batch_size
+@transaction_bp.route('/import', methods=['POST'])
+@jwt_required
+def import_statement(current_user):
+    upload = request.files.get('file')
+    wallet_id = request.form.get('wallet_id', type=int)
+    if not upload or not wallet_id:
+        return jsonify({'message': 'File and wallet_id are required'}), 400
+
+    try:
+        mapping = json.loads(request.form['mapping']) if request.form.get('mapping') else None
+    except ValueError:
+        return jsonify({'message': 'Invalid column mapping'}), 400
+    if mapping is not None and (not isinstance(mapping, dict) or
+                                not all(isinstance(k, str) and isinstance(v, str) for k, v in mapping.items())):
+        return jsonify({'message': 'Column mapping must be an object of field name to column name'}), 400
+
+    batch_size = request.form.get('batch_size', default=current_app.config['IMPORT_BATCH_SIZE'], type=int)
+    if batch_size < 1:
+        return jsonify({'message': 'batch_size must be at least 1'}), 400
+
+    file_format = request.form.get('format') or ('ofx' if (upload.filename or '').lower().endswith('.ofx') else 'csv')
+    result = ImportService.import_statement_service(
+        int(current_user),
+        wallet_id,
+        upload.stream,
+        file_format=file_format.lower(),
+        mapping=mapping,
+        category_id=request.form.get('category_id', type=int),
+        batch_size=batch_size
+    )
+    return jsonify(result), result.get('status_code', 200)
+
+
 # Lấy danh sách giao dịch
 @transaction_bp.route('/', methods=['GET'])
 @jwt_required
 def get_transactions(current_user):
+    # Chế độ cursor: ?after=<cursor>&limit=&include_total=
+    if 'after' in request.args or 'limit' in request.args:
+        result = TransactionService.get_transactions_cursor_service(
+            int(current_user),
+            after=request.args.get('after'),
+            limit=request.args.get('limit', default=10, type=int),
+            include_total=request.args.get('include_total', default='false').lower() == 'true'
+        )
+        return jsonify(result), result.get('status_code', 200)
+
     page = request.args.get('page', default=1, type=int)
     per_page = request.args.get('per_page', default=10, type=int)
     result = TransactionService.get_transactions_service(int(current_user), page, per_page)
@@ -33,12 +105,44 @@ def get_transactions(current_user):
 @transaction_bp.route('/deleted', methods=['GET'])
 @jwt_required
 def get_deleted_transactions(current_user):
+    # Chế độ cursor: ?after=<cursor>&limit=&include_total=
+    if 'after' in request.args or 'limit' in request.args:
+        result = TransactionService.get_transactions_cursor_service(
+            int(current_user),
+            after=request.args.get('after'),
+            limit=request.args.get('limit', default=10, type=int),
+            include_total=request.args.get('include_total', default='false').lower() == 'true',
+            is_deleted=True
+        )
+        return jsonify(result), result.get('status_code', 200)
+
     page = request.args.get('page', default=1, type=int)
     per_page = request.args.get('per_page', default=10, type=int)
     result = TransactionService.get_deleted_transactions_service(int(current_user), page, per_page)
     return jsonify(result), result.get('status_code', 200)
 
 
+# Export ledger: ?format=csv|ndjson&from=YYYY-MM-DD&to=YYYY-MM-DD&wallet_id=
+@transaction_bp.route('/export', methods=['GET'])
+@jwt_required
+def export_transactions(current_user):
+    result = TransactionService.export_transactions_service(
+        int(current_user),
+        file_format=request.args.get('format', default='csv').lower(),
+        date_from=request.args.get('from'),
+        date_to=request.args.get('to'),
+        wallet_id=request.args.get('wallet_id', type=int)
+    )
+    if 'stream' not in result:
+        return jsonify(result), result.get('status_code', 200)
+
+    return Response(
+        stream_with_context(result['stream']),
+        mimetype=result['mimetype'],
+        headers={'Content-Disposition': f'attachment; filename={result["filename"]}'}
+    )
+
+
 # Lấy thông tin giao dịch
 @transaction_bp.route('/<int:transaction_id>', methods=['GET'])
 @jwt_required
@@ -1,8 +1,11 @@
-from extensions import db
-from models import User
-from flask_jwt_extended import create_access_token
+from flask import current_app
+from extensions import db, PasswordHasherBusy, retry_on_lock
+from models import User, RefreshToken
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy.exc import SQLAlchemyError
+from .jwt_service import revoke, purge_revoked_tokens
 from datetime import datetime, timedelta
-import re, logging
+import re, logging, uuid
 
 # Cấu hình logging
 logging.basicConfig(level=logging.INFO)
@@ -68,6 +71,11 @@ class AuthService:
             logger.info(f'User registration successfully')
             return {'message': 'User registered successfully', 'status_code': 201}
         
+        except PasswordHasherBusy:
+            db.session.rollback()
+            logger.warning('Password hashing queue is full, rejecting registration')
+            return {'message': 'Server is busy, please try again later', 'status_code': 503}
+
         except Exception as e:
             db.session.rollback()
             logger.error(f'Error while registering user {data["username"]}: {e}')
@@ -89,6 +97,15 @@ class AuthService:
             if not user or not user.check_password(data.get('password')):
                 logger.warning(f'Invalid email or password')
                 return {'message': 'Invalid email or password', 'status_code': 401}
+
+            # Hash lại password nếu tham số hash đã thay đổi trong Config (pool bận thì để lần đăng nhập sau)
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(data.get('password'))
+                    db.session.commit()
+                    logger.info(f'Rehashed password for user ID {user.id}')
+                except PasswordHasherBusy:
+                    logger.warning(f'Password hashing queue is full, skip rehash for user ID {user.id}')
             
             # Nếu user đã yêu cầu xoá nhưng vẫn đăng nhập trong 30 ngày thì khôi phục tài khoản
             if not user.active and user.deleted_at:
@@ -99,11 +116,12 @@ class AuthService:
                     db.session.commit()
 
             # Tạo jwt khi user đăng nhập
-            token = create_access_token(identity=str(user.id), expires_delta=timedelta(minutes=30))
+            tokens = AuthService.issue_tokens(user.id)
+            db.session.commit()
 
             logger.info(f'Log in successfully')
             return {
-                'token': token, 
+                **tokens,
                 'message': 'User logged in successfully',
                 'user': {
                     'id': user.id,
@@ -113,8 +131,96 @@ class AuthService:
                 'status_code': 200
             }
 
+        except PasswordHasherBusy:
+            logger.warning('Password hashing queue is full, rejecting login')
+            return {'message': 'Server is busy, please try again later', 'status_code': 503}
+
         except Exception as e:
+            db.session.rollback()
             logger.error(f'Error while login: {e}')
             return {'message': 'An error occured while login', 'status_code': 500}
-        
-        
+
+
+    # Tạo access token và refresh token mới (cùng family khi xoay vòng), chưa commit
+    def issue_tokens(user_id, family=None):
+        jti = str(uuid.uuid4())
+        family = family or jti
+        refresh_expires = timedelta(days=current_app.config.get('JWT_REFRESH_TOKEN_DAYS', 30))
+
+        token = create_access_token(
+            identity=str(user_id),
+            expires_delta=timedelta(minutes=current_app.config.get('JWT_ACCESS_TOKEN_MINUTES', 30)),
+            additional_claims={'family': family}
+        )
+        refresh_token = create_refresh_token(
+            identity=str(user_id),
+            expires_delta=refresh_expires,
+            additional_claims={'jti': jti, 'family': family}
+        )
+        db.session.add(RefreshToken(jti=jti, user_id=user_id, family=family, expires_at=datetime.utcnow() + refresh_expires))
+        return {'token': token, 'refresh_token': refresh_token}
+
+
+    # Đổi refresh token lấy cặp token mới: chỉ kiểm tra chữ ký và một lần tra cứu db, không chạy KDF
+    @retry_on_lock
+    def refresh_token_service(user_id, claims):
+        try:
+            stored = db.session.get(RefreshToken, claims['jti'])
+            if not stored or stored.user_id != int(user_id):
+                logger.warning(f'Unknown refresh token for user ID {user_id}')
+                return {'message': 'Refresh token is invalid', 'status_code': 401}
+
+            # Đánh dấu đã dùng bằng một câu UPDATE có điều kiện: hai request đổi cùng token thì chỉ một request thành công
+            # Token đã dùng rồi (hoặc request khác vừa dùng) mà bị dùng lại => có thể bị lộ, thu hồi cả family
+            claimed = RefreshToken.query.filter_by(jti=stored.jti, revoked=False) \
+                .update({'revoked': True}, synchronize_session=False)
+            if claimed == 0:
+                RefreshToken.query.filter_by(family=stored.family).update({'revoked': True}, synchronize_session=False)
+                revoke(jti=stored.family)
+                db.session.commit()
+                logger.warning(f'Refresh token reuse detected for user ID {user_id}, revoked family {stored.family}')
+                return {'message': 'Refresh token has been revoked', 'status_code': 401}
+
+            user = db.session.get(User, stored.user_id)
+            if not user or not user.active:
+                db.session.rollback()
+                logger.warning(f'User ID {user_id} is not active')
+                return {'message': 'User is not active', 'status_code': 401}
+
+            tokens = AuthService.issue_tokens(stored.user_id, stored.family)
+            db.session.commit()
+
+            logger.info(f'Refreshed tokens for user ID {user_id}')
+            return {**tokens, 'message': 'Token refreshed successfully', 'status_code': 200}
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f'Error refreshing token for user ID {user_id}: {e}')
+            return {'message': 'An error occurred while refreshing token', 'status_code': 500}
+
+
+    # Đăng xuất: thu hồi cả family của refresh token và các access token cùng phiên
+    @retry_on_lock
+    def logout_service(user_id, claims):
+        try:
+            family = claims.get('family', claims['jti'])
+            RefreshToken.query.filter_by(user_id=int(user_id), family=family).update({'revoked': True}, synchronize_session=False)
+            revoke(jti=family)
+            db.session.commit()
+
+            logger.info(f'User ID {user_id} logged out')
+            return {'message': 'User logged out successfully', 'status_code': 200}
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f'Error logging out user ID {user_id}: {e}')
+            return {'message': 'An error occurred while logging out', 'status_code': 500}
+
+
+    # Xoá các refresh token và dòng thu hồi đã hết hạn để bảng luôn nhỏ
+    def purge_refresh_tokens():
+        count = RefreshToken.query.filter(RefreshToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+        db.session.commit()
+        count += purge_revoked_tokens()
+        logger.info(f'Purged {count} expired token row(s)')
+        return count
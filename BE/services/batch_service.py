@@ -0,0 +1,115 @@
+from flask import current_app, request, g
+from werkzeug.test import EnvironBuilder
+from extensions import db
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from .jwt_service import batch_identity
+
+# Cấu hình logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BatchService:
+    METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+    # Đăng nhập/refresh/đăng xuất dùng token riêng của từng request, và không cho batch lồng nhau
+    EXCLUDED_BLUEPRINTS = ('auth', 'batch')
+
+    # Kiểm tra danh sách request con: [{'method': 'GET', 'path': '/wallets/?page=2', 'body': {...}}, ...]
+    def validate(items):
+        if not isinstance(items, list) or not items:
+            return 'requests must be a non-empty list'
+        max_requests = current_app.config.get('BATCH_MAX_REQUESTS', 20)
+        if len(items) > max_requests:
+            return f'A batch can contain at most {max_requests} requests'
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not isinstance(item.get('path'), str) or not item['path'].startswith('/'):
+                return f'Request {index}: path is required and must start with /'
+            if str(item.get('method', 'GET')).upper() not in BatchService.METHODS:
+                return f'Request {index}: method must be one of {", ".join(BatchService.METHODS)}'
+            if item.get('body') is not None and not isinstance(item['body'], (dict, list)):
+                return f'Request {index}: body must be a JSON object or array'
+        return None
+
+
+    # Chạy một request con ngay trong process (cùng app context, cùng db.session) với user của request /batch
+    def dispatch(user_id, item):
+        builder = EnvironBuilder(
+            path=item['path'],
+            method=str(item.get('method', 'GET')).upper(),
+            json=item.get('body'),
+            base_url=request.host_url
+        )
+        # Request con chạy before/after_request trên cùng g: giữ số liệu của request /batch
+        queries, db_time_ms, cache_status = g.get('db_query_count', 0), g.get('db_time_ms', 0), g.get('cache_status')
+        token = batch_identity.set(str(user_id))
+        try:
+            with current_app.request_context(builder.get_environ()):
+                if request.blueprint in BatchService.EXCLUDED_BLUEPRINTS:
+                    return {'status': 400, 'body': {'message': f'{item["path"]} cannot be called in a batch'}}
+                response = current_app.full_dispatch_request()
+        except Exception as e:
+            logger.error(f'Error in batch request {item["path"]} for user ID {user_id}: {e}')
+            return {'status': 500, 'body': {'message': 'An error occurred while processing the request'}}
+        finally:
+            batch_identity.reset(token)
+            g.db_query_count = queries + g.get('db_query_count', 0)
+            g.db_time_ms = db_time_ms + g.get('db_time_ms', 0)
+            g.cache_status = cache_status
+
+        body = response.get_json(silent=True)
+        if body is None and response.status_code >= 400:
+            body = {'message': response.status}  # Trang lỗi HTML mặc định của Flask (404, 405...)
+        return {'status': response.status_code, 'body': body}
+
+
+    # Chạy lần lượt các request con, kết quả trả về theo đúng thứ tự
+    # atomic=True: mọi request con chạy trong một transaction (mỗi request một savepoint), một request lỗi thì huỷ tất cả
+    def run_batch_service(user_id, data):
+        items = data.get('requests')
+        error = BatchService.validate(items)
+        if error:
+            return {'message': error, 'status_code': 400}
+
+        if not data.get('atomic', False):
+            return {'responses': [BatchService.dispatch(user_id, item) for item in items], 'status_code': 200}
+
+        session = db.session()
+        responses = []
+        try:
+            session.rollback()  # Bắt đầu transaction mới
+            if session.get_bind().dialect.name == 'sqlite':
+                session.execute(text('BEGIN IMMEDIATE'))  # Giữ khoá ghi từ đầu, pysqlite không tự BEGIN trước SAVEPOINT
+            session.info['wrote'] = True  # Request GET con cũng đọc từ primary để thấy dữ liệu chưa commit
+
+            for item in items:
+                session.info['group_savepoint'] = session.begin_nested()
+                response = BatchService.dispatch(user_id, item)
+                savepoint = session.info.pop('group_savepoint')
+                responses.append(response)
+                if response['status'] >= 400:
+                    break
+                if savepoint.is_active:
+                    savepoint.commit()
+
+            failed = len(responses) - 1
+            if responses[failed]['status'] >= 400:
+                session.rollback()
+                skipped = {'status': 424, 'body': {'message': 'Not executed because an earlier request in the batch failed'}}
+                responses += [skipped] * (len(items) - len(responses))
+                return {
+                    'message': f'Request {failed} failed, no changes were saved',
+                    'responses': responses,
+                    'committed': False,
+                    'status_code': responses[failed]['status']
+                }
+
+            session.commit()
+            return {'responses': responses, 'committed': True, 'status_code': 200}
+
+        except SQLAlchemyError as e:
+            session.info.pop('group_savepoint', None)
+            session.rollback()
+            logger.error(f'Error committing atomic batch for user ID {user_id}: {e}')
+            return {'message': 'An error occurred while processing the batch', 'status_code': 500}
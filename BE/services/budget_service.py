@@ -1,16 +1,23 @@
-from extensions import db
+from extensions import db, retry_on_lock, read_only, group_commit, versioned, cached
 from models import Budget, Category
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timedelta
 from .wallet_service import WalletService
+from .list_service import ListService
 
 # Cấu hình logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class BudgetService:
+    # Các cột của danh sách budget
+    LIST_COLUMNS = ('id', 'category_id', 'amount', 'start_date', 'end_date')
+
     # Tạo budget mới
+    @group_commit
+    @versioned('budgets')
+    @retry_on_lock
     def create_budget_service(user_id, data, force_create=False):
         logger.info(f'Creating budget for user ID {user_id} with data {data}')
 
@@ -41,7 +48,7 @@ class BudgetService:
             
             # Kiểm tra budget đã soft delete
             deleted_budget = Budget.query.filter_by(user_id=user_id, category_id=data['category_id'], is_deleted=True).first()
-            if deleted_budget or not force_create:
+            if deleted_budget and not force_create:
                 logger.info(f'Budget {data["category_id"]} was soft deleted, asking user for restore')
                 return {
                     'message': 'Budget previously deleted. Do you want to restore it?',
@@ -86,10 +93,12 @@ class BudgetService:
         
 
     # Lấy danh sách budget
+    @read_only
+    @cached('budgets')
     def get_budgets_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            budgets = Budget.query.filter_by(user_id=user_id, is_deleted=False).paginate(page=page, per_page=per_page, error_out=False)
+            budgets = ListService.paginate(Budget, BudgetService.LIST_COLUMNS, user_id, False, page, per_page)
             budgets_list = [{
                 'id': b.id,
                 'category_id': b.category_id,
@@ -114,10 +123,11 @@ class BudgetService:
         
 
     # Lấy danh sách budget đã xoá
+    @read_only
     def get_deleted_budgets_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            deleted_budgets = Budget.query.filter_by(user_id=user_id, is_deleted=True).paginate(page=page, per_page=per_page, error_out=False)
+            deleted_budgets = ListService.paginate(Budget, BudgetService.LIST_COLUMNS, user_id, True, page, per_page)
             deleted_budgets_list = [{
                 'id': b.id,
                 'category_id': b.category_id,
@@ -142,6 +152,7 @@ class BudgetService:
         
 
     # Lấy thông tin budget
+    @read_only
     def get_budget_service(user_id, budget_id):
         try:
             # Kiểm tra tồn tại
@@ -166,6 +177,9 @@ class BudgetService:
         
     
     # Cập nhật budget
+    @group_commit
+    @versioned('budgets')
+    @retry_on_lock
     def update_budget_service(user_id, budget_id, data):
         logger.info(f'Updating budget ID {budget_id} for user ID {user_id} with data {data}')
 
@@ -190,6 +204,7 @@ class BudgetService:
                     return {'message': 'Amount must be greater than 0 VND', 'status_code': 400}
                 
                 budget.amount = data['amount']
+                budget.limit_amount = data['amount']  # Đặt lại hạn mức: tính chi tiêu lại từ đầu
 
             # Lấy giá trị hiện tại của start_date và end_date
             start_date = budget.start_date
@@ -232,6 +247,9 @@ class BudgetService:
         
 
     # Xoá budget vĩnh viễn
+    @group_commit
+    @versioned('budgets')
+    @retry_on_lock
     def delete_budget_service(user_id, budget_id):
         logger.info(f'Deleting budget ID {budget_id} for user ID {user_id}')
 
@@ -257,6 +275,9 @@ class BudgetService:
         
 
     # Xoá budget tạm thời
+    @group_commit
+    @versioned('budgets')
+    @retry_on_lock
     def soft_delete_budget_service(user_id, budget_id):
         logger.info(f'Soft deleting budget ID {budget_id} for user ID {user_id}')
 
@@ -283,6 +304,9 @@ class BudgetService:
         
 
     # Khôi phục budget
+    @group_commit
+    @versioned('budgets')
+    @retry_on_lock
     def restore_budget_service(user_id, budget_id):
         logger.info(f'Restoring budget ID {budget_id} for user ID {user_id}')
 
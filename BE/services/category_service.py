@@ -1,16 +1,24 @@
-from extensions import db
-from models import Category, Transaction
+from extensions import db, retry_on_lock, read_only, group_commit, versioned, cached
+from models import Category, Transaction, MonthlyRollup
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 from .wallet_service import WalletService
 from datetime import datetime
+from .list_service import ListService
+from .report_service import ReportService
 
 # Cấu hình logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class CategoryService:
+    # Cột trả về khi liệt kê category
+    LIST_COLUMNS = ('id', 'name')
+
     # Tạo category mới
+    @group_commit
+    @versioned('categories')
+    @retry_on_lock
     def create_category_service(user_id, data):
         logger.info(f'Creating category for user ID {user_id}')
 
@@ -70,10 +78,12 @@ class CategoryService:
         
     
     # Lấy danh sách category
+    @read_only
+    @cached('categories')
     def get_categories_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            categories = Category.query.filter_by(user_id=user_id, is_deleted=False).paginate(page=page, per_page=per_page, error_out=False)
+            categories = ListService.paginate(Category, CategoryService.LIST_COLUMNS, user_id, False, page, per_page)
             categories_list = [{'id': c.id, 'name': c.name} for c in categories.items]
             
             # Trả về danh sách category
@@ -92,10 +102,11 @@ class CategoryService:
         
 
     # Lấy danh sách category đã xoá
+    @read_only
     def get_deleted_categories_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            deleted_categories = Category.query.filter_by(user_id=user_id, is_deleted=True).paginate(page=page, per_page=per_page, error_out=False)
+            deleted_categories = ListService.paginate(Category, CategoryService.LIST_COLUMNS, user_id, True, page, per_page)
             deleted_categories_list = [{'id': c.id, 'name': c.name} for c in deleted_categories.items]
             
             # Trả về danh sách category đã xoá
@@ -114,6 +125,7 @@ class CategoryService:
         
     
     # Lấy thông tin category
+    @read_only
     def get_category_service(user_id, category_id):
         try:
             # Kiểm tra tồn tại
@@ -135,6 +147,9 @@ class CategoryService:
         
 
     # Cập nhật category
+    @group_commit
+    @versioned('categories')
+    @retry_on_lock
     def update_category_service(user_id, category_id, data):
         logger.info(f'Updating category ID {category_id} for user ID {user_id} with data {data}')
 
@@ -173,6 +188,9 @@ class CategoryService:
         
 
     # Xoá category
+    @group_commit
+    @versioned('categories', 'transactions')
+    @retry_on_lock
     def delete_category_service(user_id, category_id):
         logger.info(f'Received request to delete category ID {category_id} for user ID {user_id}')
 
@@ -183,6 +201,13 @@ class CategoryService:
                 logger.warning(f'Category ID {category_id} not found for user ID {user_id}')
                 return {'message': 'Category not found', 'status_code': 404}
             
+            # Giao dịch của danh mục chuyển thành không có danh mục (category_id = NULL),
+            # nên gộp các dòng rollup của danh mục vào dòng không danh mục cùng tháng/loại
+            for rollup in MonthlyRollup.query.filter_by(user_id=user_id, category_id=category_id).all():
+                ReportService.apply_delta(user_id, rollup.year_month, None, rollup.transaction_type,
+                                          rollup.total_amount, rollup.transaction_count)
+                db.session.delete(rollup)
+
             # Xoá khỏi db
             db.session.delete(category)
             db.session.commit()
@@ -198,6 +223,9 @@ class CategoryService:
         
 
     # Xoá tạm thời
+    @group_commit
+    @versioned('categories')
+    @retry_on_lock
     def soft_delete_category_service(user_id, category_id):
         logger.info(f'Soft deleting category ID {category_id} for user ID {user_id}')
 
@@ -224,6 +252,9 @@ class CategoryService:
         
 
     # Khôi phục
+    @group_commit
+    @versioned('categories')
+    @retry_on_lock
     def restore_category_service(user_id, category_id):
         logger.info(f'Restoring category ID {category_id} for user ID {user_id}')
 
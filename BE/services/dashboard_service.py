@@ -0,0 +1,147 @@
+from flask import g, has_app_context, current_app
+from extensions import db, cached, primary
+from models import Wallet, Goal, Budget, Category, Transaction
+import logging
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+from .summary_service import SummaryService
+
+# Cấu hình logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class DashboardService:
+    # Số câu SQL tối đa của get_dashboard_service khi đã có dòng summary (mỗi phần một câu, không phụ thuộc số dòng)
+    # Vượt ngân sách: log cảnh báo, còn khi TESTING thì raise QueryBudgetExceeded
+    # Kiểm tra tự động: tests/test_dashboard.py và python -m benchmarks.dashboard_check (chạy với TESTING=True)
+    QUERY_BUDGET = 6
+
+    WALLETS = select(Wallet.id, Wallet.name, Wallet.balance, Wallet.currency)
+    GOALS = select(Goal.id, Goal.name, Goal.target_amount, Goal.saved_amount, Goal.deadline)
+    CATEGORIES = select(Category.id, Category.name)
+
+
+    # Ngân sách kèm tên danh mục. Mỗi giao dịch chi của danh mục được trừ vào amount (số còn lại) của ngân sách,
+    # nên đã chi = hạn mức (limit_amount) - còn lại, đúng với những gì đã trừ vào ngân sách
+    BUDGETS = select(Budget.id, Budget.category_id, Category.name, Budget.amount, Budget.limit_amount,
+                     Budget.start_date, Budget.end_date) \
+        .select_from(Budget) \
+        .outerjoin(Category, Category.id == Budget.category_id)
+
+
+    # Giao dịch gần nhất kèm tên danh mục (seek theo index user_id, is_deleted, date, id)
+    def recent_query(user_id, limit):
+        return select(Transaction.id, Transaction.amount, Transaction.transaction_type, Transaction.date, Transaction.note,
+                      Transaction.wallet_id, Transaction.goal_id, Transaction.category_id, Category.name) \
+            .outerjoin(Category, Category.id == Transaction.category_id) \
+            .where(Transaction.user_id == user_id, Transaction.is_deleted == False) \
+            .order_by(Transaction.date.desc(), Transaction.id.desc()) \
+            .limit(limit)
+
+
+    # queries: số câu SQL của dashboard, tính cả câu đọc summary
+    def check_query_budget(user_id, queries):
+        if queries <= DashboardService.QUERY_BUDGET:
+            return
+        message = f'Dashboard for user ID {user_id} used {queries} queries (budget {DashboardService.QUERY_BUDGET})'
+        if current_app.testing:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+    # Toàn bộ dữ liệu cho trang dashboard trong một response: ví, goal (tiến độ), ngân sách (đã chi / hạn mức),
+    # danh mục, giao dịch gần nhất và số liệu tổng hợp
+    # Đọc từ primary (cả version dùng làm key cache): số liệu tổng hợp có thể được ghi trong request
+    @primary
+    @cached('wallets', 'goals', 'budgets', 'categories', 'transactions')
+    def get_dashboard_service(user_id, recent=10):
+        try:
+            recent = max(1, min(int(recent), 50))
+
+            summary = SummaryService.get_summary_service(user_id)
+            if summary['status_code'] != 200:
+                return summary
+            # Đếm từ sau summary: đọc summary là một câu, tạo/tính lại dòng summary chỉ xảy ra một lần mỗi user/tháng
+            queries_before = g.get('db_query_count', 0) if has_app_context() else 0
+
+            wallets = [{
+                'id': row.id,
+                'name': row.name,
+                'balance': float(row.balance),
+                'currency': row.currency
+            } for row in db.session.execute(DashboardService.WALLETS.where(Wallet.user_id == user_id, Wallet.is_deleted == False).order_by(Wallet.id))]
+
+            today = datetime.utcnow().date()
+            goals = []
+            for row in db.session.execute(DashboardService.GOALS.where(Goal.user_id == user_id, Goal.is_deleted == False).order_by(Goal.id)):
+                progress = row.saved_amount / row.target_amount * 100 if row.target_amount else 0
+                goals.append({
+                    'id': row.id,
+                    'name': row.name,
+                    'target_amount': float(row.target_amount),
+                    'saved_amount': float(row.saved_amount),
+                    'deadline': row.deadline.isoformat(),
+                    'progress': round(float(progress), 2),
+                    'is_achieved': row.saved_amount >= row.target_amount,
+                    'days_remaining': max((row.deadline - today).days, 0)
+                })
+
+            budgets = []
+            for row in db.session.execute(DashboardService.BUDGETS.where(Budget.user_id == user_id, Budget.is_deleted == False).order_by(Budget.id)):
+                limit = float(row.limit_amount)
+                remaining = float(row.amount)
+                budgets.append({
+                    'id': row.id,
+                    'category_id': row.category_id,
+                    'category_name': row.name,
+                    'start_date': row.start_date.isoformat(),
+                    'end_date': row.end_date.isoformat(),
+                    'spent': limit - remaining,
+                    'remaining': remaining,
+                    'limit': limit,
+                    'is_exceeded': remaining < 0
+                })
+
+            categories = [{'id': row.id, 'name': row.name}
+                          for row in db.session.execute(DashboardService.CATEGORIES.where(Category.user_id == user_id, Category.is_deleted == False).order_by(Category.id))]
+
+            recent_transactions = [{
+                'id': row.id,
+                'amount': float(row.amount),
+                'transaction_type': row.transaction_type,
+                'date': row.date.isoformat(),
+                'note': row.note,
+                'wallet_id': row.wallet_id,
+                'goal_id': row.goal_id,
+                'category_id': row.category_id,
+                'category_name': row.name
+            } for row in db.session.execute(DashboardService.recent_query(user_id, recent))]
+
+            # Kiểm tra ngân sách câu SQL (vd: có đoạn code mới truy vấn theo từng dòng)
+            if has_app_context():
+                DashboardService.check_query_budget(user_id, g.get('db_query_count', 0) - queries_before + 1)
+
+            return {
+                'totals': {
+                    **summary['summary'],
+                    'wallet_count': len(wallets),
+                    'budget_limit': sum(b['limit'] for b in budgets),
+                    'budget_spent': sum(b['spent'] for b in budgets)
+                },
+                'wallets': wallets,
+                'goals': goals,
+                'budgets': budgets,
+                'categories': categories,
+                'recent_transactions': recent_transactions,
+                'status_code': 200
+            }
+
+        except (SQLAlchemyError, ValueError) as e:
+            logger.error(f'Error retrieving dashboard for user ID {user_id}: {e}')
+            return {'message': 'An error occurred while retrieving dashboard', 'status_code': 500}
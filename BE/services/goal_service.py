@@ -1,9 +1,12 @@
-from extensions import db
+from extensions import db, retry_on_lock, read_only, group_commit, versioned, cached
 from models import Goal, Transaction
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
+from decimal import Decimal
 from .wallet_service import WalletService
+from .summary_service import SummaryService
+from .list_service import ListService
 
 # Cấu hình logging
 logging.basicConfig(level=logging.INFO)
@@ -11,7 +14,13 @@ logger = logging.getLogger(__name__)
 
 
 class GoalService:
+    # Cột dùng cho danh sách goal
+    LIST_COLUMNS = ('id', 'name', 'target_amount', 'saved_amount', 'deadline')
+
     # Tạo goal mới
+    @group_commit
+    @versioned('goals')
+    @retry_on_lock
     def create_goal_service(user_id, data, force_create=False):
         logger.info(f'Creating goal for user ID {user_id}')
 
@@ -67,6 +76,7 @@ class GoalService:
         
             # Thêm vào db
             db.session.add(new_goal)
+            SummaryService.apply_delta(user_id, savings=new_goal.saved_amount)
             db.session.commit()
             
             # Trả về kết quả
@@ -90,10 +100,11 @@ class GoalService:
 
 
     # Lấy danh sách goal
+    @read_only
     def get_goals_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            goals = Goal.query.filter_by(user_id=user_id, is_deleted=False).paginate(page=page, per_page=per_page, error_out=False)
+            goals = ListService.paginate(Goal, GoalService.LIST_COLUMNS, user_id, False, page, per_page)
             goals_list = [{
                 'id': g.id,
                 'name': g.name,
@@ -118,10 +129,11 @@ class GoalService:
         
 
     # Lấy danh sách goal đã xoá
+    @read_only
     def get_deleted_goals_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            deleted_goals = Goal.query.filter_by(user_id=user_id, is_deleted=True).paginate(page=page, per_page=per_page, error_out=False)
+            deleted_goals = ListService.paginate(Goal, GoalService.LIST_COLUMNS, user_id, True, page, per_page)
             deleted_goals_list = [{
                 'id': g.id,
                 'name': g.name,
@@ -146,6 +158,7 @@ class GoalService:
         
 
     # Lấy thông tin chi tiết goal
+    @read_only
     def get_goal_service(user_id, goal_id):
         try:
             # Kiểm tra tồn tại
@@ -170,6 +183,9 @@ class GoalService:
         
 
     # Cập nhật thông tin goal
+    @group_commit
+    @versioned('goals')
+    @retry_on_lock
     def update_goal_service(user_id, goal_id, data):
         logger.info(f'Updating goal ID {goal_id} for user ID {user_id} with data {data}')
 
@@ -200,6 +216,7 @@ class GoalService:
                 if data['saved_amount'] < 0:
                     logger.warning(f'Saved amount cannot be less than 0 VND')
                     return {'message': 'Target amount cannot be less than 0 VND', 'status_code': 400}           
+                SummaryService.apply_delta(user_id, savings=Decimal(str(data['saved_amount'])) - goal.saved_amount)
                 goal.saved_amount = data['saved_amount']
                 
             # Kiểm tra deadline
@@ -232,6 +249,9 @@ class GoalService:
         
 
     # Xoá goal
+    @group_commit
+    @versioned('goals')
+    @retry_on_lock
     def delete_goal_service(user_id, goal_id):
         logger.info(f'Deleting goal ID {goal_id} for user ID {user_id}')
 
@@ -249,6 +269,8 @@ class GoalService:
                 return {'message': 'Cannot delete goal with associated transactions', 'status_code': 400}
             
             # Xoá khỏi db
+            if not goal.is_deleted:
+                SummaryService.apply_delta(user_id, savings=-goal.saved_amount)
             db.session.delete(goal)
             db.session.commit()
 
@@ -263,6 +285,8 @@ class GoalService:
         
 
     # Trạng thái goal
+    @read_only
+    @cached('goals')
     def get_goal_status_service(user_id, goal_id):
         try:
             # Kiểm tra tồn tại
@@ -306,6 +330,9 @@ class GoalService:
         
 
     # Xoá tạm thời
+    @group_commit
+    @versioned('goals')
+    @retry_on_lock
     def soft_delete_goal_service(user_id, goal_id):
         logger.info(f'Soft deleting goal ID {goal_id} for user ID {user_id}')
 
@@ -319,6 +346,7 @@ class GoalService:
             # Cập nhật db
             goal.is_deleted = True
             goal.deleted_at = datetime.utcnow()
+            SummaryService.apply_delta(user_id, savings=-goal.saved_amount)
             db.session.commit()
 
             # Trả về kết quả
@@ -332,6 +360,9 @@ class GoalService:
         
 
     # Khôi phục
+    @group_commit
+    @versioned('goals')
+    @retry_on_lock
     def restore_goal_service(user_id, goal_id):
         logger.info(f'Restoring goal ID {goal_id} for user ID {user_id}')
 
@@ -345,6 +376,7 @@ class GoalService:
             # Cập nhật db
             goal.is_deleted = False
             goal.deleted_at = None
+            SummaryService.apply_delta(user_id, savings=goal.saved_amount)
             db.session.commit()
 
             # Trả về kết quả
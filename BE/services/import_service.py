@@ -0,0 +1,217 @@
+from extensions import db
+from models import Transaction, Wallet
+import logging, csv, io, re, hashlib, time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from .transaction_service import TransactionService
+from .wallet_service import WalletService
+
+# Cấu hình logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ImportService:
+    # Các định dạng ngày được chấp nhận trong file CSV
+    DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y', '%m/%d/%Y']
+
+    # Mapping mặc định: field của Transaction -> tên cột trong CSV
+    DEFAULT_MAPPING = {
+        'date': 'date',
+        'amount': 'amount',
+        'transaction_type': 'transaction_type',
+        'note': 'note',
+        'category_id': 'category_id'
+    }
+
+    # Giới hạn số lỗi trả về để bộ nhớ không tăng theo kích thước file
+    MAX_ERRORS = 100
+
+
+    # Chuyển chuỗi ngày về datetime
+    def parse_date(value):
+        value = (value or '').strip()
+        for fmt in ImportService.DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        raise ValueError(f'Invalid date: {value}')
+
+
+    # Chuẩn hoá số tiền: số âm là Expense nếu file không có cột loại giao dịch
+    def normalize(date, amount, transaction_type, note, category_id):
+        amount = Decimal(str(amount).replace(',', '').strip())
+        if not transaction_type:
+            transaction_type = 'Expense' if amount < 0 else 'Income'
+        return {
+            'date': date.strftime('%Y-%m-%d %H:%M:%S'),
+            'amount': abs(amount),
+            'transaction_type': transaction_type,
+            'note': note or '',
+            'category_id': category_id
+        }
+
+
+    # Đọc file CSV từng dòng (stream), map cột sang field của Transaction
+    def iter_csv(stream, mapping=None, default_category_id=None):
+        mapping = {**ImportService.DEFAULT_MAPPING, **(mapping or {})}
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        for line in reader:
+            try:
+                yield ImportService.normalize(
+                    ImportService.parse_date(line.get(mapping['date'])),
+                    line.get(mapping['amount']),
+                    (line.get(mapping['transaction_type']) or '').strip(),
+                    line.get(mapping['note']),
+                    line.get(mapping['category_id']) or default_category_id
+                )
+            except (ValueError, InvalidOperation):
+                yield None
+
+
+    # Đọc file OFX từng dòng (stream), mỗi khối <STMTTRN> là một giao dịch
+    def iter_ofx(stream, default_category_id=None):
+        tag = re.compile(r'<(\w+)>([^<\r\n]*)')
+        current = None
+        for raw in io.TextIOWrapper(stream, encoding='utf-8', errors='replace'):
+            for name, value in tag.findall(raw):
+                name = name.upper()
+                if name == 'STMTTRN':
+                    current = {}
+                elif current is not None:
+                    current[name] = value.strip()
+            if current is not None and '</STMTTRN>' in raw.upper():
+                try:
+                    posted = current.get('DTPOSTED', '')
+                    date = datetime.strptime(posted[:14], '%Y%m%d%H%M%S') if len(posted) >= 14 else datetime.strptime(posted[:8], '%Y%m%d')
+                    yield ImportService.normalize(
+                        date,
+                        current.get('TRNAMT'),
+                        None,
+                        current.get('MEMO') or current.get('NAME'),
+                        default_category_id
+                    )
+                except (ValueError, InvalidOperation):
+                    yield None
+                current = None
+
+
+    # Hash dùng để chống trùng: (wallet_id, date, amount, note)
+    def row_hash(wallet_id, date, amount, note):
+        key = f'{wallet_id}|{date}|{Decimal(str(amount)).quantize(Decimal("0.01"))}|{note or ""}'
+        return hashlib.sha1(key.encode()).hexdigest()
+
+
+    # Hash của các giao dịch đã có trong db cùng wallet và cùng ngày với batch
+    def existing_hashes(user_id, wallet_id, batch):
+        dates = {datetime.strptime(row['date'], '%Y-%m-%d %H:%M:%S') for row in batch}
+        existing = db.session.query(Transaction.date, Transaction.amount, Transaction.note) \
+            .filter(Transaction.user_id == user_id, Transaction.wallet_id == wallet_id,
+                    Transaction.is_deleted == False, Transaction.date.in_(dates)).all()
+        return {ImportService.row_hash(wallet_id, d.strftime('%Y-%m-%d %H:%M:%S'), a, n) for d, a, n in existing}
+
+
+    # Import sao kê: đọc stream, bỏ dòng trùng, commit theo batch và log tốc độ (rows/s)
+    def import_statement_service(user_id, wallet_id, stream, file_format='csv', mapping=None,
+                                 category_id=None, batch_size=500, progress=None):
+        logger.info(f'Importing {file_format} statement into wallet ID {wallet_id} for user ID {user_id}')
+
+        # Kiểm tra ví tiền
+        if not WalletService.existence_check(Wallet, wallet_id, user_id, is_deleted=False):
+            logger.warning(f'Wallet ID {wallet_id} not found for user ID {user_id}')
+            return {'message': 'Wallet not found', 'status_code': 404}
+
+        if file_format == 'csv':
+            rows = ImportService.iter_csv(stream, mapping, category_id)
+        elif file_format == 'ofx':
+            rows = ImportService.iter_ofx(stream, category_id)
+        else:
+            logger.warning(f'Unsupported import format: {file_format}')
+            return {'message': 'Unsupported file format', 'status_code': 400}
+
+        stats = {'processed': 0, 'created': 0, 'duplicates': 0, 'failed': 0}
+        errors = []
+        started = time.perf_counter()
+
+        def record_error(index, message, status_code):
+            stats['failed'] += 1
+            if len(errors) < ImportService.MAX_ERRORS:
+                errors.append({'row': index + 1, 'message': message, 'status_code': status_code})
+
+        # Trả về None nếu thành công, ngược lại trả về kết quả lỗi của bulk create (vd: 409 số dư ví đã thay đổi)
+        def flush(batch, indexes):
+            # Bỏ các dòng đã có trong db (gồm các batch trước đã commit) hoặc lặp lại trong batch này,
+            # nên bộ nhớ không tăng theo kích thước file
+            existing = ImportService.existing_hashes(user_id, wallet_id, batch)
+            seen = set()
+            new_rows, new_indexes = [], []
+            for index, row in zip(indexes, batch):
+                key = ImportService.row_hash(wallet_id, row['date'], row['amount'], row['note'])
+                if key in existing or key in seen:
+                    stats['duplicates'] += 1
+                    continue
+                seen.add(key)
+                new_rows.append({**row, 'wallet_id': wallet_id})
+                new_indexes.append(index)
+
+            if not new_rows:
+                return None
+
+            # Mỗi batch là một lần commit
+            result = TransactionService.bulk_create_transactions_service(user_id, new_rows, batch_size)
+            if result['status_code'] != 200:
+                return result
+            stats['created'] += result['created']
+            for item in result['results']:
+                if item['status_code'] != 201:
+                    record_error(new_indexes[item['index']], item['message'], item['status_code'])
+            return None
+
+        def failed(result):
+            return {'message': result.get('message', 'An error occurred while importing statement'), **stats,
+                    'status_code': result['status_code']}
+
+        batch, indexes = [], []
+        try:
+            for index, row in enumerate(rows):
+                stats['processed'] += 1
+                if row is None:
+                    record_error(index, 'Invalid row', 400)
+                    continue
+                batch.append(row)
+                indexes.append(index)
+
+                if len(batch) >= batch_size:
+                    error = flush(batch, indexes)
+                    if error:
+                        return failed(error)
+                    batch, indexes = [], []
+
+                    elapsed = time.perf_counter() - started
+                    message = f'Imported {stats["processed"]} rows ({stats["processed"] / elapsed:.0f} rows/s)'
+                    logger.info(message)
+                    if progress:
+                        progress(message)
+
+        # File hỏng (không phải UTF-8, trường CSV quá dài...): các batch trước đã commit, trả về số liệu đến thời điểm lỗi
+        except (UnicodeDecodeError, csv.Error) as e:
+            logger.warning(f'Malformed {file_format} statement for user ID {user_id} after {stats["processed"]} rows: {e}')
+            return {'message': f'Malformed file near row {stats["processed"] + 1}, rows before the last batch were saved',
+                    **stats, 'errors': errors, 'status_code': 400}
+
+        if batch:
+            error = flush(batch, indexes)
+            if error:
+                return failed(error)
+
+        elapsed = time.perf_counter() - started
+        rows_per_second = round(stats['processed'] / elapsed, 2) if elapsed > 0 else 0
+        logger.info(f'Statement import finished for user ID {user_id}: {stats} in {elapsed:.2f}s ({rows_per_second} rows/s)')
+        return {
+            'message': 'Statement imported successfully',
+            **stats,
+            'rows_per_second': rows_per_second,
+            'errors': errors,
+            'status_code': 200
+        }
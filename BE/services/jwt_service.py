@@ -1,14 +1,152 @@
-from flask import request, jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask import request, jsonify, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 from functools import wraps
+from datetime import datetime, timedelta, timezone
+from extensions import db, RoutingSession
+from models import RevokedToken
+from sqlalchemy import event, inspect
+from types import SimpleNamespace
+from .version_service import VersionService
+import threading, time, logging, contextvars
+
+# Cấu hình logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Danh sách thu hồi trong bộ nhớ: kiểm tra O(1) mỗi request,
+# định kỳ lấy thêm các dòng mới (id > last_id) từ bảng revoked_tokens
+class RevocationList:
+    def __init__(self):
+        self.tokens = {}  # jti/family -> hết hạn (epoch)
+        self.users = {}  # user_id -> (revoked_at, hết hạn) (epoch)
+        self.last_id = 0
+        self.next_sync = 0
+        self.lock = threading.Lock()
+
+    def to_epoch(value):
+        return value.replace(tzinfo=timezone.utc).timestamp()
+
+    def add(self, entry):
+        expires_at = RevocationList.to_epoch(entry.expires_at)
+        if entry.jti:
+            self.tokens[entry.jti] = max(expires_at, self.tokens.get(entry.jti, 0))
+        if entry.user_id:
+            revoked_at = RevocationList.to_epoch(entry.revoked_at)
+            current = self.users.get(entry.user_id)
+            if not current or revoked_at > current[0]:
+                self.users[entry.user_id] = (revoked_at, expires_at)
+
+    # Bỏ các mục đã hết hạn (token liên quan cũng đã hết hạn)
+    def prune(self, now):
+        self.tokens = {key: expires for key, expires in self.tokens.items() if expires > now}
+        self.users = {key: value for key, value in self.users.items() if value[1] > now}
+
+    def sync(self):
+        now = time.time()
+        if time.monotonic() < self.next_sync or not self.lock.acquire(blocking=False):
+            return
+        try:
+            entries = RevokedToken.query.filter(RevokedToken.id > self.last_id, RevokedToken.expires_at > datetime.utcnow()) \
+                .order_by(RevokedToken.id).all()
+            for entry in entries:
+                self.add(entry)
+                self.last_id = entry.id
+            self.prune(now)
+            self.next_sync = time.monotonic() + current_app.config.get('REVOCATION_SYNC_SECONDS', 5)
+        except Exception as e:
+            logger.error(f'Error syncing revoked tokens: {e}')
+        finally:
+            self.lock.release()
+
+    def is_revoked(self, claims):
+        self.sync()
+        now = time.time()
+        for key in (claims.get('family'), claims.get('jti')):
+            if key and self.tokens.get(key, 0) > now:
+                return True
+        user = self.users.get(int(claims['sub']))
+        return bool(user and claims.get('iat', 0) < user[0] and user[1] > now)
+
+
+revocation_list = RevocationList()
+
+
+# Thu hồi token: theo family (đăng xuất một phiên) hoặc theo user (mọi token đã cấp), chưa commit
+# Danh sách trong bộ nhớ chỉ được cập nhật khi transaction chứa dòng revoked_tokens commit thành công
+def revoke(jti=None, user_id=None):
+    now = datetime.utcnow()
+    entry = RevokedToken(
+        jti=jti,
+        user_id=user_id,
+        revoked_at=now,
+        expires_at=now + timedelta(minutes=current_app.config.get('JWT_ACCESS_TOKEN_MINUTES', 30))
+    )
+    db.session.add(entry)
+    # Giữ sẵn giá trị: sau commit các thuộc tính bị expire và after_commit không được chạy SQL
+    values = SimpleNamespace(jti=jti, user_id=user_id, revoked_at=entry.revoked_at, expires_at=entry.expires_at)
+    db.session.info.setdefault('pending_revocations', []).append((entry, values))
+    return entry
+
+
+# Commit transaction ngoài cùng: đưa các dòng thu hồi đã lưu vào danh sách trong bộ nhớ
+# Dòng thêm trong savepoint đã rollback (write queue, /batch atomic) trở lại transient nên bị bỏ qua
+@event.listens_for(RoutingSession, 'after_commit')
+def apply_revocations(session):
+    if session.in_nested_transaction():
+        return
+    for entry, values in session.info.pop('pending_revocations', ()):
+        if inspect(entry).persistent:
+            revocation_list.add(values)
+
+
+# Rollback transaction ngoài cùng: không có dòng nào được lưu
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def discard_revocations(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('pending_revocations', None)
+
+
+# Xoá các dòng thu hồi đã hết hạn
+def purge_revoked_tokens():
+    count = RevokedToken.query.filter(RevokedToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+# User đã xác thực ở request /batch, các request con không kiểm tra lại token
+batch_identity = contextvars.ContextVar('batch_identity', default=None)
+
 
 def jwt_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        current_user = batch_identity.get()
+        if current_user is not None:
+            return f(current_user, *args, **kwargs)
         try:
             verify_jwt_in_request()
             current_user = get_jwt_identity()  # Lấy user_id từ token
+            claims = get_jwt()
         except:
             return jsonify({'message': 'Token is invalid or missing'}), 401
+        if revocation_list.is_revoked(claims):
+            return jsonify({'message': 'Token has been revoked'}), 401
+        if request.method == 'GET':
+            return VersionService.conditional_get(current_user, f, *args, **kwargs)  # ETag / 304
         return f(current_user, *args, **kwargs)
     return decorated_function
+
+
+# Dùng cho các route nhận refresh token, truyền thêm claims của token
+def jwt_refresh_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            verify_jwt_in_request(refresh=True)
+            current_user = get_jwt_identity()
+            claims = get_jwt()
+        except:
+            return jsonify({'message': 'Refresh token is invalid or missing'}), 401
+        return f(current_user, claims, *args, **kwargs)
+    return decorated_function
@@ -0,0 +1,63 @@
+from extensions import db
+from sqlalchemy import select, func, bindparam
+from math import ceil
+
+
+# Dòng kết quả gọn nhẹ: chỉ có các cột được chọn (__slots__), không phải entity ORM, không vào identity map
+class ListRow:
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+
+# Một trang kết quả, cùng thuộc tính với Pagination của Flask-SQLAlchemy
+class Page:
+    __slots__ = ('items', 'page', 'per_page', 'total', 'pages')
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = ceil(total / per_page) if total else 0
+
+
+class ListService:
+    # (model, cột, thứ tự) -> (câu select, câu count, lớp row), tạo một lần và dùng lại cho mọi request
+    statements = {}
+
+    # Câu SQL danh sách theo user + is_deleted, tham số truyền qua bindparam nên SQLAlchemy dùng lại bản đã compile
+    # order_by theo thứ tự của index (user_id, is_deleted, ...) để không phải sort, và giữ thứ tự như khi load entity
+    def statements_for(model, columns, order_by=('id',)):
+        key = (model, columns, order_by)
+        if key not in ListService.statements:
+            table = model.__table__
+            where = (table.c.user_id == bindparam('user_id'), table.c.is_deleted == bindparam('is_deleted'))
+            rows = select(*[table.c[column] for column in columns]).where(*where) \
+                .order_by(*[table.c[column] for column in order_by]) \
+                .limit(bindparam('limit')).offset(bindparam('offset'))
+            count = select(func.count()).select_from(table).where(*where)
+            row_type = type(f'{model.__name__}Row', (ListRow,), {'__slots__': columns})
+            ListService.statements[key] = (rows, count, row_type)
+        return ListService.statements[key]
+
+
+    # Lớp row (__slots__) cho một bộ cột
+    def row_type(model, columns):
+        return ListService.statements_for(model, columns)[2]
+
+
+    # Thay cho Model.query.filter_by(user_id=..., is_deleted=...).paginate(..., error_out=False)
+    # columns: tuple tên các cột cần trả về
+    def paginate(model, columns, user_id, is_deleted=False, page=1, per_page=10, order_by=('id',)):
+        page = page if page and page > 0 else 1
+        per_page = per_page if per_page and per_page > 0 else 20
+        rows, count, row_type = ListService.statements_for(model, columns, order_by)
+
+        params = {'user_id': user_id, 'is_deleted': is_deleted}
+        result = db.session.execute(rows, {**params, 'limit': per_page, 'offset': (page - 1) * per_page})
+        items = [row_type(*row) for row in result]
+        total = db.session.execute(count, params).scalar()
+        return Page(items, page, per_page, total)
@@ -0,0 +1,188 @@
+from extensions import db, read_only
+from models import MonthlyRollup, Transaction, Category
+import logging
+from sqlalchemy import func, and_, update, insert, delete
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from datetime import datetime
+from decimal import Decimal
+
+# Cấu hình logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ReportService:
+    # Biểu thức YYYY-MM của cột ngày theo từng loại database
+    def month_expression(column):
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            return func.to_char(column, 'YYYY-MM')
+        if dialect in ('mysql', 'mariadb'):
+            return func.date_format(column, '%Y-%m')
+        return func.strftime('%Y-%m', column)
+
+
+    # Kiểm tra định dạng YYYY-MM
+    def parse_month(month):
+        return datetime.strptime(month, '%Y-%m').strftime('%Y-%m')
+
+
+    # Lùi/tiến n tháng từ YYYY-MM
+    def shift_month(month, n):
+        start = datetime.strptime(month, '%Y-%m')
+        index = start.year * 12 + start.month - 1 + n
+        return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+    # Cộng dồn thay đổi vào một dòng rollup (không commit)
+    # UPDATE cộng dồn trước, chưa có dòng thì INSERT trong savepoint (request khác vừa tạo thì quay lại UPDATE)
+    def apply_delta(user_id, year_month, category_id, transaction_type, amount, count):
+        key = and_(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.year_month == year_month,
+            MonthlyRollup.category_id.is_(None) if category_id is None else MonthlyRollup.category_id == category_id,
+            MonthlyRollup.transaction_type == transaction_type
+        )
+        amount = Decimal(str(amount))
+
+        def add():
+            return db.session.execute(
+                update(MonthlyRollup).where(key).values(
+                    total_amount=MonthlyRollup.total_amount + amount,
+                    transaction_count=MonthlyRollup.transaction_count + count
+                ),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+
+        if not add():
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(MonthlyRollup).values(
+                        user_id=user_id,
+                        year_month=year_month,
+                        category_id=category_id,
+                        transaction_type=transaction_type,
+                        total_amount=amount,
+                        transaction_count=count
+                    ))
+            except IntegrityError:
+                add()
+
+        # Xoá dòng rỗng để bảng không phình ra
+        if count < 0:
+            db.session.execute(
+                delete(MonthlyRollup).where(key, MonthlyRollup.transaction_count <= 0, MonthlyRollup.total_amount == 0),
+                execution_options={'synchronize_session': False}
+            )
+
+
+    # Ảnh hưởng của một giao dịch lên bảng rollup, sign = 1 khi thêm, -1 khi hoàn tác
+    def apply_transaction(transaction, sign=1):
+        ReportService.apply_delta(
+            transaction.user_id,
+            (transaction.date or datetime.utcnow()).strftime('%Y-%m'),
+            transaction.category_id,
+            transaction.transaction_type,
+            Decimal(str(transaction.amount)) * sign,
+            sign
+        )
+
+
+    # Tính lại bảng rollup từ ledger (toàn bộ hoặc một user)
+    # Tăng version 'transactions' của các user bị ảnh hưởng để ETag/cache của báo cáo không trả số liệu cũ
+    def rebuild_rollups(user_id=None):
+        delete_query = MonthlyRollup.query
+        if user_id is not None:
+            delete_query = delete_query.filter_by(user_id=user_id)
+        users = {row[0] for row in delete_query.with_entities(MonthlyRollup.user_id).distinct()}
+        delete_query.delete(synchronize_session=False)
+
+        year_month = ReportService.month_expression(Transaction.date)
+        query = db.session.query(
+            Transaction.user_id,
+            year_month,
+            Transaction.category_id,
+            Transaction.transaction_type,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id)
+        ).filter(Transaction.is_deleted == False)
+        if user_id is not None:
+            query = query.filter(Transaction.user_id == user_id)
+        query = query.group_by(Transaction.user_id, year_month, Transaction.category_id, Transaction.transaction_type)
+
+        rows = [{
+            'user_id': row[0],
+            'year_month': row[1],
+            'category_id': row[2],
+            'transaction_type': row[3],
+            'total_amount': row[4],
+            'transaction_count': row[5]
+        } for row in query]
+
+        if rows:
+            db.session.execute(MonthlyRollup.__table__.insert(), rows)
+        users |= {row['user_id'] for row in rows}
+        db.session.info['pending_versions'] = (db.session.info.get('pending_versions') or set()) | \
+            {(user, 'transactions') for user in users}
+        db.session.commit()
+
+        logger.info(f'Rebuilt {len(rows)} monthly rollup rows' + (f' for user ID {user_id}' if user_id is not None else ''))
+        return len(rows)
+
+
+    # Báo cáo thu/chi theo tháng trong khoảng [from_month, to_month]
+    @read_only
+    def get_monthly_report_service(user_id, from_month=None, to_month=None):
+        try:
+            # Kiểm tra khoảng thời gian, mặc định 12 tháng gần nhất
+            try:
+                to_month = ReportService.parse_month(to_month) if to_month else datetime.utcnow().strftime('%Y-%m')
+                from_month = ReportService.parse_month(from_month) if from_month else ReportService.shift_month(to_month, -11)
+            except ValueError:
+                logger.warning(f'Invalid month range {from_month} - {to_month}')
+                return {'message': 'Month must be in YYYY-MM format', 'status_code': 400}
+
+            if from_month > to_month:
+                logger.warning(f'From month {from_month} must not be after to month {to_month}')
+                return {'message': 'From month must not be after to month', 'status_code': 400}
+
+            rows = db.session.query(MonthlyRollup, Category.name) \
+                .outerjoin(Category, Category.id == MonthlyRollup.category_id) \
+                .filter(MonthlyRollup.user_id == user_id,
+                        MonthlyRollup.year_month >= from_month,
+                        MonthlyRollup.year_month <= to_month) \
+                .order_by(MonthlyRollup.year_month).all()
+
+            # Gom theo tháng
+            months = {}
+            for rollup, category_name in rows:
+                month = months.setdefault(rollup.year_month, {
+                    'month': rollup.year_month,
+                    'income': 0.0,
+                    'expense': 0.0,
+                    'categories': []
+                })
+                amount = float(rollup.total_amount)
+                month['income' if rollup.transaction_type == 'Income' else 'expense'] += amount
+                month['categories'].append({
+                    'category_id': rollup.category_id,
+                    'category_name': category_name,
+                    'transaction_type': rollup.transaction_type,
+                    'amount': amount,
+                    'count': rollup.transaction_count
+                })
+
+            report = list(months.values())
+            for month in report:
+                month['net'] = month['income'] - month['expense']
+
+            return {
+                'from': from_month,
+                'to': to_month,
+                'months': report,
+                'status_code': 200
+            }
+
+        except SQLAlchemyError as e:
+            logger.error(f'Error retrieving monthly report for user ID {user_id}: {e}')
+            return {'message': 'An error occurred while retrieving monthly report', 'status_code': 500}
@@ -0,0 +1,134 @@
+from extensions import db, primary
+from models import UserSummary, Wallet, Goal, Transaction
+import logging
+from sqlalchemy import func, update, case
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from datetime import datetime
+from decimal import Decimal
+
+# Cấu hình logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SummaryService:
+    # Tháng hiện tại dạng YYYY-MM
+    def current_month():
+        return datetime.utcnow().strftime('%Y-%m')
+
+
+    # Khoảng thời gian [đầu tháng, đầu tháng sau) của tháng YYYY-MM
+    def month_range(month):
+        start = datetime.strptime(month, '%Y-%m')
+        end = datetime(start.year + 1, 1, 1) if start.month == 12 else datetime(start.year, start.month + 1, 1)
+        return start, end
+
+
+    # Tính thu/chi của một tháng trực tiếp từ bảng transactions
+    def compute_monthly(user_id, month):
+        start, end = SummaryService.month_range(month)
+        rows = db.session.query(Transaction.transaction_type, func.coalesce(func.sum(Transaction.amount), 0)) \
+            .filter(Transaction.user_id == user_id, Transaction.is_deleted == False,
+                    Transaction.date >= start, Transaction.date < end) \
+            .group_by(Transaction.transaction_type).all()
+        totals = {transaction_type: Decimal(str(total)) for transaction_type, total in rows}
+        return totals.get('Income', Decimal(0)), totals.get('Expense', Decimal(0))
+
+
+    # Tính lại toàn bộ số liệu tổng hợp của user từ ledger
+    def rebuild_summary(user_id):
+        month = SummaryService.current_month()
+        total_balance = db.session.query(func.coalesce(func.sum(Wallet.balance), 0)) \
+            .filter(Wallet.user_id == user_id, Wallet.is_deleted == False).scalar()
+        total_savings = db.session.query(func.coalesce(func.sum(Goal.saved_amount), 0)) \
+            .filter(Goal.user_id == user_id, Goal.is_deleted == False).scalar()
+        monthly_income, monthly_expense = SummaryService.compute_monthly(user_id, month)
+
+        summary = db.session.get(UserSummary, user_id)
+        if not summary:
+            summary = UserSummary(user_id=user_id)
+            db.session.add(summary)
+
+        summary.total_balance = Decimal(str(total_balance))
+        summary.total_savings = Decimal(str(total_savings))
+        summary.month = month
+        summary.monthly_income = monthly_income
+        summary.monthly_expense = monthly_expense
+        return summary
+
+
+    # Cộng dồn thay đổi vào bảng tổng hợp, chạy trong cùng transaction với thao tác gọi nó (không commit)
+    # Dùng một câu UPDATE cộng dồn nên không mất cập nhật khi nhiều request chạy song song
+    # Nếu user chưa có dòng tổng hợp thì không có dòng nào được cập nhật, lần đọc đầu tiên sẽ tính lại từ ledger
+    def apply_delta(user_id, balance=0, savings=0, income=0, expense=0, date=None):
+        # Thu/chi chỉ cộng vào tháng đang lưu, tháng khác sẽ được tính lại khi đọc
+        month = (date or datetime.utcnow()).strftime('%Y-%m')
+        same_month = UserSummary.month == month
+
+        db.session.execute(
+            update(UserSummary).where(UserSummary.user_id == user_id).values(
+                total_balance=UserSummary.total_balance + Decimal(str(balance)),
+                total_savings=UserSummary.total_savings + Decimal(str(savings)),
+                monthly_income=case((same_month, UserSummary.monthly_income + Decimal(str(income))), else_=UserSummary.monthly_income),
+                monthly_expense=case((same_month, UserSummary.monthly_expense + Decimal(str(expense))), else_=UserSummary.monthly_expense),
+                updated_at=datetime.utcnow()
+            ),
+            execution_options={'synchronize_session': False}
+        )
+
+
+    # Ảnh hưởng của một giao dịch lên bảng tổng hợp, sign = 1 khi thêm, -1 khi hoàn tác
+    def apply_transaction(transaction, sign=1):
+        amount = Decimal(str(transaction.amount)) * sign
+        if transaction.transaction_type == 'Income':
+            income, expense, change = amount, 0, amount
+        else:
+            income, expense, change = 0, amount, -amount
+
+        SummaryService.apply_delta(
+            transaction.user_id,
+            balance=change if transaction.wallet_id else 0,
+            savings=change if not transaction.wallet_id and transaction.goal_id else 0,
+            income=income,
+            expense=expense,
+            date=transaction.date
+        )
+
+
+    # Lấy số liệu tổng hợp cho dashboard (có thể ghi dòng tổng hợp nên luôn đọc từ primary)
+    @primary
+    def get_summary_service(user_id):
+        try:
+            summary = db.session.get(UserSummary, user_id)
+            if not summary:
+                logger.info(f'Building summary for user ID {user_id}')
+                summary = SummaryService.rebuild_summary(user_id)
+                db.session.commit()
+
+            # Sang tháng mới thì tính lại thu/chi của tháng hiện tại
+            month = SummaryService.current_month()
+            if summary.month != month:
+                summary.monthly_income, summary.monthly_expense = SummaryService.compute_monthly(user_id, month)
+                summary.month = month
+                db.session.commit()
+
+            return {
+                'summary': {
+                    'total_balance': float(summary.total_balance),
+                    'monthly_income': float(summary.monthly_income),
+                    'monthly_expense': float(summary.monthly_expense),
+                    'savings': float(summary.total_savings),
+                    'month': summary.month
+                },
+                'status_code': 200
+            }
+
+        except IntegrityError:
+            # Request khác vừa tạo dòng tổng hợp, đọc lại
+            db.session.rollback()
+            return SummaryService.get_summary_service(user_id)
+
+        except (SQLAlchemyError, ValueError) as e:
+            db.session.rollback()
+            logger.error(f'Error retrieving summary for user ID {user_id}: {e}')
+            return {'message': 'An error occurred while retrieving summary', 'status_code': 500}
@@ -1,9 +1,14 @@
-from extensions import db
+from extensions import db, retry_on_lock, read_only, group_commit, versioned
 from models import Transaction, Wallet, Goal, Category, Budget
-import logging
+import logging, base64, csv, io, json
+from sqlalchemy import or_, and_, insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 from .wallet_service import WalletService
+from .summary_service import SummaryService
+from .report_service import ReportService
+from .list_service import ListService
 
 
 # Cấu hình logging
@@ -11,7 +16,87 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class TransactionService:
+    # Danh sách giao dịch chỉ đọc các cột này (không đọc note)
+    LIST_COLUMNS = ('id', 'amount', 'transaction_type', 'date')
+    LIST_ORDER = ('date', 'id')  # Theo index ix_transactions_user_deleted_date
+    MAX_AMOUNT = Decimal('9999999999999.99')  # Giá trị lớn nhất của cột Numeric(15,2)
+
+    # Cập nhật các bảng tổng hợp (summary, rollup theo tháng), sign = 1 khi thêm, -1 khi hoàn tác
+    def apply_aggregates(transaction, sign=1):
+        SummaryService.apply_transaction(transaction, sign)
+        ReportService.apply_transaction(transaction, sign)
+
+
+    # Cộng delta vào cột số dư bằng một câu UPDATE ... SET col = col + :delta (không đọc-sửa-ghi nên không mất cập nhật khi chạy song song)
+    # needed: giá trị tối thiểu cột phải có trước khi cộng, trả về False nếu không đủ
+    def adjust(column, record_id, delta, needed=None):
+        model = column.class_
+        statement = update(model).where(model.id == record_id).values({column.key: column + Decimal(str(delta))})
+        if needed is not None:
+            statement = statement.where(column >= Decimal(str(needed)))
+        result = db.session.execute(statement, execution_options={'synchronize_session': False})
+        return result.rowcount == 1
+
+
+    # Áp dụng (sign = 1) hoặc hoàn tác (sign = -1) ảnh hưởng của transaction lên wallet/goal và budget
+    # Chỉ kiểm tra số dư khi áp dụng giao dịch chi, trả về thông báo lỗi nếu không đủ
+    def apply_balances(transaction, budget, sign=1):
+        amount = Decimal(str(transaction.amount))
+        delta = amount * sign if transaction.transaction_type == 'Income' else -amount * sign
+        needed = amount if transaction.transaction_type == 'Expense' and sign == 1 else None
+
+        if transaction.transaction_type == 'Expense' and budget:
+            TransactionService.adjust(Budget.amount, budget.id, -amount * sign)
+
+        if transaction.wallet_id:
+            if not TransactionService.adjust(Wallet.balance, transaction.wallet_id, delta, needed):
+                logger.warning(f'Insufficient balance in wallet ID {transaction.wallet_id}')
+                return 'Insufficient balance'
+        elif transaction.goal_id:
+            if not TransactionService.adjust(Goal.saved_amount, transaction.goal_id, delta, needed):
+                logger.warning(f'Insufficient saved amount in goal ID {transaction.goal_id}')
+                return 'Insufficient saved amount'
+        return None
+
+
+    # Nạp ngân sách của nhiều danh mục bằng một câu IN và đưa vào cache của request
+    def prefetch_budgets(user_id, category_ids):
+        cache = WalletService.identity_cache()
+        ids = set()
+        for category_id in category_ids:
+            try:
+                category_id = int(category_id)
+            except (TypeError, ValueError):
+                continue
+            if (Budget, 'category', category_id, user_id) not in cache:
+                ids.add(category_id)
+        if not ids:
+            return
+
+        budgets = Budget.query.filter(Budget.user_id == user_id, Budget.category_id.in_(ids), Budget.is_deleted == False).order_by(Budget.id).all()
+        cache.update({(Budget, 'category', category_id, user_id): None for category_id in ids})
+        for budget in reversed(budgets):  # Giữ ngân sách có id nhỏ nhất cho mỗi danh mục
+            cache[(Budget, 'category', budget.category_id, user_id)] = budget
+
+
+    # Ngân sách đang hoạt động của danh mục (có cache theo request)
+    def find_budget(user_id, category_id):
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            return None
+
+        TransactionService.prefetch_budgets(user_id, [category_id])
+        budget = WalletService.identity_cache().get((Budget, 'category', category_id, user_id))
+        if budget is not None and budget.is_deleted:
+            return None
+        return budget
+
+
     # Tạo transaction mới
+    @group_commit
+    @versioned('transactions', 'wallets', 'goals', 'budgets')
+    @retry_on_lock
     def create_transaction_service(user_id, data):
         logger.info(f'Creating transaction for user ID {user_id}')
 
@@ -39,10 +124,12 @@ class TransactionService:
                 return {'message': 'Wallet not found', 'status_code': 404}
             
             # Kiểm tra goal
-            goal = WalletService.existence_check(Goal, data['goal_id'], user_id, is_deleted=False)
-            if not goal:
-                logger.warning(f'Goal ID {data["goal_id"]} not found for user ID {user_id}')
-                return {'message': 'Goal not found', 'status_code': 404}
+            goal = None
+            if 'goal_id' in data:
+                goal = WalletService.existence_check(Goal, data['goal_id'], user_id, is_deleted=False)
+                if not goal:
+                    logger.warning(f'Goal ID {data["goal_id"]} not found for user ID {user_id}')
+                    return {'message': 'Goal not found', 'status_code': 404}
             
             # Cảnh báo nếu người dùng sử dụng tiền từ mục tiêu
             if 'goal_id' in data:
@@ -82,37 +169,25 @@ class TransactionService:
                 deleted_at = None
             )
 
+            # Kiểm tra ngân sách
+            budget = TransactionService.find_budget(user_id, data['category_id'])
+            if not budget:
+                logger.warning(f'Budget of category ID {data["category_id"]} not found for user ID {user_id}')
+                return {'message': 'Budget not found', 'status_code': 404}
+            if data['transaction_type'] == 'Expense' and budget.amount < data['amount']:
+                logger.warning(f'Budget exceeded for category ID {data["category_id"]}. Current budget: {budget.amount}, Transaction amount: {data["amount"]}')
+
             # Thêm vào db
             db.session.add(new_transaction)
 
-            # Cập nhật tiền trong wallet/goal
-            if 'wallet_id' in data:
-                if data['transaction_type'] == 'Income':
-                    wallet.balance += data['amount']
-                else:
-                    if wallet.balance < data['amount']:
-                        logger.warning(f'Insufficient balance in wallet ID {data["wallet_id"]}')
-                        return {'message':'Insufficient balance', 'status_code': 400}
-                    wallet.balance -= data['amount']
-            elif 'goal_id' in data:
-                if data['transaction_type'] == 'Income':
-                    goal.saved_amount += data['amount']
-                else:
-                    if goal.saved_amount < data['amount']:
-                        logger.warning(f'Insufficient saved amount in goal ID {data["goal_id"]}')
-                        return {'message': 'Insufficient saved amount', 'status_code': 400}
-                    goal.saved_amount -= data['amount']
-
-            # Cập nhật ngân sách
-            budget = Budget.query.filter_by(user_id=user_id, category_id=data['category_id'], is_deleted=False).first()
-            if budget and data['transaction_type'] == 'Expense':
-                if budget.amount < data['amount']:
-                    logger.warning(f'Budget exceeded for category ID {data["category_id"]}. Current budget: {budget.amount}, Transaction amount: {data["amount"]}')
-                budget.amount -= data['amount']
-                logger.info(f'Budget for category ID {data["category_id"]} updated: Remaining budget = {budget.amount}')
-            elif not budget:
-                logger.warning(f'Budget of category ID {data["category_id"]} not found for user ID {user_id}')
-                return {'message': 'Budget not found', 'status_code': 404}
+            # Cập nhật tiền trong wallet/goal và ngân sách
+            error = TransactionService.apply_balances(new_transaction, budget)
+            if error:
+                db.session.rollback()
+                return {'message': error, 'status_code': 400}
+
+            # Cập nhật các bảng tổng hợp
+            TransactionService.apply_aggregates(new_transaction)
 
             # Commit và trả về kết quả
             db.session.commit()
@@ -137,11 +212,202 @@ class TransactionService:
             return {"message": "An error occurred while creating transaction", 'status_code': 500}
         
 
+    # Tạo nhiều transaction trong một request
+    # rows là iterable các dict (None nếu dòng không đọc được), xử lý theo từng chunk:
+    # mỗi chunk kiểm tra wallet/category/budget bằng một câu IN, insert bằng executemany
+    # và cộng dồn số dư/ngân sách/bảng tổng hợp, commit một lần ở cuối
+    @versioned('transactions', 'wallets', 'goals', 'budgets')
+    def bulk_create_transactions_service(user_id, rows, chunk_size=500):
+        logger.info(f'Bulk creating transactions for user ID {user_id}')
+
+        wallets, categories, budgets = {}, {}, {}
+        summary_deltas, rollup_deltas = {}, {}
+        # Số dư theo từng dòng tính trong bộ nhớ từ số dư lúc nạp; cuối cùng ghi bằng một câu UPDATE cộng dồn
+        balances, lowest_balances, start_balances, budget_deltas = {}, {}, {}, {}
+        results = []
+
+        def error(index, message, status_code):
+            results.append({'index': index, 'message': message, 'status_code': status_code})
+
+        def to_int(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+
+        # Nạp các wallet/category/budget chưa có trong cache bằng một câu IN mỗi loại
+        def load_references(chunk):
+            wallet_ids = {to_int(row.get('wallet_id')) for _, row in chunk} - wallets.keys() - {None}
+            category_ids = {to_int(row.get('category_id')) for _, row in chunk} - categories.keys() - {None}
+
+            if wallet_ids:
+                found = Wallet.query.filter(Wallet.user_id == user_id, Wallet.is_deleted == False, Wallet.id.in_(wallet_ids)).all()
+                wallets.update({wallet_id: None for wallet_id in wallet_ids})
+                wallets.update({w.id: w for w in found})
+                for w in found:
+                    start_balances[w.id] = balances[w.id] = lowest_balances[w.id] = Decimal(str(w.balance or 0))
+
+            if category_ids:
+                found = Category.query.filter(Category.user_id == user_id, Category.is_deleted == False, Category.id.in_(category_ids)).all()
+                categories.update({category_id: None for category_id in category_ids})
+                categories.update({c.id: c for c in found})
+
+                found = Budget.query.filter(Budget.user_id == user_id, Budget.is_deleted == False, Budget.category_id.in_(category_ids)).order_by(Budget.id).all()
+                budgets.update({category_id: None for category_id in category_ids})
+                for b in found:
+                    if budgets.get(b.category_id) is None:
+                        budgets[b.category_id] = b
+
+        # Kiểm tra một dòng giống create_transaction_service và cập nhật số dư trong bộ nhớ
+        def validate(index, row):
+            if not all(field in row for field in ['wallet_id', 'amount', 'transaction_type']):
+                return error(index, 'Missing required fields', 400)
+
+            if 'goal_id' in row:
+                return error(index, 'Cannot specify both wallet_id and goal_id', 400)
+
+            wallet = wallets.get(to_int(row['wallet_id']))
+            if not wallet:
+                return error(index, 'Wallet not found', 404)
+
+            category_id = to_int(row.get('category_id'))
+            if not categories.get(category_id):
+                return error(index, 'Category not found', 404)
+
+            try:
+                amount = Decimal(str(row['amount']))
+            except InvalidOperation:
+                return error(index, 'Invalid amount', 400)
+            # NaN/Infinity (vd: 1e999 trong JSON) và số vượt quá cột Numeric không được ghi vào số dư
+            if not amount.is_finite() or amount > TransactionService.MAX_AMOUNT:
+                return error(index, 'Invalid amount', 400)
+            if amount <= 0:
+                return error(index, 'Amount must be greater than 0 VND', 400)
+
+            if row['transaction_type'] not in ['Income', 'Expense']:
+                return error(index, 'Invalid transaction type', 400)
+
+            try:
+                date = datetime.strptime(row['date'], '%Y-%m-%d %H:%M:%S') if row.get('date') else datetime.utcnow()
+            except (TypeError, ValueError):
+                return error(index, 'Invalid date', 400)
+
+            budget = budgets.get(category_id)
+            if not budget:
+                return error(index, 'Budget not found', 404)
+
+            # Cập nhật số dư và ngân sách
+            if row['transaction_type'] == 'Income':
+                balances[wallet.id] += amount
+            else:
+                if balances[wallet.id] < amount:
+                    return error(index, 'Insufficient balance', 400)
+                balances[wallet.id] -= amount
+                lowest_balances[wallet.id] = min(lowest_balances[wallet.id], balances[wallet.id])
+                remaining = budget.amount + budget_deltas.get(budget.id, 0)
+                if remaining < amount:
+                    logger.warning(f'Budget exceeded for category ID {category_id}. Current budget: {remaining}, Transaction amount: {amount}')
+                budget_deltas[budget.id] = budget_deltas.get(budget.id, 0) - amount
+
+            # Cộng dồn cho bảng tổng hợp
+            month = date.strftime('%Y-%m')
+            income = amount if row['transaction_type'] == 'Income' else 0
+            expense = amount if row['transaction_type'] == 'Expense' else 0
+            delta = summary_deltas.setdefault(month, {'balance': 0, 'income': 0, 'expense': 0, 'date': date})
+            delta['balance'] += income - expense
+            delta['income'] += income
+            delta['expense'] += expense
+
+            rollup = rollup_deltas.setdefault((month, category_id, row['transaction_type']), [0, 0])
+            rollup[0] += amount
+            rollup[1] += 1
+
+            return {
+                'user_id': user_id,
+                'wallet_id': wallet.id,
+                'goal_id': None,
+                'category_id': category_id,
+                'amount': amount,
+                'transaction_type': row['transaction_type'],
+                'note': row.get('note', ''),
+                'date': date,
+                'is_deleted': False,
+                'deleted_at': None
+            }
+
+        def flush_chunk(chunk):
+            load_references(chunk)
+            indexes, params = [], []
+            for index, row in chunk:
+                values = validate(index, row)
+                if values:
+                    indexes.append(index)
+                    params.append(values)
+
+            if params:
+                ids = db.session.execute(
+                    insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+                    params
+                ).scalars().all()
+                results.extend({'index': index, 'id': transaction_id, 'status_code': 201} for index, transaction_id in zip(indexes, ids))
+
+        try:
+            chunk = []
+            for index, row in enumerate(rows):
+                if not isinstance(row, dict):
+                    error(index, 'Invalid row', 400)
+                    continue
+                chunk.append((index, row))
+                if len(chunk) >= chunk_size:
+                    flush_chunk(chunk)
+                    chunk = []
+            if chunk:
+                flush_chunk(chunk)
+
+            # Ghi số dư bằng UPDATE cộng dồn; nếu số dư đã bị request khác làm giảm đến mức không đủ thì huỷ cả lô
+            for wallet_id, balance in balances.items():
+                delta = balance - start_balances[wallet_id]
+                needed = start_balances[wallet_id] - lowest_balances[wallet_id]
+                if delta == 0 and needed == 0:
+                    continue
+                if not TransactionService.adjust(Wallet.balance, wallet_id, delta, needed if needed > 0 else None):
+                    db.session.rollback()
+                    logger.warning(f'Balance of wallet ID {wallet_id} changed during bulk create for user ID {user_id}')
+                    return {'message': 'Wallet balance changed during import, please retry', 'status_code': 409}
+            for budget_id, delta in budget_deltas.items():
+                TransactionService.adjust(Budget.amount, budget_id, delta)
+
+            # Cập nhật bảng tổng hợp một lần cho mỗi tháng / mỗi dòng rollup
+            for delta in summary_deltas.values():
+                SummaryService.apply_delta(user_id, balance=delta['balance'], income=delta['income'], expense=delta['expense'], date=delta['date'])
+            for (month, category_id, transaction_type), (amount, count) in rollup_deltas.items():
+                ReportService.apply_delta(user_id, month, category_id, transaction_type, amount, count)
+
+            db.session.commit()
+
+            results.sort(key=lambda r: r['index'])
+            created = sum(1 for r in results if r['status_code'] == 201)
+            logger.info(f'Bulk created {created}/{len(results)} transactions for user ID {user_id}')
+            return {
+                'message': 'Bulk import completed',
+                'created': created,
+                'failed': len(results) - created,
+                'results': results,
+                'status_code': 200
+            }
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f'Error bulk creating transactions for user ID {user_id}: {e}')
+            return {'message': 'An error occurred while importing transactions', 'status_code': 500}
+
+
     # Lấy danh sách transaction
+    @read_only
     def get_transactions_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            transactions = Transaction.query.filter_by(user_id=user_id, is_deleted=False).paginate(page=page, per_page=per_page, error_out=False)
+            transactions = ListService.paginate(Transaction, TransactionService.LIST_COLUMNS, user_id, False, page, per_page, TransactionService.LIST_ORDER)
             transactions_list = [{
                 'id': t.id,
                 'amount': float(t.amount),
@@ -165,10 +431,11 @@ class TransactionService:
         
 
     # Lấy danh sách transaction đã xoá
+    @read_only
     def get_deleted_transactions_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            deleted_transactions = Transaction.query.filter_by(user_id=user_id, is_deleted=True).paginate(page=page, per_page=per_page, error_out=False)
+            deleted_transactions = ListService.paginate(Transaction, TransactionService.LIST_COLUMNS, user_id, True, page, per_page, TransactionService.LIST_ORDER)
             deleted_transactions_list = [{
                 'id': t.id,
                 'amount': float(t.amount),
@@ -191,7 +458,151 @@ class TransactionService:
             return {'message': 'An error occurred while retrieving deleted transactions', 'status_code': 500}
         
 
+    # Mã hoá cursor (date, id) thành chuỗi opaque
+    def encode_cursor(date, transaction_id):
+        raw = f'{date.isoformat()},{transaction_id}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+    # Giải mã cursor, raise ValueError nếu không hợp lệ
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            date_str, transaction_id = raw.rsplit(',', 1)
+            return datetime.fromisoformat(date_str), int(transaction_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+    # Lấy danh sách transaction theo cursor (keyset pagination)
+    # Seek theo index (user_id, is_deleted, date, id) thay vì OFFSET, chỉ đếm tổng khi được yêu cầu
+    @read_only
+    def get_transactions_cursor_service(user_id, after=None, limit=10, include_total=False, is_deleted=False):
+        try:
+            limit = max(1, min(limit, 100))
+            query = select(*[getattr(Transaction, column) for column in TransactionService.LIST_COLUMNS]) \
+                .where(Transaction.user_id == user_id, Transaction.is_deleted == is_deleted)
+
+            if after:
+                try:
+                    after_date, after_id = TransactionService.decode_cursor(after)
+                except ValueError:
+                    logger.warning(f'Invalid cursor {after} for user ID {user_id}')
+                    return {'message': 'Invalid cursor', 'status_code': 400}
+
+                query = query.where(or_(
+                    Transaction.date < after_date,
+                    and_(Transaction.date == after_date, Transaction.id < after_id)
+                ))
+
+            # Lấy dư 1 dòng để biết còn trang sau hay không
+            row_type = ListService.row_type(Transaction, TransactionService.LIST_COLUMNS)
+            rows = [row_type(*row) for row in db.session.execute(query.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1))]
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            transactions_list = [{
+                'id': t.id,
+                'amount': float(t.amount),
+                'transaction_type': t.transaction_type,
+                'date': t.date.isoformat()
+            } for t in rows]
+
+            result = {
+                'transactions': transactions_list,
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': TransactionService.encode_cursor(rows[-1].date, rows[-1].id) if has_more else None,
+                'status_code': 200
+            }
+
+            # Chỉ chạy COUNT(*) khi client yêu cầu
+            if include_total:
+                result['total_items'] = Transaction.query.filter_by(user_id=user_id, is_deleted=is_deleted).count()
+
+            return result
+
+        except (SQLAlchemyError, ValueError) as e:
+            logger.error(f'Error retrieving transactions by cursor for user ID {user_id}: {e}')
+            return {'message': 'An error occurred while retrieving transactions', 'status_code': 500}
+
+
+    # Các cột khi export ledger
+    EXPORT_COLUMNS = ['id', 'date', 'wallet_id', 'goal_id', 'category_id', 'amount', 'transaction_type', 'note']
+
+
+    # Export toàn bộ ledger của user dạng csv/ndjson
+    # Trả về generator đọc từ server-side cursor (yield_per), bộ nhớ không tăng theo số giao dịch
+    def export_transactions_service(user_id, file_format='csv', date_from=None, date_to=None, wallet_id=None, batch_size=1000):
+        logger.info(f'Exporting transactions as {file_format} for user ID {user_id}')
+
+        if file_format not in ['csv', 'ndjson']:
+            logger.warning(f'Unsupported export format: {file_format}')
+            return {'message': 'Unsupported export format', 'status_code': 400}
+
+        # Lọc theo khoảng ngày (YYYY-MM-DD, to bao gồm cả ngày cuối) và ví
+        query = select(*[getattr(Transaction, column) for column in TransactionService.EXPORT_COLUMNS]) \
+            .where(Transaction.user_id == user_id, Transaction.is_deleted == False)
+        try:
+            if date_from:
+                query = query.where(Transaction.date >= datetime.strptime(date_from, '%Y-%m-%d'))
+            if date_to:
+                query = query.where(Transaction.date < datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
+        except ValueError:
+            logger.warning(f'Invalid export date range {date_from} - {date_to}')
+            return {'message': 'Date must be in YYYY-MM-DD format', 'status_code': 400}
+        if wallet_id:
+            query = query.where(Transaction.wallet_id == wallet_id)
+        query = query.order_by(Transaction.date, Transaction.id).execution_options(yield_per=batch_size)
+
+        def serialize(row):
+            return {
+                'id': row.id,
+                'date': row.date.isoformat() if row.date else None,
+                'wallet_id': row.wallet_id,
+                'goal_id': row.goal_id,
+                'category_id': row.category_id,
+                'amount': float(row.amount),
+                'transaction_type': row.transaction_type,
+                'note': row.note
+            }
+
+        def generate():
+            try:
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=TransactionService.EXPORT_COLUMNS)
+                if file_format == 'csv':
+                    writer.writeheader()
+
+                for partition in db.session.execute(query).partitions():
+                    for row in partition:
+                        if file_format == 'csv':
+                            writer.writerow(serialize(row))
+                        else:
+                            buffer.write(json.dumps(serialize(row), ensure_ascii=False) + '\n')
+
+                    # Mỗi partition gửi đi một lần rồi xoá buffer
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+                if buffer.tell():
+                    yield buffer.getvalue()
+
+            except SQLAlchemyError as e:
+                logger.error(f'Error exporting transactions for user ID {user_id}: {e}')
+                raise
+
+        return {
+            'stream': generate(),
+            'mimetype': 'text/csv' if file_format == 'csv' else 'application/x-ndjson',
+            'filename': f'transactions.{file_format}',
+            'status_code': 200
+        }
+
+
     # Lấy thông tin transaction
+    @read_only
     def get_transaction_service(user_id, transaction_id):
         try:
             # Kiểm tra tồn tại
@@ -218,6 +629,9 @@ class TransactionService:
         
 
     # Cập nhật transaction
+    @group_commit
+    @versioned('transactions', 'wallets', 'goals', 'budgets')
+    @retry_on_lock
     def update_transaction_service(user_id, transaction_id, data):
         logger.info(f'Updating transaction ID {transaction_id} for user ID {user_id} with data {data}')
         
@@ -226,41 +640,46 @@ class TransactionService:
             if not transaction:
                 logger.warning(f'Transaction ID {transaction_id} not found for user ID {user_id}')
                 return {'message': 'Transaction not found', 'status_code': 404}
+
+            # Nạp trước wallet/goal/category/budget cũ và mới, mỗi model một câu query
+            WalletService.prefetch(Wallet, [transaction.wallet_id, data.get('wallet_id')], user_id)
+            WalletService.prefetch(Goal, [transaction.goal_id, data.get('goal_id')], user_id)
+            WalletService.prefetch(Category, [data.get('category_id')], user_id)
+            TransactionService.prefetch_budgets(user_id, [transaction.category_id, data.get('category_id')])
             
             # Lấy wallet/goal trong transaction muốn update và budget để hoàn tác số dư trước khi thay đổi
-            wallet = WalletService.existence_check(Wallet, transaction.wallet_id, user_id, is_deleted=False)
-            if not wallet:
-                logger.warning(f'Wallet ID {transaction.wallet_id} not found for user ID {user_id}')
-                return {'message': 'Wallet not found', 'status_code': 404}
+            wallet = None
+            if transaction.wallet_id:
+                wallet = WalletService.existence_check(Wallet, transaction.wallet_id, user_id, is_deleted=False)
+                if not wallet:
+                    logger.warning(f'Wallet ID {transaction.wallet_id} not found for user ID {user_id}')
+                    return {'message': 'Wallet not found', 'status_code': 404}
             
-            goal = WalletService.existence_check(Goal, transaction.goal_id, user_id, is_deleted=False)
-            if not goal:
-                logger.warning(f'Goal ID {transaction.goal_id} not found for user ID {user_id}')
-                return {'message': 'Goal not found', 'status_code': 404}
+            goal = None
+            if transaction.goal_id:
+                goal = WalletService.existence_check(Goal, transaction.goal_id, user_id, is_deleted=False)
+                if not goal:
+                    logger.warning(f'Goal ID {transaction.goal_id} not found for user ID {user_id}')
+                    return {'message': 'Goal not found', 'status_code': 404}
             
-            budget = Budget.query.filter_by(user_id=user_id, category_id=transaction.category_id, is_deleted=False).first()
+            budget = TransactionService.find_budget(user_id, transaction.category_id)
             if not budget:
                 logger.warning(f'Budget of category ID {transaction.category_id} not found for user ID {user_id}')
                 return {'message': 'Budget not found', 'status_code': 404}
             
             # Hoàn tác tiền cho wallet/goal và budget
-            if transaction.transaction_type == 'Income':
-                if transaction.wallet_id:
-                    wallet.balance -= transaction.amount
-                elif transaction.goal_id:
-                    goal.saved_amount -= transaction.amount
-            else:
-                budget.amount += transaction.amount
-                if transaction.wallet_id:
-                    wallet.balance += transaction.amount
-                elif transaction.goal_id:
-                    goal.saved_amount += transaction.amount
+            TransactionService.apply_balances(transaction, budget, -1)
+            TransactionService.apply_aggregates(transaction, -1)
 
             # Cập nhật transaction
+            # Mặc định giữ wallet/goal/budget cũ nếu không thay đổi
+            new_wallet, new_goal, new_budget = wallet, goal, budget
+
             # Kiểm tra wallet
             if 'wallet_id' in data:
                 new_wallet = WalletService.existence_check(Wallet, data['wallet_id'], user_id, is_deleted=False)
                 if not new_wallet:
+                    db.session.rollback()  # Bỏ phần hoàn tác số dư đã chạy
                     logger.warning(f'Wallet ID {data["wallet_id"]} not found for user ID {user_id}')
                     return {'message': 'Wallet not found', 'status_code': 404}
                 
@@ -270,6 +689,7 @@ class TransactionService:
             if 'goal_id' in data:
                 new_goal = WalletService.existence_check(Goal, data['goal_id'], user_id, is_deleted=False)
                 if not new_goal:
+                    db.session.rollback()  # Bỏ phần hoàn tác số dư đã chạy
                     logger.warning(f'Goal ID {data["goal_id"]} not found for user ID {user_id}')
                     return {'message': 'Goal not found', 'status_code': 404}
                 
@@ -279,15 +699,17 @@ class TransactionService:
             if 'category_id' in data:
                 new_category = WalletService.existence_check(Category, data['category_id'], user_id, is_deleted=False)
                 if not new_category:
+                    db.session.rollback()  # Bỏ phần hoàn tác số dư đã chạy
                     logger.warning(f'Category ID {data["category_id"]} not found for user ID {user_id}')
                     return {'message': 'Category not found', 'status_code': 404}
                 
                 transaction.category_id = data['category_id']
-                new_budget = Budget.query.filter_by(user_id=user_id, category_id=data['category_id'], is_deleted=False).first()
+                new_budget = TransactionService.find_budget(user_id, data['category_id'])
 
             # Kiểm tra amount
             if 'amount' in data:
                 if data['amount'] <= 0:
+                    db.session.rollback()  # Bỏ phần hoàn tác số dư đã chạy
                     logger.warning(f'Amount must be greater than 0 VND')
                     return {'message': 'Amount must be greater than 0 VND', 'status_code': 400}
                 
@@ -296,6 +718,7 @@ class TransactionService:
             # Kiểm tra transaction type
             if 'transaction_type' in data:
                 if data['transaction_type'] not in ['Income', 'Expense']:
+                    db.session.rollback()  # Bỏ phần hoàn tác số dư đã chạy
                     logger.warning(f'Invalid transaction type: {data["transaction_type"]}')
                     return {"message": "Invalid transaction type", 'status_code': 400}
                 
@@ -310,23 +733,18 @@ class TransactionService:
                 transaction.date = datetime.strptime(data['date'], '%Y-%m-%d %H:%M:%S')
 
             # Cập nhật lại số dư
-            if transaction.transaction_type == 'Income':
-                if transaction.wallet_id:
-                    new_wallet.balance += transaction.amount
-                elif transaction.goal_id:
-                    new_goal.saved_amount += transaction.amount
-            else:
-                new_budget.amount -= transaction.amount
-                if transaction.wallet_id:
-                    if new_wallet.balance < transaction.amount:
-                        logger.warning(f'Insufficient balance in wallet ID {transaction.wallet_id}')
-                        return {'message': 'Insufficient balance', 'status_code': 400}
-                    new_wallet.balance -= transaction.amount
-                elif transaction.goal_id:
-                    if new_goal.saved_amount < transaction.amount:
-                        logger.warning(f'Insufficient saved amount in goal ID {transaction.goal_id}')
-                        return {'message': 'Insufficient saved amount', 'status_code': 400}
-                    new_goal.saved_amount -= transaction.amount
+            if not new_budget:
+                db.session.rollback()
+                logger.warning(f'Budget of category ID {transaction.category_id} not found for user ID {user_id}')
+                return {'message': 'Budget not found', 'status_code': 404}
+
+            error = TransactionService.apply_balances(transaction, new_budget)
+            if error:
+                db.session.rollback()
+                return {'message': error, 'status_code': 400}
+
+            # Cập nhật các bảng tổng hợp theo giá trị mới
+            TransactionService.apply_aggregates(transaction)
 
             # Commit vào db và trả về kết quả
             db.session.commit()
@@ -352,6 +770,9 @@ class TransactionService:
         
 
     # Xoá transaction vĩnh viễn
+    @group_commit
+    @versioned('transactions', 'wallets', 'goals', 'budgets')
+    @retry_on_lock
     def delete_transaction_service(user_id, transaction_id):
         logger.info(f'Deleting transaction ID {transaction_id} for user ID {user_id}')
 
@@ -362,33 +783,30 @@ class TransactionService:
                 logger.warning(f'Transaction ID {transaction_id} not found for user ID {user_id}')
                 return {'message': 'Transaction not found', 'status_code': 404}
             
-            wallet = WalletService.existence_check(Wallet, transaction.wallet_id, user_id, is_deleted=False)
-            if not wallet:
-                logger.warning(f'Wallet ID {transaction.wallet_id} not found for user ID {user_id}')
-                return {'message': 'Wallet not found', 'status_code': 404}
+            wallet = None
+            if transaction.wallet_id:
+                wallet = WalletService.existence_check(Wallet, transaction.wallet_id, user_id, is_deleted=False)
+                if not wallet:
+                    logger.warning(f'Wallet ID {transaction.wallet_id} not found for user ID {user_id}')
+                    return {'message': 'Wallet not found', 'status_code': 404}
             
-            goal = WalletService.existence_check(Goal, transaction.goal_id, user_id, is_deleted=False)
-            if not goal:
-                logger.warning(f'Goal ID {transaction.goal_id} not found for user ID {user_id}')
-                return {'message': 'Goal not found', 'status_code': 404}
+            goal = None
+            if transaction.goal_id:
+                goal = WalletService.existence_check(Goal, transaction.goal_id, user_id, is_deleted=False)
+                if not goal:
+                    logger.warning(f'Goal ID {transaction.goal_id} not found for user ID {user_id}')
+                    return {'message': 'Goal not found', 'status_code': 404}
             
-            budget = Budget.query.filter_by(user_id=user_id, category_id=transaction.category_id, is_deleted=False).first()
+            budget = TransactionService.find_budget(user_id, transaction.category_id)
             if not budget:
                 logger.warning(f'Budget of category ID {transaction.category_id} not found for user ID {user_id}')
                 return {'message': 'Budget not found', 'status_code': 404}
             
             # Hoàn tác tiền cho wallet/goal và budget
-            if transaction.transaction_type == 'Income':
-                if transaction.wallet_id:
-                    wallet.balance -= transaction.amount
-                elif transaction.goal_id:
-                    goal.saved_amount -= transaction.amount
-            else:
-                budget.amount += transaction.amount
-                if transaction.wallet_id:
-                    wallet.balance += transaction.amount
-                elif transaction.goal_id:
-                    goal.saved_amount += transaction.amount
+            TransactionService.apply_balances(transaction, budget, -1)
+
+            # Cập nhật các bảng tổng hợp
+            TransactionService.apply_aggregates(transaction, -1)
 
             # Xoá khỏi db
             db.session.delete(transaction)
@@ -405,6 +823,9 @@ class TransactionService:
         
 
     # Xoá transaction tạm thời
+    @group_commit
+    @versioned('transactions', 'wallets', 'goals', 'budgets')
+    @retry_on_lock
     def soft_delete_transaction_service(user_id, transaction_id):
         logger.info(f'Soft deleting transaction ID {transaction_id} for user ID {user_id}')
 
@@ -415,33 +836,30 @@ class TransactionService:
                 logger.warning(f'Transaction ID {transaction_id} not found for user ID {user_id}')
                 return {'message': 'Transaction not found', 'status_code': 404}
             
-            wallet = WalletService.existence_check(Wallet, transaction.wallet_id, user_id, is_deleted=False)
-            if not wallet:
-                logger.warning(f'Wallet ID {transaction.wallet_id} not found for user ID {user_id}')
-                return {'message': 'Wallet not found', 'status_code': 404}
+            wallet = None
+            if transaction.wallet_id:
+                wallet = WalletService.existence_check(Wallet, transaction.wallet_id, user_id, is_deleted=False)
+                if not wallet:
+                    logger.warning(f'Wallet ID {transaction.wallet_id} not found for user ID {user_id}')
+                    return {'message': 'Wallet not found', 'status_code': 404}
             
-            goal = WalletService.existence_check(Goal, transaction.goal_id, user_id, is_deleted=False)
-            if not goal:
-                logger.warning(f'Goal ID {transaction.goal_id} not found for user ID {user_id}')
-                return {'message': 'Goal not found', 'status_code': 404}
+            goal = None
+            if transaction.goal_id:
+                goal = WalletService.existence_check(Goal, transaction.goal_id, user_id, is_deleted=False)
+                if not goal:
+                    logger.warning(f'Goal ID {transaction.goal_id} not found for user ID {user_id}')
+                    return {'message': 'Goal not found', 'status_code': 404}
             
-            budget = Budget.query.filter_by(user_id=user_id, category_id=transaction.category_id, is_deleted=False).first()
+            budget = TransactionService.find_budget(user_id, transaction.category_id)
             if not budget:
                 logger.warning(f'Budget of category ID {transaction.category_id} not found for user ID {user_id}')
                 return {'message': 'Budget not found', 'status_code': 404}
             
             # Hoàn tác tiền cho wallet/goal và budget
-            if transaction.transaction_type == 'Income':
-                if transaction.wallet_id:
-                    wallet.balance -= transaction.amount
-                elif transaction.goal_id:
-                    goal.saved_amount -= transaction.amount
-            else:
-                budget.amount += transaction.amount
-                if transaction.wallet_id:
-                    wallet.balance += transaction.amount
-                elif transaction.goal_id:
-                    goal.saved_amount += transaction.amount
+            TransactionService.apply_balances(transaction, budget, -1)
+
+            # Cập nhật các bảng tổng hợp
+            TransactionService.apply_aggregates(transaction, -1)
 
             # Cập nhật db
             transaction.is_deleted = True
@@ -459,6 +877,9 @@ class TransactionService:
         
 
     # Khôi phục transaction
+    @group_commit
+    @versioned('transactions', 'wallets', 'goals', 'budgets')
+    @retry_on_lock
     def restore_transaction_service(user_id, transaction_id):
         logger.info(f'Restoring transaction ID {transaction_id} for user ID {user_id}')
 
@@ -469,39 +890,33 @@ class TransactionService:
                 logger.warning(f'Transaction ID {transaction_id} not found for user ID {user_id}')
                 return {'message': 'Transaction not found', 'status_code': 404}
             
-            wallet = WalletService.existence_check(Wallet, transaction.wallet_id, user_id, is_deleted=False)
-            if not wallet:
-                logger.warning(f'Wallet ID {transaction.wallet_id} not found for user ID {user_id}')
-                return {'message': 'Wallet not found', 'status_code': 404}
+            wallet = None
+            if transaction.wallet_id:
+                wallet = WalletService.existence_check(Wallet, transaction.wallet_id, user_id, is_deleted=False)
+                if not wallet:
+                    logger.warning(f'Wallet ID {transaction.wallet_id} not found for user ID {user_id}')
+                    return {'message': 'Wallet not found', 'status_code': 404}
             
-            goal = WalletService.existence_check(Goal, transaction.goal_id, user_id, is_deleted=False)
-            if not goal:
-                logger.warning(f'Goal ID {transaction.goal_id} not found for user ID {user_id}')
-                return {'message': 'Goal not found', 'status_code': 404}
+            goal = None
+            if transaction.goal_id:
+                goal = WalletService.existence_check(Goal, transaction.goal_id, user_id, is_deleted=False)
+                if not goal:
+                    logger.warning(f'Goal ID {transaction.goal_id} not found for user ID {user_id}')
+                    return {'message': 'Goal not found', 'status_code': 404}
             
-            budget = Budget.query.filter_by(user_id=user_id, category_id=transaction.category_id, is_deleted=False).first()
+            budget = TransactionService.find_budget(user_id, transaction.category_id)
             if not budget:
                 logger.warning(f'Budget of category ID {transaction.category_id} not found for user ID {user_id}')
                 return {'message': 'Budget not found', 'status_code': 404}
             
             # Cập nhật tiền cho wallet/goal và budget
-            if transaction.transaction_type == 'Income':
-                if transaction.wallet_id:
-                    wallet.balance += transaction.amount
-                elif transaction.goal_id:
-                    goal.saved_amount += transaction.amount
-            else:
-                budget.amount -= transaction.amount
-                if transaction.wallet_id:
-                    if wallet.balance < transaction.amount:
-                        logger.warning(f'Insufficient balance in wallet ID {transaction.wallet_id}')
-                        return {'message':'Insufficient balance', 'status_code': 400}
-                    wallet.balance -= transaction.amount
-                elif transaction.goal_id:
-                    if goal.saved_amount < transaction.amount:
-                        logger.warning(f'Insufficient saved amount in goal ID {transaction.goal_id}')
-                        return {'message': 'Insufficient saved amount', 'status_code': 400}
-                    goal.saved_amount -= transaction.amount
+            error = TransactionService.apply_balances(transaction, budget)
+            if error:
+                db.session.rollback()
+                return {'message': error, 'status_code': 400}
+
+            # Cập nhật các bảng tổng hợp
+            TransactionService.apply_aggregates(transaction)
 
             # Cập nhật db
             transaction.is_deleted = False
@@ -1,9 +1,10 @@
 from flask import request
-from extensions import db
+from extensions import db, PasswordHasherBusy, retry_on_lock, read_only, versioned
 from models import User
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 from .auth_service import AuthService
+from .jwt_service import revoke
 from datetime import datetime
 
 # Cấu hình logging
@@ -36,6 +37,7 @@ class UserService:
     
 
     # Lấy thông tin user
+    @read_only
     def get_profile_service(user_id):
         try:
             # Kiểm tra tồn tại
@@ -57,6 +59,8 @@ class UserService:
         
 
     # Cập nhật profile
+    @versioned('profile')
+    @retry_on_lock
     def update_user_service(user_id, data):
         logger.info(f'Updating user ID {user_id} with data {data}')
 
@@ -118,9 +122,16 @@ class UserService:
             db.session.rollback()
             logger.error(f'Error updating user {user_id} with {data}: {e}')
             return {'message': 'An error occurred while updating user', 'status_code': 500}
+
+        except PasswordHasherBusy:
+            db.session.rollback()
+            logger.warning(f'Password hashing queue is full, rejecting update for user ID {user_id}')
+            return {'message': 'Server is busy, please try again later', 'status_code': 503}
         
     
     # Xoá user vĩnh viễn
+    @versioned('profile')
+    @retry_on_lock
     def delete_user_service(user_id):
         logger.info(f'Deleting user ID {user_id}')
         
@@ -131,8 +142,9 @@ class UserService:
                 logger.warning(f'User ID {user_id} not found')
                 return {'message': 'User not found', 'status_code': 404}
             
-            # Xoá trong db
+            # Xoá trong db, thu hồi mọi token của user
             db.session.delete(user)
+            revoke(user_id=user.id)
             db.session.commit()
 
             # Trả về kết quả
@@ -146,6 +158,8 @@ class UserService:
         
 
     # Xoá tạm thời
+    @versioned('profile')
+    @retry_on_lock
     def soft_delete_category_service(user_id):
         logger.info(f'Soft deleting user ID {user_id}')
 
@@ -156,9 +170,10 @@ class UserService:
                 logger.warning(f'User ID {user_id} not found')
                 return {'message': 'User not found', 'status_code': 404}
             
-            # Cập nhật vào db
+            # Cập nhật vào db, thu hồi mọi token đã cấp
             user.active = False
             user.deleted_at = datetime.utcnow()
+            revoke(user_id=user.id)
             db.session.commit()
 
             # Trả về kết quả
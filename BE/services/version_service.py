@@ -0,0 +1,56 @@
+from flask import request, make_response
+from extensions import current_versions
+from datetime import datetime
+import hashlib, logging
+
+# Cấu hình logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class VersionService:
+    # Dữ liệu trả về bởi các route GET của mỗi blueprint phụ thuộc vào version của các entity này
+    # (giao dịch làm thay đổi số dư ví/goal/budget nên service giao dịch tăng cả các version đó)
+    BLUEPRINT_ENTITIES = {
+        'wallet': ('wallets',),
+        'category': ('categories',),
+        'budget': ('budgets',),
+        'goal': ('goals',),
+        'transaction': ('transactions',),
+        'summary': ('wallets', 'goals', 'transactions'),
+        'report': ('transactions', 'categories'),
+        'dashboard': ('wallets', 'goals', 'budgets', 'categories', 'transactions'),
+        'user': ('profile',)
+    }
+
+    # Version hiện tại của các entity (chưa có dòng = 0)
+    def get_versions(user_id, entities):
+        return current_versions(user_id, entities)
+
+
+    # ETag của request GET hiện tại: user, đường dẫn + query string, version các entity và ngày hiện tại
+    # (số liệu theo tháng, trạng thái goal... thay đổi theo ngày dù dữ liệu không đổi)
+    def etag(user_id, entities):
+        versions = VersionService.get_versions(user_id, entities)
+        raw = f'{user_id}|{request.full_path}|{versions}|{datetime.utcnow().date()}'
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+
+    # Trả về 304 nếu ETag client gửi lên (If-None-Match) vẫn đúng, không chạy route và không truy vấn các bảng dữ liệu
+    # Ngược lại chạy route và gắn ETag vào response 200
+    def conditional_get(user_id, view, *args, **kwargs):
+        entities = VersionService.BLUEPRINT_ENTITIES.get(request.blueprint)
+        if not entities:
+            return view(user_id, *args, **kwargs)
+
+        etag = VersionService.etag(int(user_id), entities)
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(user_id, *args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'  # Trình duyệt luôn hỏi lại bằng If-None-Match
+        return response
@@ -1,26 +1,76 @@
-from extensions import db
+from extensions import db, retry_on_lock, read_only, group_commit, versioned, cached
 from models import Wallet, Transaction
 import logging
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
+from .summary_service import SummaryService
+from .list_service import ListService
 
 # Cấu hình logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Cache thuộc về session (mỗi request một session), xoá sau mỗi lần commit/rollback
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_soft_rollback')
+def clear_identity_cache(session, *args):
+    session.info.pop('identity_cache', None)
+
+
 class WalletService:
+    # Cột của API danh sách ví
+    LIST_COLUMNS = ('id', 'name', 'balance', 'currency')
+
+    # Cache các instance đã nạp trong request: (model, id, user_id) -> instance hoặc None
+    def identity_cache():
+        return db.session.info.setdefault('identity_cache', {})
+
+
+    # Nạp nhiều id của cùng một model bằng một câu IN và đưa vào cache
+    def prefetch(model, model_ids, user_id):
+        cache = WalletService.identity_cache()
+        ids = set()
+        for model_id in model_ids:
+            try:
+                model_id = int(model_id)
+            except (TypeError, ValueError):
+                continue
+            if (model, model_id, user_id) not in cache:
+                ids.add(model_id)
+        if not ids:
+            return
+
+        instances = model.query.filter(model.id.in_(ids), model.user_id == user_id).all()
+        cache.update({(model, model_id, user_id): None for model_id in ids})
+        cache.update({(model, instance.id, user_id): instance for instance in instances})
+
+
     # Kiểm tra sự tồn tại
     def existence_check(model, model_id, user_id, is_deleted=None):
-        query = model.query.filter_by(id=model_id, user_id=user_id)
-        if is_deleted is not None:  # Kiểm tra trạng thái is_deleted nếu được chỉ định
-            query = query.filter_by(is_deleted=is_deleted)
-        instance = query.first()
+        try:
+            model_id = int(model_id)
+        except (TypeError, ValueError):
+            return None
+
+        # Chỉ query khi instance chưa có trong cache của request
+        cache = WalletService.identity_cache()
+        if (model, model_id, user_id) not in cache:
+            WalletService.prefetch(model, [model_id], user_id)
+        instance = cache.get((model, model_id, user_id))
+
+        if instance is not None and is_deleted is not None and instance.is_deleted != is_deleted:  # Kiểm tra trạng thái is_deleted nếu được chỉ định
+            return None
         return instance
 
     
     
     # Tạo wallet mới
+    @group_commit
+    @versioned('wallets')
+    @retry_on_lock
     def create_wallet_service(user_id, data, force_create=False):
         logger.info(f'Creating wallet for user ID {user_id}')
 
@@ -71,6 +121,7 @@ class WalletService:
 
             # Thêm dữ liệu vào db
             db.session.add(new_wallet)
+            SummaryService.apply_delta(user_id, balance=new_wallet.balance)
             db.session.commit()
             
             # Trả về kết quả
@@ -93,10 +144,12 @@ class WalletService:
         
 
     # Lấy danh sách wallet
+    @read_only
+    @cached('wallets')
     def get_wallets_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            wallets = Wallet.query.filter_by(user_id=user_id, is_deleted=False).paginate(page=page, per_page=per_page, error_out=False)
+            wallets = ListService.paginate(Wallet, WalletService.LIST_COLUMNS, user_id, False, page, per_page)
             wallets_list = [{
                 'id': w.id,
                 'name': w.name,
@@ -120,10 +173,11 @@ class WalletService:
         
 
     # Lấy danh sách wallet đã bị xoá
+    @read_only
     def get_deleted_wallets_service(user_id, page=1, per_page=10):
         try:
             # Phân trang
-            deleted_wallets = Wallet.query.filter_by(user_id=user_id, is_deleted=True).paginate(page=page, per_page=per_page, error_out=False)
+            deleted_wallets = ListService.paginate(Wallet, WalletService.LIST_COLUMNS, user_id, True, page, per_page)
             deleted_wallets_list = [{
                 'id': w.id,
                 'name': w.name,
@@ -147,6 +201,7 @@ class WalletService:
         
     
     # Lấy thông tin wallet
+    @read_only
     def get_wallet_service(user_id, wallet_id):
         try:
             # Kiểm tra tồn tại
@@ -170,6 +225,9 @@ class WalletService:
         
 
     # Cập nhật thông tin wallet
+    @group_commit
+    @versioned('wallets')
+    @retry_on_lock
     def update_wallet_service(user_id, wallet_id, data):
         logger.info(f'Updating wallet ID {wallet_id} for user ID {user_id} with data {data}')
     
@@ -219,6 +277,9 @@ class WalletService:
         
     
     # Xoá wallet
+    @group_commit
+    @versioned('wallets')
+    @retry_on_lock
     def delete_wallet_service(user_id, wallet_id):
         logger.info(f'Deleting wallet ID {wallet_id} for user ID {user_id}')
     
@@ -236,6 +297,8 @@ class WalletService:
                 return {'message': 'Cannot delete wallet with associated transactions', 'status_code': 400}
     
             # Xoá dữ liệu trong db
+            if not wallet.is_deleted:
+                SummaryService.apply_delta(user_id, balance=-wallet.balance)
             db.session.delete(wallet)
             db.session.commit()
 
@@ -250,6 +313,7 @@ class WalletService:
         
 
     # Kiểm tra số dư ví
+    @read_only
     def get_balance_service(user_id, wallet_id):
         try:
             # Kiểm tra tồn tại
@@ -276,6 +340,9 @@ class WalletService:
         
 
     # Xoá tạm thời
+    @group_commit
+    @versioned('wallets')
+    @retry_on_lock
     def soft_delete_wallet_service(user_id, wallet_id):
         logger.info(f'Soft deleting wallet ID {wallet_id} for user ID {user_id}')
 
@@ -289,6 +356,7 @@ class WalletService:
             # Cập nhật vào db
             wallet.is_deleted = True
             wallet.deleted_at = datetime.utcnow()
+            SummaryService.apply_delta(user_id, balance=-wallet.balance)
             db.session.commit()
 
             # Trả về kết quả
@@ -302,6 +370,9 @@ class WalletService:
         
 
     # Khôi phục wallet
+    @group_commit
+    @versioned('wallets')
+    @retry_on_lock
     def restore_wallet_service(user_id, wallet_id):
         logger.info(f'Soft restoring wallet ID {wallet_id} for user ID {user_id}')
 
@@ -315,6 +386,7 @@ class WalletService:
             # Cập nhật vào db
             wallet.is_deleted = False
             wallet.deleted_at = None
+            SummaryService.apply_delta(user_id, balance=wallet.balance)
             db.session.commit()
 
             # Trả về kết quả
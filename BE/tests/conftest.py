@@ -0,0 +1,51 @@
+# Fixture dùng chung: app với database sqlite tạm (TESTING=True), client và header của user đã đăng nhập
+# Chạy từ thư mục BE: python -m pytest tests
+import logging
+import pytest
+from app import create_app
+from extensions import db, write_queue
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    apps = []
+
+    # Mỗi app một file database riêng trong thư mục tạm của test, config truyền thêm ghi đè mặc định
+    def factory(**config):
+        app = create_app(**{
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / f"test{len(apps)}.db"}',
+            'JWT_SECRET_KEY': 'test',
+            'TESTING': True,
+            **config
+        })
+        with app.app_context():
+            db.create_all(bind_key=None)  # db.metadatas còn bind 'reader' của app trước (DB_SESSION_ROUTING)
+        apps.append(app)
+        return app
+
+    logging.disable(logging.WARNING)
+    yield factory
+    write_queue.stop()
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# Đăng ký và đăng nhập một user, trả về header Authorization
+@pytest.fixture
+def auth_headers(client):
+    client.post('/auth/register', json={'username': 'tester', 'email': 'tester@example.com', 'password': 'Tester123!'})
+    token = client.post('/auth/login', json={'email': 'tester@example.com', 'password': 'Tester123!'}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,32 @@
+# Số dư wallet/budget, summary và rollup vẫn khớp ledger khi nhiều luồng cùng ghi giao dịch
+# Bản nhỏ của python -m benchmarks.balance_stress (dùng chung seed/worker/verify)
+import threading
+import pytest
+from benchmarks.balance_stress import seed, worker, verify
+
+THREADS = 4
+OPERATIONS = 25
+
+
+@pytest.mark.parametrize('config', [
+    {},
+    {'WRITE_QUEUE_ENABLED': True},
+    {'DB_SESSION_ROUTING': True}
+], ids=['direct', 'write-queue', 'routing'])
+def test_balances_match_ledger(make_app, config):
+    app = make_app(**config)
+    with app.app_context():
+        wallet_ids, category_ids = seed(2, 2)
+
+    counts, lock = {}, threading.Lock()
+    threads = [threading.Thread(target=worker, args=(app, 42 + i, OPERATIONS, wallet_ids, category_ids, counts, lock))
+               for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(counts.values()) == THREADS * OPERATIONS
+    assert not any(key.endswith(' 500') for key in counts), counts
+    with app.app_context():
+        assert verify(wallet_ids, category_ids) == []
@@ -0,0 +1,73 @@
+# GET /dashboard/: số câu SQL cố định trong ngân sách dù user có ít hay nhiều dữ liệu, số đã chi khớp ledger
+# Bản nhỏ của python -m benchmarks.dashboard_check (dùng chung seed/verify_budgets)
+import logging
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from extensions import db
+from services.dashboard_service import DashboardService, QueryBudgetExceeded
+from benchmarks.dashboard_check import seed, verify_budgets
+
+
+@pytest.fixture
+def dashboard_app(make_app):
+    # Tắt cache kết quả để mỗi lần gọi đều chạy truy vấn thật
+    return make_app(CACHE_BACKEND='none')
+
+
+def count_queries(app, fn):
+    counter = {'queries': 0}
+
+    def count(*_):
+        counter['queries'] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return counter['queries'], result
+
+
+def test_dashboard_query_count_is_constant(dashboard_app):
+    with dashboard_app.app_context():
+        users = {'small': seed('small', 1, 1, 1, 3)[0], 'large': seed('large', 5, 6, 4, 120)[0]}
+
+    service_queries, request_queries = {}, {}
+    client = dashboard_app.test_client()
+    for name, user_id in users.items():
+        with dashboard_app.test_request_context():
+            DashboardService.get_dashboard_service(user_id)  # Tạo dòng summary lần đầu
+            db.session.remove()
+            service_queries[name], dashboard = count_queries(dashboard_app, lambda: DashboardService.get_dashboard_service(user_id))
+            assert dashboard['status_code'] == 200
+            assert verify_budgets(user_id, dashboard) == []
+            db.session.remove()
+
+        with dashboard_app.app_context():
+            headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+        client.get('/dashboard/', headers=headers)  # Bỏ qua chi phí một lần (connection mới, PRAGMA...)
+        request_queries[name], response = count_queries(dashboard_app, lambda: client.get('/dashboard/', headers=headers))
+        assert response.status_code == 200
+
+    assert service_queries['large'] <= DashboardService.QUERY_BUDGET
+    assert service_queries['small'] == service_queries['large']
+    assert request_queries['small'] == request_queries['large']
+
+
+def test_query_budget_raises_only_when_testing(dashboard_app, caplog):
+    over = DashboardService.QUERY_BUDGET + 1
+    with dashboard_app.app_context():
+        DashboardService.check_query_budget(1, DashboardService.QUERY_BUDGET)
+        with pytest.raises(QueryBudgetExceeded):
+            DashboardService.check_query_budget(1, over)
+
+        # Chạy thật (kể cả python app.py với debug=True) chỉ log cảnh báo
+        dashboard_app.config['TESTING'] = False
+        dashboard_app.debug = True
+        logging.disable(logging.NOTSET)
+        with caplog.at_level(logging.WARNING, logger='services.dashboard_service'):
+            DashboardService.check_query_budget(1, over)
+        assert f'used {over} queries' in caplog.text
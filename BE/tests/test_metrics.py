@@ -0,0 +1,19 @@
+# GET /metrics/cache: chỉ giám sát nội bộ có METRICS_TOKEN mới đọc được, token đăng nhập của user thì không
+import pytest
+
+
+@pytest.mark.parametrize('headers', [{}, {'X-Metrics-Token': 'wrong'}])
+def test_cache_metrics_hidden_without_token(make_app, headers):
+    client = make_app(METRICS_TOKEN='secret').test_client()
+    assert client.get('/metrics/cache', headers=headers).status_code == 404
+
+
+def test_cache_metrics_disabled_by_default(client, auth_headers):
+    assert client.get('/metrics/cache', headers=auth_headers).status_code == 404
+
+
+def test_cache_metrics_with_token(make_app):
+    client = make_app(METRICS_TOKEN='secret').test_client()
+    response = client.get('/metrics/cache', headers={'X-Metrics-Token': 'secret'})
+    assert response.status_code == 200
+    assert {'hits', 'misses', 'entries'} <= set(response.get_json())
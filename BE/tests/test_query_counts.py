@@ -0,0 +1,40 @@
+# Số câu SQL tối đa của từng endpoint giao dịch/ví, đo như python -m benchmarks.query_count_benchmark
+# Tăng giới hạn ở đây phải có lý do: thường là có truy vấn theo từng dòng hoặc lazy load mới
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from extensions import db
+from benchmarks.query_count_benchmark import seed, measure_endpoints
+
+MAX_QUERIES = {
+    'POST /transactions/create': 10,
+    'GET /transactions/<id>': 2,
+    'PUT /transactions/update/<id>': 16,
+    'PATCH /transactions/soft_delete': 10,
+    'PATCH /transactions/restore': 9,
+    'DELETE /transactions/delete': 10,
+    'GET /transactions/': 3,
+    'GET /wallets/': 4,
+    'GET /wallets/<id>': 2
+}
+
+
+def test_endpoint_query_counts(app):
+    counter = {'queries': 0}
+    with app.app_context():
+        user_id, wallet_ids, category_ids = seed()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+        engine = db.engine
+
+    def count(*_):
+        counter['queries'] += 1
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        results = measure_endpoints(app.test_client(), headers, wallet_ids, category_ids, counter)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+    assert [name for name, _, _ in results] == list(MAX_QUERIES)
+    for name, status_code, queries in results:
+        assert status_code < 300, f'{name} returned {status_code}'
+        assert queries <= MAX_QUERIES[name], f'{name} used {queries} queries (max {MAX_QUERIES[name]})'
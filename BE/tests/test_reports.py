@@ -0,0 +1,27 @@
+# Báo cáo theo tháng: tính lại rollup (flask rebuild-rollups) phải làm ETag cũ hết hiệu lực
+from extensions import db
+from models import MonthlyRollup
+
+
+def test_rebuild_rollups_invalidates_report_etag(app, client, auth_headers):
+    wallet_id = client.post('/wallets/create', json={'name': 'Wallet', 'balance': 100000}, headers=auth_headers).get_json()['wallet']['id']
+    category_id = client.post('/categories/create', json={'name': 'Food'}, headers=auth_headers).get_json()['category']['id']
+    client.post('/budgets/create', json={'category_id': category_id, 'amount': 100000}, headers=auth_headers)
+    response = client.post('/transactions/create', headers=auth_headers, json={
+        'wallet_id': wallet_id, 'category_id': category_id, 'amount': 1500, 'transaction_type': 'Expense'})
+    assert response.status_code == 201
+
+    # Rollup bị lệch so với ledger (vd: sửa tay trong database), báo cáo trả số sai kèm ETag
+    with app.app_context():
+        MonthlyRollup.query.update({'total_amount': 1}, synchronize_session=False)
+        db.session.commit()
+    response = client.get('/reports/monthly', headers=auth_headers)
+    etag = response.headers['ETag']
+    assert response.get_json()['months'][0]['expense'] == 1
+
+    result = app.test_cli_runner().invoke(args=['rebuild-rollups'])
+    assert result.exit_code == 0, result.output
+
+    response = client.get('/reports/monthly', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['months'][0]['expense'] == 1500
@@ -16,7 +16,7 @@ api.interceptors.request.use(
     // Get token from localStorage (only in browser)
     if (typeof window !== 'undefined') {
       const token = localStorage.getItem('authToken');
-      if (token) {
+      if (token && !config.headers.Authorization) {
         config.headers.Authorization = `Bearer ${token}`;
       }
     }
@@ -35,6 +35,9 @@ export const authService = {
       if (response.data.token) {
         localStorage.setItem('authToken', response.data.token);
       }
+      if (response.data.refresh_token) {
+        localStorage.setItem('refreshToken', response.data.refresh_token);
+      }
       return response.data;
     } catch (error) {
       throw error;
@@ -51,7 +54,14 @@ export const authService = {
   },
   
   logout: () => {
+    // Revoke the session on the server so existing tokens stop working
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (refreshToken) {
+      api.post('/auth/logout', null, { headers: { Authorization: `Bearer ${refreshToken}` } })
+        .catch((error) => console.error('API Error:', error));
+    }
     localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
   },
   
   getCurrentUser: async () => {
@@ -270,5 +280,32 @@ export const goalService = {
   }
 };
 
+export const dashboardService = {
+  // Get wallets, goals, budgets, categories, recent transactions and totals in one request
+  getDashboard: async (recent = 10) => {
+    try {
+      const response = await api.get('/dashboard/', { params: { recent } });
+      return response.data;
+    } catch (error) {
+      console.error('API Error:', error);
+      throw error;
+    }
+  }
+};
+
+export const batchService = {
+  // Run several API calls in one HTTP request, responses come back in the same order
+  // atomic: all writes are saved together or not at all
+  run: async (requests: { method?: string; path: string; body?: unknown }[], atomic = false) => {
+    try {
+      const response = await api.post('/batch/', { requests, atomic });
+      return response.data.responses as { status: number; body: any }[];
+    } catch (error) {
+      console.error('API Error:', error);
+      throw error;
+    }
+  }
+};
+
 
 export default api;